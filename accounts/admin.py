@@ -1,24 +1,30 @@
 from django.contrib import admin
+from django.db.models import F
+
+from core.admin_tools import ScaleModeAdmin
 
 from .models import CustomUser, Role, Permission, Follow
 
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(ScaleModeAdmin):
     list_display = ['username', 'email', 'get_role', 'verified', 'is_premium']
     list_filter = ['joined_at', 'is_premium', 'verified']
+    search_fields = ['username', 'email']
     show_facets = admin.ShowFacets.ALLOW
     list_per_page = 50
+    list_annotations = {'role_name': F('role__name')}
 
-    @admin.display(description='Role')
+    @admin.display(description='Role', ordering='role_name')
     def get_role(self, obj):
-        return obj.role.name if obj.role else 'No Role'
+        return obj.role_name or 'No Role'
 
 
 @admin.register(Role)
-class RoleAdmin(admin.ModelAdmin):
+class RoleAdmin(ScaleModeAdmin):
     list_display = ['name', 'get_permissions']
+    search_fields = ['name']
 
     @admin.display(description='Permissions')
     def get_permissions(self, obj):
@@ -29,7 +35,17 @@ class RoleAdmin(admin.ModelAdmin):
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
-    list_display = ['follower', 'followed', 'created_at']
-    search_fields = ['follower', 'followed']
-    list_filter = ['created_at']
\ No newline at end of file
+class FollowAdmin(ScaleModeAdmin):
+    list_display = ['get_follower', 'get_followed', 'created_at']
+    search_fields = ['follower__username', 'followed__username']
+    list_filter = ['created_at']
+    list_select_related = ['follower', 'followed']
+    autocomplete_fields = ['follower', 'followed']
+
+    @admin.display(description='Follower', ordering='follower__username')
+    def get_follower(self, obj):
+        return obj.follower.username
+
+    @admin.display(description='Followed', ordering='followed__username')
+    def get_followed(self, obj):
+        return obj.followed.username
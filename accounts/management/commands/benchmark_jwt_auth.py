@@ -0,0 +1,65 @@
+import time
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import CustomUser
+from accounts.revocation import revocation_log
+from accounts.token import ClaimsRefreshToken, CustomJWTAuthenticationClass
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of CustomJWTAuthenticationClass with and without the revocation filter"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="email of the user to authenticate as, defaults to the first user")
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument(
+            '--revoked', type=int, default=0,
+            help="revoke this many random jtis first, so the filter is not empty (written to the shared cache)",
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('pk')
+        user = users.filter(email=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError("no user to authenticate as")
+
+        for _ in range(options['revoked']):
+            revocation_log.append(('jti', uuid.uuid4().hex, None))
+
+        token = ClaimsRefreshToken.for_user(user).access_token
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+
+        self.stdout.write(f"{'user mode':<10} {'filter':<7} {'us/request':>10} {'cache reads':>12} {'queries':>8}")
+        for claims in (False, True):
+            for revocation_filter in (False, True):
+                with override_settings(JWT_TOKEN_USER_MODE=claims, JWT_REVOCATION_FILTER=revocation_filter):
+                    elapsed, cache_calls, queries = self.measure(request, options['requests'])
+                self.stdout.write(
+                    f"{'claims' if claims else 'database':<10} {'on' if revocation_filter else 'off':<7} "
+                    f"{elapsed * 1e6:>10.1f} {cache_calls:>12.2f} {queries:>8.2f}"
+                )
+
+    def measure(self, request, count):
+        authentication = CustomJWTAuthenticationClass()
+        authentication.authenticate(request)
+
+        # every per-request cache read is a single get_many; the filter's own sync runs once per interval
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(100):
+                    authentication.authenticate(request)
+        cache_calls = get_many.call_count
+
+        started = time.perf_counter()
+        for _ in range(count):
+            authentication.authenticate(request)
+        elapsed = (time.perf_counter() - started) / count
+        return elapsed, cache_calls / 100, len(queries) / 100
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import compute_follow_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute the follow suggestions of every user from the Follow graph"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-user', type=int, default=settings.FOLLOW_SUGGESTIONS_PER_USER)
+        parser.add_argument(
+            '--max-pairs', type=int, default=settings.FOLLOW_SUGGESTIONS_MAX_PAIRS,
+            help="most (user, candidate) pairs held in memory at once",
+        )
+
+    def handle(self, *args, **options):
+        written = compute_follow_suggestions(options['per_user'], options['max_pairs'])
+        self.stdout.write(f"wrote {written} follow suggestions")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recount posts_count, followers_count and following_count of every user and fix the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = CustomUser.objects.reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(f"fixed counters of {fixed} users")
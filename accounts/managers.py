@@ -1,6 +1,17 @@
+from django.apps import apps
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import connections, router, transaction
+from django.db.models import Count, F, IntegerField, Manager, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
+COUNTER_FIELDS = ("posts_count", "followers_count", "following_count")
+
+
+def _count_rows(queryset, field):
+    rows = queryset.filter(**{field: OuterRef("pk")}).order_by().values(field).annotate(count=Count("*")).values("count")
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, username, password, **extra_fields):
@@ -27,4 +38,89 @@ class CustomUserManager(BaseUserManager):
         if not extra_fields.get("is_active"):
             raise ValueError(_("Superuser must have is_active=True"))
 
-        return self.create_user(email, username, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, username, password, **extra_fields)
+
+    def get_counter_expressions(self):
+        Post = apps.get_model("blog", "Post")
+        Follow = apps.get_model("accounts", "Follow")
+        return {
+            "posts_count": _count_rows(Post.objects.filter(is_active=True), "author"),
+            "followers_count": _count_rows(Follow.objects.all(), "followed"),
+            "following_count": _count_rows(Follow.objects.all(), "follower"),
+        }
+
+    def reconcile_counters(self, batch_size=1000):
+        """Recount the counter columns from the rows, one pk range per transaction.
+
+        Returns the number of users whose counters were wrong. The users of a
+        batch are locked while it is recounted, so follows toggled meanwhile
+        are applied on top of the corrected values.
+        """
+        actual = {f"actual_{name}": expression for name, expression in self.get_counter_expressions().items()}
+        drift = Q()
+        for name in COUNTER_FIELDS:
+            drift |= ~Q(**{name: F(f"actual_{name}")})
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(self.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return fixed
+
+            with transaction.atomic(using=self.db):
+                users = list(
+                    self.filter(pk__gte=pks[0], pk__lte=pks[-1])
+                    .select_for_update()
+                    .only("pk", *COUNTER_FIELDS)
+                    .annotate(**actual)
+                    .filter(drift)
+                )
+                for user in users:
+                    for name in COUNTER_FIELDS:
+                        setattr(user, name, getattr(user, f"actual_{name}"))
+                self.bulk_update(users, COUNTER_FIELDS)
+            fixed += len(users)
+            last_pk = pks[-1]
+
+
+class FollowManager(Manager):
+    def toggle(self, follower, followed):
+        """Unfollow if ``follower`` follows ``followed``, follow otherwise.
+
+        Runs as a single statement that also moves both users' counters.
+        Returns a ``(created, deleted)`` pair; both are False when a
+        concurrent request created the follow first.
+        """
+        user_model = self.model._meta.get_field("follower").related_model
+        connection = connections[router.db_for_write(self.model)]
+        sql = """
+            WITH deleted AS (
+                DELETE FROM {table}
+                WHERE follower_id = %(follower)s AND followed_id = %(followed)s
+                RETURNING 1
+            ), inserted AS (
+                INSERT INTO {table} (follower_id, followed_id, created_at)
+                SELECT %(follower)s, %(followed)s, now()
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                ON CONFLICT (follower_id, followed_id) DO NOTHING
+                RETURNING 1
+            ), delta AS (
+                SELECT (SELECT count(*) FROM inserted) - (SELECT count(*) FROM deleted) AS value
+            ), counted AS (
+                UPDATE {user_table}
+                SET following_count = following_count
+                        + CASE WHEN id = %(follower)s THEN delta.value ELSE 0 END,
+                    followers_count = followers_count
+                        + CASE WHEN id = %(followed)s THEN delta.value ELSE 0 END
+                FROM delta
+                WHERE id IN (%(follower)s, %(followed)s) AND delta.value <> 0
+            )
+            SELECT EXISTS (SELECT 1 FROM inserted), EXISTS (SELECT 1 FROM deleted)
+        """.format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            user_table=connection.ops.quote_name(user_model._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {"follower": follower.pk, "followed": followed.pk})
+            return cursor.fetchone()
\ No newline at end of file
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def count_rows(queryset, field):
+    rows = queryset.filter(**{field: OuterRef("pk")}).order_by().values(field).annotate(count=Count("*")).values("count")
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    # id ranges in separate transactions, so a large table isn't rewritten under one long lock
+    CustomUser = apps.get_model("accounts", "CustomUser")
+    Follow = apps.get_model("accounts", "Follow")
+    Post = apps.get_model("blog", "Post")
+    last_id = 0
+    while True:
+        ids = list(CustomUser.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        CustomUser.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(
+            posts_count=count_rows(Post.objects.filter(is_active=True), "author"),
+            followers_count=count_rows(Follow.objects.all(), "followed"),
+            following_count=count_rows(Follow.objects.all(), "follower"),
+        )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0009_customuser_token_version'),
+        ('blog', '0012_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
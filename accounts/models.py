@@ -3,13 +3,17 @@ from hashlib import sha256
 from enum import IntEnum
 
 from django.db import models
+from django.db.models import DEFERRED
 from django.core.cache import cache
 from django.db import transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
-from .managers import CustomUserManager
+from core.models import CounterFieldsMixin
+
+from .managers import COUNTER_FIELDS, CustomUserManager, FollowManager
+from .role_cache import get_role_permissions
 
 class Permission(IntEnum):
     FOLLOW = 1
@@ -82,7 +86,7 @@ class Role(models.Model):
     def __str__(self):
         return f'{self.name} (permissions: {self.permissions})'
       
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(verbose_name=_('Email Address'), unique=True)
     username = models.CharField(verbose_name=_('User Name'), max_length=50, unique=True)
     bio = models.TextField(verbose_name=_('Biography'), max_length=250, blank=True, null=True)
@@ -91,21 +95,79 @@ class CustomUser(AbstractUser):
     verified = models.BooleanField(verbose_name=_('Is Verified'), default=False)
     is_premium = models.BooleanField(verbose_name=_('Is Premium'), default=False)
     role = models.ForeignKey(Role, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
+    # bumped when a field carried in access token claims changes, see accounts.token
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+    # active posts, users following this user and users this user follows; see CustomUserManager.reconcile_counters
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
 
     joined_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', )
+    COUNTER_FIELDS = COUNTER_FIELDS
+    TOKEN_CLAIM_FIELDS = ('username', 'email', 'role_id', 'is_premium', 'verified', 'is_active')
 
     objects = CustomUserManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = instance._get_claim_values()
+        return instance
+
+    @classmethod
+    def from_token_claims(cls, user_id, claims):
+        """A user built from access token claims without a query.
+
+        The fields that are not in the token are deferred and the first one a
+        view reads loads all of them.
+        """
+        values = {
+            'id': user_id,
+            'username': claims['username'],
+            'email': claims['email'],
+            'role_id': claims['role'],
+            'is_premium': claims['premium'],
+            'verified': claims['verified'],
+            'is_active': True,
+            'token_version': claims['tv'],
+        }
+        fields = cls._meta.concrete_fields
+        user = cls.from_db(None, list(values), [values.get(field.attname, DEFERRED) for field in fields])
+        user._from_token_claims = True
+        return user
+
+    def _get_claim_values(self):
+        return {name: self.__dict__[name] for name in self.TOKEN_CLAIM_FIELDS if name in self.__dict__}
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and getattr(self, '_from_token_claims', False):
+            deferred = self.get_deferred_fields()
+            if deferred.issuperset(fields):
+                fields = list(deferred)
+        super().refresh_from_db(using, fields, from_queryset)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_claims', None)
+        self.token_version_changed = (
+            not self._state.adding and bool(loaded) and loaded != {name: getattr(self, name) for name in loaded}
+        )
+        if self.token_version_changed:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_claims = self._get_claim_values()
     
     @property
     def is_admin(self):
-        return self.role and self.role.has_permission(Permission.ADMIN)
+        return self.can(Permission.ADMIN)
     
     def can(self, perm):
-        return self.role is not None and self.role.has_permission(perm)
+        return self.role_id is not None and (get_role_permissions(self.role_id) & perm) == perm
     
     def _get_otp_cache_key(self):
         return f'user_otp_{self.id}'
@@ -135,13 +197,38 @@ class Follow(models.Model):
     followed = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='following')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FollowManager()
+
     class Meta:
         unique_together = [['follower', 'followed']] 
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=('followed', '-created_at')),
+            models.Index(fields=('follower', '-created_at')),
+        ]
     
     def clean(self):
         if self.follower == self.followed:
             raise ValidationError('users cant follow themselves')
 
     def __str__(self):
-        return f'{self.follower} follow {self.followed}'
\ No newline at end of file
+        return f'{self.follower} follow {self.followed}'
+
+
+class FollowSuggestion(models.Model):
+    """A user followed by people ``user`` follows, written by accounts.suggestions."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['user', 'suggested']]
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=('user', 'rank')),
+        ]
+
+    def __str__(self):
+        return f'{self.suggested} suggested to {self.user}'
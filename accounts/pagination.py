@@ -0,0 +1,9 @@
+from core.pagination import KeysetCursorPagination
+
+
+class FollowListPagination(KeysetCursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    # matches the (followed, created_at DESC) and (follower, created_at DESC) indexes, id breaks ties
+    ordering = ('-created_at', '-id')
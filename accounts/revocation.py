@@ -0,0 +1,159 @@
+"""Revoked access tokens, checked in memory.
+
+Revoking a token or bumping a user's ``token_version`` appends an entry to a
+log kept in the shared cache: ``jwt_revocations_version`` counts the entries
+and ``jwt_revocation_<n>`` holds entry ``n`` for one access token lifetime,
+after which every token it could affect has expired anyway.
+
+Each process reads the new entries at most every
+``JWT_REVOCATION_SYNC_INTERVAL`` seconds, adding revoked jtis to a Bloom
+filter and keeping the latest token version of the users that changed. A
+token that is not in the filter and whose version is current is accepted
+without touching the cache; a filter hit is confirmed with the exact
+``jwt_blacklist_<jti>`` key. A revocation made by another process is
+therefore seen within one sync interval.
+
+A writer bumps the counter before it stores its entry, so a sync can find an
+entry missing that is about to appear. The sync applies every entry it finds
+but only moves past a missing one once the writer has had
+``MISSING_ENTRY_TIMEOUT`` seconds to store it; until then the next sync reads
+it again. Entries that expired are skipped the same way.
+
+When more than ``JWT_REVOCATION_CAPACITY`` entries are alive the process
+cannot hold them all and falls back to exact lookups for every request.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+from .bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'jwt_revocations_version'
+SYNC_BATCH_SIZE = 1000
+# seconds a writer has between bumping the counter and storing its entry
+MISSING_ENTRY_TIMEOUT = 5
+
+
+def get_blacklist_cache_key(jti):
+    return f'jwt_blacklist_{jti}'
+
+
+def get_entry_cache_key(version):
+    return f'jwt_revocation_{version}'
+
+
+class RevocationLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset(0)
+        self.synced_at = float('-inf')
+
+    def reset(self, version):
+        self.version = version
+        self.jtis = BloomFilter(settings.JWT_REVOCATION_CAPACITY, settings.JWT_REVOCATION_ERROR_RATE)
+        self.token_versions = {}
+        self.complete = True
+        # (counter, since) when a sync first found an entry missing
+        self.waiting = None
+        # entries past a missing one that are already applied
+        self.applied = set()
+
+    @property
+    def enabled(self):
+        return settings.JWT_REVOCATION_FILTER
+
+    def needs_sync(self):
+        return time.monotonic() - self.synced_at >= settings.JWT_REVOCATION_SYNC_INTERVAL
+
+    def sync(self):
+        with self._lock:
+            if not self.needs_sync():
+                return
+            self._sync()
+            self.synced_at = time.monotonic()
+
+    def _sync(self):
+        capacity = settings.JWT_REVOCATION_CAPACITY
+        remote = cache.get(VERSION_CACHE_KEY) or 0
+        if remote < self.version or remote - self.version > capacity - len(self.jtis):
+            # the counter was reset, or the new entries do not fit: start over from the newest ones
+            start = max(0, remote - capacity)
+            self.reset(start)
+            # entries expire in order, so if the one before the window is gone so is everything older
+            self.complete = start == 0 or cache.get(get_entry_cache_key(start)) is None
+            if not self.complete:
+                logger.warning('more than %s live token revocations, checking every token in the cache', capacity)
+
+        versions = range(self.version + 1, remote + 1)
+        synced = remote
+        for offset in range(0, len(versions), SYNC_BATCH_SIZE):
+            batch = versions[offset:offset + SYNC_BATCH_SIZE]
+            entries = cache.get_many([get_entry_cache_key(version) for version in batch if version not in self.applied])
+            for version in batch:
+                if version in self.applied:
+                    continue
+                entry = entries.get(get_entry_cache_key(version))
+                if entry is not None:
+                    self._apply(entry)
+                    if synced < remote:
+                        self.applied.add(version)
+                elif synced == remote and not self._is_lost(version, remote):
+                    synced = version - 1
+
+        if self.waiting is not None and synced >= self.waiting[0]:
+            self.waiting = None
+        self.applied = {version for version in self.applied if version > synced}
+        self.version = synced
+
+    def _is_lost(self, version, remote):
+        """Whether missing entry ``version`` is not coming: its writer ran out of time, or it expired."""
+        now = time.monotonic()
+        if self.waiting is None:
+            self.waiting = (remote, now)
+            return False
+        counter, since = self.waiting
+        return version <= counter and now - since >= MISSING_ENTRY_TIMEOUT
+
+    def _apply(self, entry):
+        kind, key, value = entry
+        if kind == 'jti':
+            self.jtis.add(key)
+        else:
+            self.token_versions[key] = max(value, self.token_versions.get(key, 0))
+
+    def append(self, entry):
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        version = cache.incr(VERSION_CACHE_KEY)
+        cache.set(get_entry_cache_key(version), entry, timeout=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+        with self._lock:
+            self._apply(entry)
+
+    def might_be_revoked(self, jti):
+        """False only when the token is certainly not blacklisted."""
+        return not (self.enabled and self.complete) or jti in self.jtis
+
+    def is_version_current(self, user_id, token_version):
+        """Whether ``token_version`` is current for the user, or ``None`` when it has to be looked up."""
+        if not (self.enabled and self.complete):
+            return None
+        return token_version >= self.token_versions.get(user_id, 0)
+
+
+revocation_log = RevocationLog()
+
+
+def revoke_token(validated_token):
+    jti = validated_token[api_settings.JTI_CLAIM]
+    timeout = max(1, validated_token['exp'] - int(time.time()))
+    cache.set(get_blacklist_cache_key(jti), True, timeout=timeout)
+    revocation_log.append(('jti', jti, None))
+
+
+def publish_token_version(user_id, version):
+    revocation_log.append(('tv', user_id, version))
@@ -0,0 +1,74 @@
+"""Process-local copy of the Role table.
+
+There are only a handful of roles and they rarely change, so every process
+keeps ``{role_id: permissions}`` in memory and permission checks never touch
+the database. Saving or deleting a Role bumps a version number in the shared
+cache (see accounts.signals). Each process compares it with the version it
+loaded at most every ``ROLE_CACHE_CHECK_INTERVAL`` seconds and reloads the
+table when it moved. An id missing from the table is reloaded for once, then
+remembered as missing until the version moves.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'role_permissions_version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'permissions': {}, 'misses': set(), 'checked_at': float('-inf')}
+
+
+def get_version():
+    return cache.get_or_set(VERSION_CACHE_KEY, time.time_ns, timeout=None)
+
+
+def _load(version):
+    from .models import Role
+
+    _state['permissions'] = dict(Role.objects.values_list('pk', 'permissions'))
+    if version != _state['version']:
+        _state['misses'] = set()
+    _state['version'] = version
+
+
+def _refresh():
+    with _lock:
+        now = time.monotonic()
+        if now - _state['checked_at'] < settings.ROLE_CACHE_CHECK_INTERVAL:
+            return
+        version = get_version()
+        if version != _state['version']:
+            _load(version)
+        _state['checked_at'] = now
+
+
+def get_role_permissions(role_id):
+    """The permission bitmask of the role with ``role_id`` (0 for ``None`` or an unknown id)."""
+    if role_id is None:
+        return 0
+    _refresh()
+    permissions = _state['permissions'].get(role_id)
+    if permissions is None:
+        with _lock:
+            if role_id not in _state['misses']:
+                # created after the last load
+                _load(get_version())
+                if role_id not in _state['permissions']:
+                    _state['misses'].add(role_id)
+            permissions = _state['permissions'].get(role_id, 0)
+    return permissions
+
+
+def clear_local():
+    """Drop this process's copy so the next check reloads it."""
+    with _lock:
+        _state['version'] = None
+        _state['checked_at'] = float('-inf')
+
+
+def invalidate():
+    """Make every process reload the roles on its next check."""
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+    clear_local()
@@ -6,9 +6,13 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.signals import user_login_failed
 from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
 
-from .models import CustomUser, Follow
+from .models import CustomUser, Follow, FollowSuggestion
+from .token import ClaimsRefreshToken
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -33,6 +37,23 @@ class UserLoginSerializer(serializers.Serializer):
         return user
 
 
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Issues the new access token with the user's current claims, not the ones in the refresh token."""
+
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = CustomUser.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        refresh.set_user_claims(user)
+        return {"access": str(refresh.access_token)}
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=True, validators=[UniqueValidator(queryset=CustomUser.objects.all())])
     username = serializers.CharField(max_length=50, validators=[UniqueValidator(queryset=CustomUser.objects.all())])
@@ -70,23 +91,61 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
 
-class FollowerListSerializer(serializers.ModelSerializer):
-    # follower = serializers.HyperlinkedIdentityField(view_name=)
+class FollowListSerializer(serializers.ModelSerializer):
+    """One side of a Follow row as a user card; ``user_field`` picks the side."""
+
+    user_field = None
+
+    username = serializers.SerializerMethodField()
+    avatar = serializers.SerializerMethodField()
+    profile_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Follow
-        fields = ["follower"]
+        fields = ["username", "avatar", "profile_url", "created_at"]
+
+    def get_user(self, obj):
+        return getattr(obj, self.user_field)
+
+    def get_username(self, obj):
+        return self.get_user(obj).username
+
+    def get_avatar(self, obj):
+        avatar = self.get_user(obj).avatar
+        return avatar.url if avatar else None
+
+    def get_profile_url(self, obj):
+        return reverse("auth:user-profile", args=[self.get_user(obj).username])
+
+
+class FollowerListSerializer(FollowListSerializer):
+    user_field = "follower"
+
+
+class FollowingListSerializer(FollowListSerializer):
+    user_field = "followed"
+
 
+class FollowSuggestionSerializer(FollowListSerializer):
+    user_field = "suggested"
 
-class FollowingListSerializer(serializers.ModelSerializer):
-    # followed = serializers.HyperlinkedIdentityField(view_name=)
     class Meta:
-        model = Follow
-        fields = ["followed"]
+        model = FollowSuggestion
+        fields = ["username", "avatar", "profile_url", "mutual_count"]
+
+
+class IsFollowingSerializer(serializers.Serializer):
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, max_length=settings.IS_FOLLOWING_MAX_USERNAMES
+    )
 
 
 class UserPublicProfileSeriallizer(serializers.ModelSerializer):
+    """The part of a profile anyone can see, cached by accounts.services."""
+
     avatar = serializers.SerializerMethodField()
     posts_that_write_by_user_url = serializers.SerializerMethodField()
+    number_of_posts = serializers.IntegerField(source="posts_count", read_only=True)
 
     class Meta:
         model = CustomUser
@@ -95,6 +154,9 @@ class UserPublicProfileSeriallizer(serializers.ModelSerializer):
             "bio",
             "avatar",
             "posts_that_write_by_user_url",
+            "number_of_posts",
+            "followers_count",
+            "following_count",
         ]
 
     def get_avatar(self, obj):
@@ -105,66 +167,17 @@ class UserPublicProfileSeriallizer(serializers.ModelSerializer):
         return reverse("blog:post-list") + "?" + urlencode({"search": obj.username})
 
 
-class UserPrivateProfileSerializer(UserPublicProfileSeriallizer):
+class UserPrivateProfileSerializer(serializers.ModelSerializer):
+    """The fields only the user and admins see, added to the public profile."""
+
     activate = serializers.SerializerMethodField()
-    premium = serializers.SerializerMethodField()
-    avatar = serializers.SerializerMethodField()
-    number_of_posts = serializers.SerializerMethodField()
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-    posts_that_write_by_user_url = serializers.SerializerMethodField()
-    likes_posts_url = serializers.SerializerMethodField()
-    follower_list_url = serializers.SerializerMethodField()
-    following_list_url = serializers.SerializerMethodField()
-    bookmarked_posts_list_url = serializers.SerializerMethodField()
-
-    class Meta(UserPublicProfileSeriallizer.Meta):
-        fields = UserPublicProfileSeriallizer.Meta.fields + [
-            "email",
-            "activate",
-            "premium",
-            "number_of_posts",
-            "followers_count",
-            "following_count",
-            "follower_list_url",
-            "following_list_url",
-            "bookmarked_posts_list_url",
-            "likes_posts_url",
-        ]
+    premium = serializers.BooleanField(source="is_premium", read_only=True)
+
+    class Meta:
+        model = CustomUser
+        fields = ["email", "activate", "premium"]
 
     def get_activate(self, obj):
         if obj.is_active:
             return True
         return reverse("auth:account-verify")
-
-    def get_premium(self, obj):
-        # TODO: Implement premium and point logic when required
-        return obj.is_premium
-
-    def get_avatar(self, obj):
-        # TODO: set settings.DEFAULT_USER_AVATAR
-        return obj.avatar.url if obj.avatar else None
-
-    def get_number_of_posts(self, obj):
-        return obj.posts.count()
-
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
-
-    def get_posts_that_write_by_user_url(self, obj):
-        return reverse("blog:post-list") + "?" + urlencode({"search": obj.username})
-
-    def get_likes_posts_url(self, obj):
-        return reverse("blog:user-likes")
-
-    def get_follower_list_url(self, obj):
-        return reverse("auth:follow-followers-list")
-
-    def get_following_list_url(self, obj):
-        return reverse("auth:follow-following-list")
-
-    def get_bookmarked_posts_list_url(self, obj):
-        return reverse("blog:user-bookmarks")
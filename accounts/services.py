@@ -0,0 +1,86 @@
+"""User profile payloads for UserProfileApiView.
+
+The public part of a profile is rendered once and cached per username,
+together with the user's id and the profile version it was rendered at.
+Anything that changes what the public profile shows (saving the user, a
+follow, a post created or deleted) calls ``invalidate_profile`` with the
+user's id, which moves the version; entries rendered at an older version
+are ignored and re-rendered on the next read. A public profile hit costs
+two cache reads and no query; a miss looks up the id first, because the
+version has to be read before the user is.
+
+Private fields are rendered separately, for the user and admins only.
+"""
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import CustomUser
+from .serializers import UserPrivateProfileSerializer, UserPublicProfileSeriallizer
+
+
+def get_profile_cache_key(username):
+    return f'user_profile_{username}'
+
+
+def get_profile_version_cache_key(user_id):
+    return f'user_profile_version_{user_id}'
+
+
+def get_profile_version(user_id):
+    return cache.get_or_set(get_profile_version_cache_key(user_id), time.time_ns, timeout=None)
+
+
+def invalidate_profile(*user_ids):
+    cache.set_many({get_profile_version_cache_key(user_id): time.time_ns() for user_id in user_ids}, timeout=None)
+
+
+def get_public_profile(username):
+    """``{'id': ..., 'data': {...}}`` for the user with ``username``, or ``None`` if there is none."""
+    profile = cache.get(get_profile_cache_key(username))
+    if profile is not None:
+        user_id = profile['id']
+    else:
+        user_id = CustomUser.objects.filter(username=username).values_list('id', flat=True).first()
+        if user_id is None:
+            return None
+
+    # read before the user, so a change made while rendering leaves the new entry outdated instead of current
+    version = get_profile_version(user_id)
+    if profile is not None and profile['version'] == version:
+        return profile
+
+    user = CustomUser.objects.filter(pk=user_id, username=username).only(
+        'id', 'username', 'bio', 'avatar', 'posts_count', 'followers_count', 'following_count'
+    ).first()
+    if user is None:
+        if profile is None:
+            return None
+        # renamed or deleted since the entry was cached
+        cache.delete(get_profile_cache_key(username))
+        return get_public_profile(username)
+
+    profile = {
+        'id': user.pk,
+        'version': version,
+        'data': UserPublicProfileSeriallizer(user).data,
+    }
+    cache.set(get_profile_cache_key(username), profile, timeout=settings.PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+@lru_cache(maxsize=None)
+def get_private_profile_links():
+    return {
+        'follower_list_url': reverse('auth:follow-followers-list'),
+        'following_list_url': reverse('auth:follow-following-list'),
+        'bookmarked_posts_list_url': reverse('blog:user-bookmarks'),
+        'likes_posts_url': reverse('blog:user-likes'),
+    }
+
+
+def get_private_profile(user):
+    return {**UserPrivateProfileSerializer(user).data, **get_private_profile_links()}
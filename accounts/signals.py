@@ -1,33 +1,77 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in, user_login_failed, user_logged_out
 from django.conf import settings
 
 from activity_log.models import ActivityLog
-from .models import CustomUser, Role
+from activity_log.writer import log_activity
+from . import role_cache
+from .services import invalidate_profile
+from .token import cache_token_version
+from .models import CustomUser, Follow, Role
 from .utils import get_client_ip
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     message = f"{user.username} is logged in with ip:{get_client_ip(request)}"
-    ActivityLog.objects.create(user=user, action_type=ActivityLog.Activity_Type.LOGIN, remarks=message)
+    log_activity(user=user, action_type=ActivityLog.Activity_Type.LOGIN, remarks=message)
 
 
 @receiver(user_login_failed)
 def log_user_login_failed(sender, credentials, request, **kwargs):
     ip_address = 'Unknown' if not request else get_client_ip(request)
     message = f"Login Attempt Failed for email {credentials.get('email')} with ip: {ip_address}"
-    ActivityLog.objects.create(action_type=ActivityLog.Activity_Type.LOGIN_FAILED, status=ActivityLog.Action_Status.FAILED,remarks=message)
+    log_activity(action_type=ActivityLog.Activity_Type.LOGIN_FAILED, status=ActivityLog.Action_Status.FAILED,remarks=message)
 
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
     message = f"{user.username} is logged out with ip:{get_client_ip(request)}"
-    ActivityLog.objects.create(user=user, action_type=ActivityLog.Activity_Type.LOGOUT, remarks=message)
+    log_activity(user=user, action_type=ActivityLog.Activity_Type.LOGOUT, remarks=message)
 
 @receiver(pre_save, sender=CustomUser)
 def set_default_role(sender, instance, **kwargs):
-    if not instance.role:
+    if instance.role_id is None:
         if not instance.is_superuser:
-            instance.role = Role.get_default_role_pk()
+            instance.role_id = Role.get_default_role_pk()
         else:
-            instance.role = Role.objects.get(name='Administrator')
\ No newline at end of file
+            instance.role = Role.objects.get(name='Administrator')
+
+
+@receiver(post_save, sender=CustomUser)
+def update_cached_token_version(sender, instance, created, **kwargs):
+    if getattr(instance, 'token_version_changed', False):
+        transaction.on_commit(lambda: cache_token_version(instance.pk, instance.token_version))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_profile(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: invalidate_profile(instance.pk))
+
+
+# Follow.objects.toggle moves the user counters inside its own statement;
+# these cover follows created or deleted through the ORM (admin, cascades).
+def _update_follow_counters(instance, delta):
+    CustomUser.objects.filter(pk=instance.follower_id).update(following_count=F('following_count') + delta)
+    CustomUser.objects.filter(pk=instance.followed_id).update(followers_count=F('followers_count') + delta)
+    transaction.on_commit(lambda: invalidate_profile(instance.follower_id, instance.followed_id))
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counters(sender, instance, created, **kwargs):
+    if created:
+        _update_follow_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counters(sender, instance, **kwargs):
+    _update_follow_counters(instance, -1)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_cache(sender, **kwargs):
+    role_cache.clear_local()
+    transaction.on_commit(role_cache.invalidate)
@@ -0,0 +1,153 @@
+"""Offline "people you may know" suggestions over the Follow graph.
+
+The follow edges are loaded once into NumPy arrays in CSR form: user pks
+are mapped to dense indices, ``indptr[i]:indptr[i + 1]`` slices the
+followed users of index ``i`` out of ``indices``. For every user the
+users followed by the users they follow are counted (the count is the
+number of mutual connections), the user themself and the users they
+already follow are dropped, and the top ``per_user`` are stored as
+FollowSuggestion rows.
+
+Users are processed in consecutive ranges whose second-degree walk holds
+at most ``max_pairs`` (user, candidate) pairs, so the working memory is
+bounded by ``max_pairs`` whatever the graph looks like; besides that only
+the edge arrays themselves (about 12 bytes per edge) are held. A user
+whose walk alone exceeds the budget is cut at ``max_pairs`` pairs.
+"""
+import logging
+
+import numpy as np
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 100000
+
+
+def load_follow_edges(batch_size=LOAD_BATCH_SIZE):
+    """The (follower_id, followed_id) pairs of every Follow row as two int64 arrays."""
+    followers, followed = [], []
+    last_pk = 0
+    while True:
+        rows = list(
+            Follow.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "follower_id", "followed_id")[:batch_size]
+        )
+        if not rows:
+            break
+        batch = np.array(rows, dtype=np.int64)
+        followers.append(batch[:, 1])
+        followed.append(batch[:, 2])
+        last_pk = rows[-1][0]
+    if not followers:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(followers), np.concatenate(followed)
+
+
+class FollowGraph:
+    def __init__(self, follower_ids, followed_ids):
+        # sorted pks; a user's dense index is their position here
+        self.user_ids, dense = np.unique(np.concatenate([follower_ids, followed_ids]), return_inverse=True)
+        self.size = len(self.user_ids)
+        sources = dense[: len(follower_ids)].astype(np.int32)
+        targets = dense[len(follower_ids):].astype(np.int32)
+
+        order = np.lexsort((targets, sources))
+        self.indices = targets[order]
+        self.degrees = np.bincount(sources, minlength=self.size).astype(np.int64)
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(self.degrees, out=self.indptr[1:])
+
+    @classmethod
+    def from_database(cls):
+        return cls(*load_follow_edges())
+
+    def second_degree_sizes(self):
+        """Number of (user, candidate) pairs the walk of every user produces."""
+        sizes = np.zeros(len(self.indices) + 1, dtype=np.int64)
+        np.cumsum(self.degrees[self.indices], out=sizes[1:])
+        return sizes[self.indptr[1:]] - sizes[self.indptr[:-1]]
+
+    def chunks(self, max_pairs):
+        """Consecutive ``(start, stop)`` index ranges whose walks hold at most ``max_pairs`` pairs."""
+        totals = np.cumsum(self.second_degree_sizes())
+        start = 0
+        while start < self.size:
+            done = totals[start - 1] if start else 0
+            stop = max(int(np.searchsorted(totals, done + max_pairs, side="right")), start + 1)
+            yield start, stop
+            start = stop
+
+    def _gather(self, starts, lengths):
+        """``indices[starts[i]:starts[i] + lengths[i]]`` for every ``i``, concatenated."""
+        total = int(lengths.sum())
+        offsets = np.cumsum(lengths) - lengths
+        return self.indices[np.arange(total) - np.repeat(offsets - starts, lengths)]
+
+    def suggest(self, start, stop, per_user, max_pairs):
+        """Top ``per_user`` suggestions of the users in ``start:stop``.
+
+        Returns ``(users, candidates, mutual_counts, ranks)`` as dense
+        indices, ordered by user and rank.
+        """
+        degrees = self.degrees[start:stop]
+        owners = np.repeat(np.arange(start, stop, dtype=np.int64), degrees)
+        friends = self.indices[self.indptr[start]:self.indptr[stop]]
+
+        lengths = self.degrees[friends]
+        overflow = int(lengths.sum()) - max_pairs
+        if overflow > 0:
+            # a single user over budget; their first friends' lists are taken whole, the rest cut
+            cut = np.cumsum(lengths)
+            lengths = np.clip(max_pairs - (cut - lengths), 0, lengths)
+        candidates = self._gather(self.indptr[friends], lengths).astype(np.int64)
+        keys = np.repeat(owners, lengths) * self.size + candidates
+        keys = keys[candidates != np.repeat(owners, lengths)]
+
+        keys, counts = np.unique(keys, return_counts=True)
+        existing = owners * self.size + friends
+        fresh = ~np.isin(keys, existing, assume_unique=True)
+        keys, counts = keys[fresh], counts[fresh]
+
+        users, candidates = np.divmod(keys, self.size)
+        # by user, then most mutual connections first, then lowest pk
+        order = np.lexsort((candidates, -counts, users))
+        users, candidates, counts = users[order], candidates[order], counts[order]
+        group_starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        ranks = np.arange(len(users)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(users)]))
+        keep = ranks < per_user
+        return users[keep], candidates[keep], counts[keep], ranks[keep]
+
+
+def compute_follow_suggestions(per_user, max_pairs, graph=None):
+    """Rebuild every FollowSuggestion row from the current Follow graph; returns the number written.
+
+    Each chunk replaces the suggestions of its pk range in one transaction,
+    so the endpoint keeps serving the previous results until then.
+    """
+    graph = graph if graph is not None else FollowGraph.from_database()
+    written = 0
+    last_pk = 0
+    for start, stop in graph.chunks(max_pairs):
+        users, candidates, counts, ranks = graph.suggest(start, stop, per_user, max_pairs)
+        user_ids, candidate_ids = graph.user_ids[users], graph.user_ids[candidates]
+        stop_pk = int(graph.user_ids[stop - 1])
+        rows = [
+            FollowSuggestion(user_id=user_id, suggested_id=suggested_id, mutual_count=count, rank=rank)
+            for user_id, suggested_id, count, rank in zip(
+                user_ids.tolist(), candidate_ids.tolist(), counts.tolist(), ranks.tolist()
+            )
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__gt=last_pk, user_id__lte=stop_pk).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+        last_pk = stop_pk
+
+    # users above the last one in the graph no longer follow anyone
+    FollowSuggestion.objects.filter(user_id__gt=last_pk).delete()
+    logger.info("wrote %s follow suggestions for %s users", written, graph.size)
+    return written
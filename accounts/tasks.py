@@ -7,6 +7,13 @@ from celery.utils.log import get_task_logger
 
 logger = get_task_logger(__name__)
 
+@shared_task
+def compute_follow_suggestions():
+    from .suggestions import compute_follow_suggestions
+
+    return compute_follow_suggestions(settings.FOLLOW_SUGGESTIONS_PER_USER, settings.FOLLOW_SUGGESTIONS_MAX_PAIRS)
+
+
 @shared_task
 def send_async_email_to_user(user_email, code):
     email = send_mail(
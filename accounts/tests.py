@@ -1,3 +1,590 @@
-from django.test import TestCase
+import base64
+import random
+import threading
+from collections import Counter
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+import fakeredis
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from blog.models import Post
+from core import throttling
+
+from . import revocation, role_cache, services
+from .models import CustomUser, Follow, Permission, Role
+from .revocation import RevocationLog
+from .suggestions import FollowGraph
+from .token import ClaimsRefreshToken, CustomJWTAuthenticationClass
+from .views import OTPRequestThrottle
+
+
+class RedisUserRateThrottleTests(SimpleTestCase):
+    """OTPRequestThrottle against an in-process Redis that runs the Lua script."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        patcher = mock.patch.object(throttling, "get_redis_connection", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        throttling.get_gcra_script.cache_clear()
+        self.addCleanup(throttling.get_gcra_script.cache_clear)
+
+        self.request = APIRequestFactory().get("/auth/account-verify/")
+        self.request.user = mock.Mock(pk=1, is_authenticated=True)
+
+    def check(self):
+        throttle = OTPRequestThrottle()
+        return throttle.allow_request(self.request, None), throttle
+
+    def test_allows_rate_then_throttles(self):
+        results = [self.check()[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        _, throttle = self.check()
+        self.assertGreater(throttle.wait(), 0)
+        self.assertLessEqual(throttle.wait(), 20)
+
+    def test_keeps_one_key_per_user(self):
+        for _ in range(10):
+            self.check()
+        self.assertEqual(self.redis.keys(), [b"throttle_otp_1"])
+        self.assertEqual(self.redis.type("throttle_otp_1"), b"string")
+
+    def test_concurrent_requests_are_counted_exactly(self):
+        allowed = []
+        barrier = threading.Barrier(20)
+
+        def request():
+            barrier.wait()
+            allowed.append(self.check()[0])
+
+        threads = [threading.Thread(target=request) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 3)
+
+
+class RevocationLogSyncTests(SimpleTestCase):
+    """Another process syncing while a writer has bumped the counter but not stored its entry yet."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.reader = RevocationLog()
+
+    def append_with_sync_in_between(self, writer, entry):
+        store_entry = cache.set
+
+        def sync_then_store(*args, **kwargs):
+            self.reader._sync()
+            return store_entry(*args, **kwargs)
+
+        with mock.patch.object(revocation.cache, "set", side_effect=sync_then_store):
+            writer.append(entry)
+
+    def test_entry_stored_after_a_sync_is_read_by_the_next_one(self):
+        self.append_with_sync_in_between(RevocationLog(), ("jti", "first", None))
+        self.assertNotIn("first", self.reader.jtis)
+        self.assertEqual(self.reader.version, 0)
+
+        self.reader._sync()
+        self.assertIn("first", self.reader.jtis)
+        self.assertEqual(self.reader.version, 1)
+
+    def test_entries_after_a_missing_one_are_applied_once(self):
+        cache.add(revocation.VERSION_CACHE_KEY, 0, timeout=None)
+        cache.incr(revocation.VERSION_CACHE_KEY)
+        writer = RevocationLog()
+        writer.append(("jti", "second", None))
+        writer.append(("tv", 7, 3))
+
+        for _ in range(3):
+            self.reader._sync()
+        self.assertIn("second", self.reader.jtis)
+        self.assertEqual(self.reader.token_versions, {7: 3})
+        self.assertEqual(len(self.reader.jtis), 1)
+        self.assertEqual(self.reader.version, 0)
+
+        cache.set(revocation.get_entry_cache_key(1), ("jti", "first", None))
+        self.reader._sync()
+        self.assertIn("first", self.reader.jtis)
+        self.assertEqual(len(self.reader.jtis), 2)
+        self.assertEqual(self.reader.version, 3)
+
+    def test_skips_an_entry_that_never_arrives(self):
+        cache.add(revocation.VERSION_CACHE_KEY, 0, timeout=None)
+        cache.incr(revocation.VERSION_CACHE_KEY)
+        RevocationLog().append(("jti", "second", None))
+
+        self.reader._sync()
+        self.assertEqual(self.reader.version, 0)
+        with mock.patch.object(revocation, "MISSING_ENTRY_TIMEOUT", 0):
+            self.reader._sync()
+        self.assertEqual(self.reader.version, 2)
+        self.assertIn("second", self.reader.jtis)
+        self.assertIsNone(self.reader.waiting)
+
+
+class RoleCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.roles = {role.pk: role.permissions for role in Role.objects.all()}
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear_local()
+        self.addCleanup(role_cache.clear_local)
+
+    def test_no_queries_after_warm_up(self):
+        with self.assertNumQueries(1):
+            role_cache.get_role_permissions(next(iter(self.roles)))
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual({pk: role_cache.get_role_permissions(pk) for pk in self.roles}, self.roles)
+            self.assertEqual(role_cache.get_role_permissions(None), 0)
+
+    def test_reload_after_invalidate(self):
+        role_id = next(iter(self.roles))
+        role_cache.get_role_permissions(role_id)
+        # a queryset update skips the signals that bump the version
+        Role.objects.filter(pk=role_id).update(permissions=1234)
+        with self.assertNumQueries(0):
+            self.assertEqual(role_cache.get_role_permissions(role_id), self.roles[role_id])
+
+        role_cache.invalidate()
+        with self.assertNumQueries(1):
+            self.assertEqual(role_cache.get_role_permissions(role_id), 1234)
+        with self.assertNumQueries(0):
+            self.assertEqual(role_cache.get_role_permissions(role_id), 1234)
+
+    def test_unknown_ids_reload_once_per_version(self):
+        unknown = max(self.roles) + 1
+        role_cache.get_role_permissions(next(iter(self.roles)))
+        with self.assertNumQueries(1):
+            self.assertEqual(role_cache.get_role_permissions(unknown), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(role_cache.get_role_permissions(unknown + 1), 0)
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(role_cache.get_role_permissions(unknown), 0)
+                self.assertEqual(role_cache.get_role_permissions(unknown + 1), 0)
+
+        # saving a role moves the version, which forgets the misses
+        role = Role.objects.create(name="Reviewer", permissions=8)
+        role_cache.invalidate()
+        with self.assertNumQueries(1):
+            self.assertEqual(role_cache.get_role_permissions(role.pk), 8)
+
+
+@override_settings(JWT_TOKEN_USER_MODE=True)
+class ClaimsTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.premium_role = Role.objects.get(name="PremiumUser")
+
+    def setUp(self):
+        cache.clear()
+        role_cache.clear_local()
+        revocation.revocation_log.reset(0)
+        self.addCleanup(revocation.revocation_log.reset, 0)
+        self.user = CustomUser.objects.create_user(email="user@example.com", username="user", password="password")
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return CustomJWTAuthenticationClass().authenticate(request)[0]
+
+    def assertRejected(self, token):
+        with self.assertRaises(AuthenticationFailed) as context:
+            self.authenticate(token)
+        self.assertEqual(context.exception.get_codes(), "token_not_valid")
+
+    def test_authenticates_without_queries(self):
+        role_cache.get_role_permissions(self.user.role_id)
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.refresh.access_token)
+            self.assertEqual(
+                (user.pk, user.username, user.email, user.role_id, user.is_premium, user.verified),
+                (self.user.pk, "user", "user@example.com", self.user.role_id, False, False),
+            )
+            self.assertTrue(user.can(Permission.LIKE))
+            self.assertFalse(user.can(Permission.WRITE))
+
+    def test_reading_a_deferred_field_loads_all_of_them(self):
+        user = self.authenticate(self.refresh.access_token)
+        self.assertIn("bio", user.get_deferred_fields())
+        with self.assertNumQueries(1):
+            self.assertEqual(user.bio, self.user.bio)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                (user.joined_at, user.posts_count, user.followers_count), (self.user.joined_at, 0, 0)
+            )
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_claim_changes_reject_older_tokens(self):
+        for field, value in (("role", self.premium_role), ("is_premium", True), ("is_active", False)):
+            with self.subTest(field=field):
+                user = CustomUser.objects.get(pk=self.user.pk)
+                token = ClaimsRefreshToken.for_user(user).access_token
+                self.authenticate(token)
+
+                setattr(user, field, value)
+                with self.captureOnCommitCallbacks(execute=True):
+                    user.save()
+                self.assertRejected(token)
+
+                setattr(user, field, getattr(self.user, field))
+                with self.captureOnCommitCallbacks(execute=True):
+                    user.save()
+
+    def test_other_changes_keep_the_token(self):
+        token = self.refresh.access_token
+        self.user.bio = "new bio"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_refresh_issues_current_claims(self):
+        self.user.role = self.premium_role
+        self.user.is_premium = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertRejected(self.refresh.access_token)
+
+        response = APIClient().post("/auth/token/refresh/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.json()["access"])
+        self.assertEqual((access["role"], access["premium"]), (self.premium_role.pk, True))
+        self.assertNotIn("perms", access)
+        user = self.authenticate(access)
+        self.assertTrue(user.can(Permission.WRITE))
+
+    def test_refresh_refuses_inactive_users(self):
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = APIClient().post("/auth/token/refresh/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"detail": "No active account found for the given token."})
+
+
+class UserCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        role = Role.objects.get(name="PremiumUser")
+        cls.author, cls.reader = (
+            CustomUser.objects.create_user(email=f"{name}@example.com", username=name, password="password", role=role)
+            for name in ("author", "reader")
+        )
+
+    def counters(self, user):
+        return CustomUser.objects.values_list("posts_count", "followers_count", "following_count").get(pk=user.pk)
+
+    def test_posts_count_follows_created_and_soft_deleted_posts(self):
+        posts = [
+            Post.objects.create(title=f"Post {index}", body="body", author=self.author, status=Post.Status.PUBLISHED)
+            for index in range(3)
+        ]
+        Post.objects.create(title="Inactive", body="body", author=self.author, is_active=False)
+        self.assertEqual(self.counters(self.author), (3, 0, 0))
+
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assertEqual(client.delete(f"/post/{posts[0].slug}/").status_code, 200)
+        self.assertEqual(self.counters(self.author), (2, 0, 0))
+        # already soft deleted
+        self.assertEqual(client.delete(f"/post/{posts[0].slug}/").status_code, 404)
+        self.assertEqual(self.counters(self.author), (2, 0, 0))
+
+        Post.objects.get(pk=posts[0].pk).delete()
+        posts[1].delete()
+        self.assertEqual(self.counters(self.author), (1, 0, 0))
+
+    def test_orm_follows_move_both_counters(self):
+        follow = Follow.objects.create(follower=self.reader, followed=self.author)
+        self.assertEqual(self.counters(self.author), (0, 1, 0))
+        self.assertEqual(self.counters(self.reader), (0, 0, 1))
+
+        follow.delete()
+        self.assertEqual(self.counters(self.author), (0, 0, 0))
+        self.assertEqual(self.counters(self.reader), (0, 0, 0))
+
+    def test_reconcile_fixes_drifted_rows(self):
+        Post.objects.create(title="Post", body="body", author=self.author)
+        Follow.objects.create(follower=self.reader, followed=self.author)
+        CustomUser.objects.filter(pk=self.author.pk).update(posts_count=7, followers_count=0)
+
+        self.assertEqual(CustomUser.objects.reconcile_counters(batch_size=1), 1)
+        self.assertEqual(self.counters(self.author), (1, 1, 0))
+        self.assertEqual(self.counters(self.reader), (0, 0, 1))
+        self.assertEqual(CustomUser.objects.reconcile_counters(), 0)
+
+    def test_full_save_of_stale_user_keeps_counters(self):
+        stale = CustomUser.objects.get(pk=self.author.pk)
+        Follow.objects.create(follower=self.reader, followed=self.author)
+        stale.bio = "Edited"
+        stale.save()
+
+        self.assertEqual(self.counters(self.author), (0, 1, 0))
+        self.assertEqual(CustomUser.objects.get(pk=self.author.pk).bio, "Edited")
+
+
+class FollowApiViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        role = Role.objects.get(name="PremiumUser")
+        cls.user = CustomUser.objects.create_user(
+            email="user@example.com", username="user", password="password", role=role
+        )
+        cls.others = [
+            CustomUser.objects.create_user(
+                email=f"other{index}@example.com", username=f"other{index}", password="password", role=role
+            )
+            for index in range(7)
+        ]
+        cls.follows = [Follow.objects.create(follower=cls.user, followed=other) for other in cls.others]
+        for other in cls.others[:3]:
+            Follow.objects.create(follower=other, followed=cls.user)
+        # a run of ties in the middle of the ordering
+        tied_at = cls.follows[2].created_at
+        Follow.objects.filter(pk__in=[follow.pk for follow in cls.follows[2:6]]).update(created_at=tied_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        role_cache.get_role_permissions(self.user.role_id)
+
+    def expected_following(self):
+        return list(
+            Follow.objects.filter(follower=self.user)
+            .order_by("-created_at", "-id")
+            .values_list("followed__username", flat=True)
+        )
+
+    def walk(self, url):
+        usernames, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            usernames += [row["username"] for row in response.data["results"]]
+            url, pages = response.data["next"], pages + 1
+        return usernames, pages
+
+    def test_following_pages_in_order_across_ties(self):
+        usernames, pages = self.walk("/auth/follow/following/?page_size=2")
+        self.assertEqual(usernames, self.expected_following())
+        self.assertEqual(pages, 4)
+
+    def test_following_cursor_is_stable_when_a_tie_is_added(self):
+        expected = self.expected_following()
+        first = self.client.get("/auth/follow/following/?page_size=3").data
+        # sorts ahead of the page already seen, so it shifts nothing after it
+        late = CustomUser.objects.create_user(email="late@example.com", username="late", password="password")
+        Follow.objects.filter(pk=Follow.objects.create(follower=self.user, followed=late).pk).update(
+            created_at=self.follows[2].created_at
+        )
+
+        usernames, _ = self.walk(first["next"])
+        self.assertEqual([row["username"] for row in first["results"]] + usernames, expected)
+
+    def test_following_pages_back_in_order(self):
+        first = self.client.get("/auth/follow/following/?page_size=3").data
+        second = self.client.get(first["next"]).data
+        third = self.client.get(second["next"]).data
+        self.assertEqual(self.client.get(third["previous"]).data["results"], second["results"])
+        self.assertEqual(self.client.get(second["previous"]).data["results"], first["results"])
+
+    def test_followers_lists_the_other_side(self):
+        response = self.client.get("/auth/follow/followers/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["username"] for row in response.data["results"]],
+            list(
+                Follow.objects.filter(followed=self.user)
+                .order_by("-created_at", "-id")
+                .values_list("follower__username", flat=True)
+            ),
+        )
+
+    def test_page_size_is_capped(self):
+        with mock.patch("accounts.pagination.FollowListPagination.max_page_size", 4):
+            response = self.client.get("/auth/follow/following/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 4)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_query_count_is_fixed_per_page(self):
+        # the follow rows joined to their users, whatever the page
+        with self.assertNumQueries(1):
+            first = self.client.get("/auth/follow/following/?page_size=2").data
+        with self.assertNumQueries(1):
+            self.client.get(first["next"])
+        with self.assertNumQueries(1):
+            self.client.get("/auth/follow/following/?page_size=7")
+
+    def test_invalid_cursor_is_not_found(self):
+        for position in ("not-a-position", "not-a-date|1"):
+            cursor = base64.b64encode(urlencode({"p": position}).encode()).decode()
+            response = self.client.get(f"/auth/follow/following/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404)
+
+    def test_is_following_answers_each_username_in_one_query(self):
+        Follow.objects.filter(follower=self.user, followed=self.others[1]).delete()
+        url = "/auth/follow/is_following/?usernames=other0&usernames=other1&usernames=nobody"
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"other0": True, "other1": False, "nobody": False})
+
+    def test_is_following_rejects_missing_or_too_many_usernames(self):
+        self.assertEqual(self.client.get("/auth/follow/is_following/").status_code, 400)
+
+        usernames = "&".join(f"usernames=user{index}" for index in range(settings.IS_FOLLOWING_MAX_USERNAMES + 1))
+        response = self.client.get(f"/auth/follow/is_following/?{usernames}")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("usernames", response.data)
+
+
+class PublicProfileCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.user = CustomUser.objects.create_user(email="user@example.com", username="user", password="password")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def change_bio_while_rendering(self, bio):
+        """Read the profile while the bio changes right after the user row was selected."""
+        changed = []
+
+        def change_after_select(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not changed and sql.startswith("SELECT") and '"bio"' in sql:
+                changed.append(True)
+                CustomUser.objects.filter(pk=self.user.pk).update(bio=bio)
+                services.invalidate_profile(self.user.pk)
+            return result
+
+        with connection.execute_wrapper(change_after_select):
+            profile = services.get_public_profile(self.user.username)
+        self.assertEqual(changed, [True])
+        return profile
+
+    def test_change_during_a_miss_is_not_cached_as_current(self):
+        self.assertEqual(self.change_bio_while_rendering("changed")["data"]["bio"], self.user.bio)
+        self.assertEqual(services.get_public_profile(self.user.username)["data"]["bio"], "changed")
+
+    def test_change_during_a_refresh_is_not_cached_as_current(self):
+        services.get_public_profile(self.user.username)
+        services.invalidate_profile(self.user.pk)
+        self.change_bio_while_rendering("changed")
+        self.assertEqual(services.get_public_profile(self.user.username)["data"]["bio"], "changed")
+
+    def test_hit_runs_no_query(self):
+        services.get_public_profile(self.user.username)
+        with self.assertNumQueries(0):
+            self.assertEqual(services.get_public_profile(self.user.username)["id"], self.user.pk)
+
+    def test_renamed_user(self):
+        services.get_public_profile(self.user.username)
+        CustomUser.objects.filter(pk=self.user.pk).update(username="renamed")
+        services.invalidate_profile(self.user.pk)
+        self.assertIsNone(services.get_public_profile("user"))
+        self.assertEqual(services.get_public_profile("renamed")["id"], self.user.pk)
+
+
+class FollowGraphTests(SimpleTestCase):
+    """FollowGraph.suggest against a plain Python walk of the same edges."""
+
+    def make_graph(self, edges):
+        self.following = {}
+        for follower, followed in edges:
+            self.following.setdefault(follower, set()).add(followed)
+        return FollowGraph(np.array([edge[0] for edge in edges]), np.array([edge[1] for edge in edges]))
+
+    def brute_force(self, user, per_user, max_pairs=None):
+        walk = [
+            candidate
+            for friend in sorted(self.following.get(user, ()))
+            for candidate in sorted(self.following.get(friend, ()))
+        ]
+        counts = Counter(
+            candidate
+            for candidate in walk[:max_pairs]
+            if candidate != user and candidate not in self.following[user]
+        )
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:per_user]
+
+    def suggestions(self, graph, per_user, max_pairs):
+        result = {}
+        for start, stop in graph.chunks(max_pairs):
+            users, candidates, counts, ranks = graph.suggest(start, stop, per_user, max_pairs)
+            for user, candidate, count, rank in zip(
+                graph.user_ids[users].tolist(), graph.user_ids[candidates].tolist(), counts.tolist(), ranks.tolist()
+            ):
+                self.assertEqual(rank, len(result.setdefault(user, [])))
+                result[user].append((candidate, count))
+        return result
+
+    def expected(self, per_user, max_pairs=None):
+        expected = {user: self.brute_force(user, per_user, max_pairs) for user in self.following}
+        return {user: suggestions for user, suggestions in expected.items() if suggestions}
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        # sparse pks, so dense indices and pks differ
+        edges = {(rng.randrange(60) * 3 + 7, rng.randrange(60) * 3 + 7) for _ in range(900)}
+        graph = self.make_graph([(follower, followed) for follower, followed in edges if follower != followed])
+        largest_walk = int(graph.second_degree_sizes().max())
+        for per_user in (1, 5):
+            for max_pairs in (10 ** 9, 4 * largest_walk, largest_walk):
+                with self.subTest(per_user=per_user, max_pairs=max_pairs):
+                    self.assertEqual(self.suggestions(graph, per_user, max_pairs), self.expected(per_user))
+
+    def test_excludes_self_and_followed_users(self):
+        # 1 reaches 1 back through 2, and 3 both directly and through 2
+        graph = self.make_graph([(1, 2), (1, 3), (2, 1), (2, 3), (2, 4), (3, 4)])
+        self.assertEqual(self.suggestions(graph, 10, 100)[1], [(4, 2)])
+
+    def test_ties_go_to_the_lowest_pk(self):
+        graph = self.make_graph([(1, 2), (1, 3), (2, 9), (2, 5), (3, 9), (3, 7), (3, 6)])
+        self.assertEqual(self.suggestions(graph, 10, 100)[1], [(9, 2), (5, 1), (6, 1), (7, 1)])
+        self.assertEqual(self.suggestions(graph, 2, 100)[1], [(9, 2), (5, 1)])
+
+    def test_chunks_cover_every_user_within_the_budget(self):
+        rng = random.Random(1)
+        graph = self.make_graph(list({(rng.randrange(40), rng.randrange(40)) for _ in range(300)}))
+        sizes = graph.second_degree_sizes()
+        for max_pairs in (1, 10, int(sizes.max()), 10 ** 9):
+            with self.subTest(max_pairs=max_pairs):
+                chunks = list(graph.chunks(max_pairs))
+                self.assertEqual([start for start, _ in chunks], [0] + [stop for _, stop in chunks[:-1]])
+                self.assertEqual(chunks[-1][1], graph.size)
+                for start, stop in chunks:
+                    # only a single user may go over the budget
+                    self.assertTrue(stop - start == 1 or sizes[start:stop].sum() <= max_pairs)
+
+    def test_single_user_over_budget_is_cut(self):
+        # 1 follows 2, 3 and 4, whose lists hold 3, 3 and 2 pairs
+        edges = [(1, 2), (1, 3), (1, 4), (2, 5), (2, 6), (2, 1), (3, 5), (3, 6), (3, 7), (4, 7), (4, 8)]
+        graph = self.make_graph(edges)
+        for max_pairs in (2, 3, 5, 7, 8):
+            with self.subTest(max_pairs=max_pairs):
+                self.assertEqual(
+                    self.suggestions(graph, 10, max_pairs).get(1, []), self.brute_force(1, 10, max_pairs)
+                )
@@ -1,24 +1,181 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.core.cache import cache
+from asgiref.sync import sync_to_async
 from rest_framework.exceptions import AuthenticationFailed
 
+from .revocation import get_blacklist_cache_key, publish_token_version, revocation_log, revoke_token
+
+
+def get_token_version_cache_key(user_id):
+    return f'user_token_version_{user_id}'
+
+
+def cache_token_version(user_id, version):
+    cache.set(get_token_version_cache_key(user_id), version, timeout=None)
+    publish_token_version(user_id, version)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry what permission checks need about the user.
+
+    ``tv`` is the user's ``token_version``; with ``JWT_TOKEN_USER_MODE`` the
+    authentication class rejects tokens whose version is behind, and the
+    client gets fresh claims from the refresh endpoint.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_user_claims(user)
+        return token
+
+    def set_user_claims(self, user):
+        self['username'] = user.username
+        self['email'] = user.email
+        self['role'] = user.role_id
+        self['premium'] = user.is_premium
+        self['verified'] = user.verified
+        self['tv'] = user.token_version
+
+
 class RedisBlackListMixin:
+    """Blacklist keyed by the token's jti, fronted by the in-process filter of accounts.revocation."""
+
     def is_token_blackedlisted(self, token):
-        return True if cache.get(token) else False
-    
+        jti = token[api_settings.JTI_CLAIM]
+        return revocation_log.might_be_revoked(jti) and bool(cache.get(get_blacklist_cache_key(jti)))
+
+    async def ais_token_blackedlisted(self, token):
+        jti = token[api_settings.JTI_CLAIM]
+        return revocation_log.might_be_revoked(jti) and bool(await cache.aget(get_blacklist_cache_key(jti)))
+
     def blacklist_token(self, token):
-        cache.set(token, 'blacked_list', timeout=60*60*24*7) # 7 days
+        revoke_token(token)
 
 class CustomJWTAuthenticationClass(JWTAuthentication, RedisBlackListMixin):
+    """JWT authentication with a Redis blacklist.
+
+    With ``JWT_TOKEN_USER_MODE`` a token issued by ``ClaimsRefreshToken``
+    authenticates without a user query: ``request.user`` is built from the
+    claims. The blacklist and the token version are answered by
+    accounts.revocation in memory; only what it cannot rule out is read from
+    the cache, in one round trip.
+    """
+
     def authenticate(self, request):
+        user = super().authenticate(request)
+        if user:
+            if revocation_log.needs_sync():
+                revocation_log.sync()
+            keys = self.get_cache_keys(user[1])
+            self.check_token(user[1], cache.get_many(keys) if keys else {})
+        return user
+
+    def get_cache_keys(self, validated_token):
+        keys = []
+        jti = validated_token[api_settings.JTI_CLAIM]
+        if revocation_log.might_be_revoked(jti):
+            keys.append(get_blacklist_cache_key(jti))
+        if self.uses_claims(validated_token) and self.is_version_current(validated_token) is None:
+            keys.append(get_token_version_cache_key(validated_token[api_settings.USER_ID_CLAIM]))
+        return keys
+
+    def check_token(self, validated_token, cached):
+        if cached.get(get_blacklist_cache_key(validated_token[api_settings.JTI_CLAIM])):
+            raise AuthenticationFailed('Token is blocked')
+        if self.uses_claims(validated_token):
+            current = self.is_version_current(validated_token)
+            if current is None:
+                user_id = validated_token[api_settings.USER_ID_CLAIM]
+                version = cached.get(get_token_version_cache_key(user_id))
+                if version is None:
+                    version = self.load_token_version(user_id)
+                current = validated_token['tv'] == version
+            if not current:
+                raise AuthenticationFailed('Token claims are outdated', code='token_not_valid')
+
+    @staticmethod
+    def is_version_current(validated_token):
+        return revocation_log.is_version_current(validated_token[api_settings.USER_ID_CLAIM], validated_token['tv'])
+
+    def load_token_version(self, user_id):
+        version = self.user_model.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        cache.set(get_token_version_cache_key(user_id), version, timeout=None)
+        return version
+
+    @staticmethod
+    def uses_claims(validated_token):
+        return settings.JWT_TOKEN_USER_MODE and 'tv' in validated_token
+
+    def get_user(self, validated_token):
         try:
-            user = super().authenticate(request)
-            if user:
-                if self.is_token_blackedlisted(user[1]):
-                    raise AuthenticationFailed('Token is blocked')
-                return user
-        except AuthenticationFailed as e:
-            raise e
-        except Exception as e:
-            raise e
-        return None
\ No newline at end of file
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if self.uses_claims(validated_token):
+            return self.user_model.from_token_claims(user_id, validated_token)
+
+        try:
+            user = self.user_model.objects.select_related('role').get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` for the async views in blog.async_views"""
+        header = self.get_header(request)
+        raw_token = header and self.get_raw_token(header)
+        if not raw_token:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if revocation_log.needs_sync():
+            await sync_to_async(revocation_log.sync)()
+        keys = self.get_cache_keys(validated_token)
+        cached = await cache.aget_many(keys) if keys else {}
+        if self.uses_claims(validated_token) and self.is_version_current(validated_token) is None:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            key = get_token_version_cache_key(user_id)
+            if key not in cached:
+                cached[key] = await self.aload_token_version(user_id)
+        self.check_token(validated_token, cached)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aload_token_version(self, user_id):
+        version = await self.user_model.objects.filter(pk=user_id, is_active=True).values_list(
+            'token_version', flat=True
+        ).afirst()
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        await cache.aset(get_token_version_cache_key(user_id), version, timeout=None)
+        return version
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if self.uses_claims(validated_token):
+            return self.user_model.from_token_claims(user_id, validated_token)
+
+        try:
+            user = await self.user_model.objects.select_related('role').aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
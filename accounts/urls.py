@@ -11,6 +11,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('login/', views.LoginApiView.as_view(), name='login'),
     path('logout/', views.LogoutApiView.as_view(), name='logout'),
+    path('token/refresh/', views.TokenRefreshApiView.as_view(), name='token-refresh'),
     path('register/', views.RegistrationApiView.as_view(), name='register'),
     path('account-verify/', views.AccountVerificationApiView.as_view(), name='account-verify'),
     path('user/change-password/', views.ChangePasswordApiView.as_view(), name='change-password'),
@@ -1,25 +1,27 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.core.cache import cache
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.urls import resolve
-from rest_framework import mixins, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from activity_log.mixins import ActivityLogMixin
 from activity_log.models import ActivityLog
+from core.throttling import RedisUserRateThrottle
 from notifications.utils import send_notification
 
 from . import serializers
-from .models import CustomUser, Follow, Permission
+from .models import CustomUser, Follow, FollowSuggestion, Permission
+from .pagination import FollowListPagination
 from .permissions import NotAuthenticatedUserOnly, NotVerifiedAccountOnly, VerifiedAccountOnly
+from .services import get_private_profile, get_public_profile, invalidate_profile
 from .tasks import send_async_email_to_user
-from .token import CustomJWTAuthenticationClass
+from .token import ClaimsRefreshToken, CustomJWTAuthenticationClass
 
 
 class LoginApiView(APIView):
@@ -35,7 +37,7 @@ class LoginApiView(APIView):
 
         data = customuser_serializer.data
         data.pop("id")
-        token = RefreshToken.for_user(user)
+        token = ClaimsRefreshToken.for_user(user)
 
         user_logged_in.send(user.__class__, request=request, user=user)
 
@@ -44,14 +46,17 @@ class LoginApiView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class TokenRefreshApiView(TokenRefreshView):
+    serializer_class = serializers.TokenRefreshSerializer
+
+
 class LogoutApiView(APIView):
     permission_classes = (IsAuthenticated,)
     authentication_classes = (CustomJWTAuthenticationClass,)
 
     def post(self, request):
         try:
-            access_token = request.headers.get("Authorization").split(" ")[1]
-            CustomJWTAuthenticationClass().blacklist_token(access_token)
+            CustomJWTAuthenticationClass().blacklist_token(request.auth)
 
             user_logged_out.send(request.user.__class__, request=request, user=request.user)
 
@@ -74,10 +79,11 @@ class RegistrationApiView(ActivityLogMixin, APIView):
         return f"User: {self._get_user_mixin(request)} \
             -- Action Type: {'Sign up to Website'} \
             -- Path: {request.path} \
-            -- Path Name: {resolve(request.path_info).url_name}"
+            -- Path Name: {request.resolver_match.url_name}"
 
 
-class OTPRequestThrottle(UserRateThrottle):
+class OTPRequestThrottle(RedisUserRateThrottle):
+    scope = "otp"
     rate = "3/minute"
 
 
@@ -119,7 +125,7 @@ class AccountVerificationApiView(ActivityLogMixin, APIView):
                     else 'Request OTP Code To Activate Account'
                         } \
             -- Path: {request.path} \
-            -- Path Name: {resolve(request.path_info).url_name}"
+            -- Path Name: {request.resolver_match.url_name}"
 
 
 class ChangePasswordApiView(ActivityLogMixin, GenericAPIView):
@@ -152,12 +158,13 @@ class ChangePasswordApiView(ActivityLogMixin, GenericAPIView):
             return f"User: {self._get_user_mixin(request)} \
                 -- Action Type: {'Change Password'} \
                 -- Path: {request.path} \
-                -- Path Name: {resolve(request.path_info).url_name}"
+                -- Path Name: {request.resolver_match.url_name}"
         return super()._build_log_message(request)
 
 
 class FollowApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = FollowListPagination
     lookup_field = "username"
     lookup_url_kwarg = "username"
     FOLLOWING = False
@@ -173,31 +180,64 @@ class FollowApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.GenericViewSet)
         if followed_user == follower_user:
             return Response({"error": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        self.follow_obj, created = Follow.objects.get_or_create(follower=follower_user, followed=followed_user)
-        if not created:
+        self.followed_username = followed_user.username
+        created, deleted = Follow.objects.toggle(follower_user, followed_user)
+        invalidate_profile(follower_user.pk, followed_user.pk)
+        if deleted:
             self.FOLLOWING = False
-            self.unfollowed_user = self.follow_obj.followed.username
-            self.follow_obj.delete()
             self._send_message_to_notifiaction(request.user, followed_user, self.FOLLOWING)
 
             return Response({"success": "You have unfollowed this user."}, status=status.HTTP_200_OK)
         self.FOLLOWING = True
-        self._send_message_to_notifiaction(request.user, followed_user, self.FOLLOWING)
+        if created:
+            self._send_message_to_notifiaction(request.user, followed_user, self.FOLLOWING)
 
         return Response({"success": "You are now following this user."}, status=status.HTTP_201_CREATED)
 
-    def _get_follow_list(self, query_param, serializer_class):
-        follow_list = Follow.objects.filter(**{query_param: self.request.user})
-        serializer = serializer_class(follow_list, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def _get_follow_list(self, query_param, user_field, serializer_class):
+        follow_list = (
+            Follow.objects.filter(**{query_param: self.request.user})
+            .select_related(user_field)
+            .only("id", "created_at", f"{user_field}__username", f"{user_field}__avatar")
+        )
+        page = self.paginate_queryset(follow_list)
+        serializer = serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(methods=["GET"], detail=False, url_path="followers", url_name="followers-list")
     def followers_list(self, request):
-        return self._get_follow_list("followed", serializers.FollowerListSerializer)
+        return self._get_follow_list("followed", "follower", serializers.FollowerListSerializer)
 
     @action(methods=["GET"], detail=False, url_path="following", url_name="following-list")
     def following_list(self, request):
-        return self._get_follow_list("follower", serializers.FollowingListSerializer)
+        return self._get_follow_list("follower", "followed", serializers.FollowingListSerializer)
+
+    @action(methods=["GET"], detail=False, url_path="suggestions", url_name="suggestions")
+    def suggestions(self, request):
+        """Users followed by people the user follows, precomputed by accounts.suggestions."""
+        suggestions = (
+            FollowSuggestion.objects.filter(user=request.user, suggested__is_active=True)
+            .exclude(suggested__following__follower=request.user)
+            .select_related("suggested")
+            .only("mutual_count", "suggested__username", "suggested__avatar")
+            .order_by("rank")
+        )
+        serializer = serializers.FollowSuggestionSerializer(suggestions, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=False, url_path="is_following", url_name="is-following")
+    def is_following(self, request):
+        """Which of ``?usernames=a&usernames=b`` the user follows, answered with one query."""
+        serializer = serializers.IsFollowingSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        usernames = serializer.validated_data["usernames"]
+
+        followed = set(
+            Follow.objects.filter(follower=request.user, followed__username__in=usernames).values_list(
+                "followed__username", flat=True
+            )
+        )
+        return Response({username: username in followed for username in usernames}, status=status.HTTP_200_OK)
 
     @staticmethod
     def _send_message_to_notifiaction(sendedr_user, receiver_user, action):
@@ -217,30 +257,24 @@ class FollowApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.GenericViewSet)
             return super()._build_log_message(request)
 
         return f"User: {self._get_user_mixin(request)} \
-            -- Action Type: 'Following {self.follow_obj.follower.username}' \
-                if self.FOLLOWING else \
-                'Unfollow {self.unfollowed_user}' \
+            -- Action Type: {'Following' if self.FOLLOWING else 'Unfollow'} {self.followed_username} \
             -- Path: {request.path} \
-            -- Path Name: {resolve(request.path_info).url_name}"
-
-
-class UserProfileApiView(ActivityLogMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+            -- Path Name: {request.resolver_match.url_name}"
 
-    def get_queryset(self):
-        return CustomUser.objects.all()
 
-    def get_object(self):
-        return get_object_or_404(self.get_queryset(), username=self.kwargs.get("username"))
+class UserProfileApiView(ActivityLogMixin, viewsets.GenericViewSet):
+    log_model = CustomUser
 
-    def get_serializer_class(self, *args, **kwargs):
-        user = self.request.user
+    def retrieve(self, request, username=None):
+        profile = get_public_profile(username)
+        if profile is None:
+            raise Http404
+        self.log_object_id = profile["id"]
 
-        if self.get_object() == user or (user.is_authenticated and user.can(Permission.ADMIN)):
-            return serializers.UserPrivateProfileSerializer
-        return serializers.UserPublicProfileSeriallizer
-
-    def retrieve(self, request, *args, **kwargs):
-        user_obj = self.get_object()
-        serializer = self.get_serializer(user_obj)
-        print(serializer.data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = dict(profile["data"])
+        user = request.user
+        if user.pk == profile["id"]:
+            data.update(get_private_profile(user))
+        elif user.is_authenticated and user.can(Permission.ADMIN):
+            data.update(get_private_profile(CustomUser.objects.get(pk=profile["id"])))
+        return Response(data, status=status.HTTP_200_OK)
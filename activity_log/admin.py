@@ -1,13 +1,23 @@
 from django.contrib import admin
-from django.contrib.contenttypes.models import ContentType
-from django.urls import reverse
-from django.utils.html import format_html, urlencode
+from django.contrib.admin.views.main import ChangeList
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import format_html
 
-from .models import ActivityLog
+from core.admin_tools import ScaleModeAdmin
+
+from .models import ActivityLog, ActivityLogDailySummary
+from .utils import attach_content_objects, get_content_object_label
+
+
+class ActivityLogChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # one in_bulk query per content type on the page instead of one query per row
+        self.result_list = attach_content_objects(self.result_list)
 
 
 @admin.register(ActivityLog)
-class ActivityLogModelAdmin(admin.ModelAdmin):
+class ActivityLogModelAdmin(ScaleModeAdmin):
     list_display = [
         "get_user",
         "action_type",
@@ -17,25 +27,36 @@ class ActivityLogModelAdmin(admin.ModelAdmin):
         "action_time",
     ]
     list_filter = ["action_type", "status", "action_time"]
-    search_fields = ["user"]
+    search_fields = ["user__username"]
     show_facets = admin.ShowFacets.ALLOW
     list_per_page = 50
     list_select_related = ["user", "content_type"]
+    autocomplete_fields = ["user"]
+
+    def get_changelist(self, request, **kwargs):
+        return ActivityLogChangeList
 
     @admin.display(description="Model Instance")
     def get_content_object_link(self, obj):
+        content_object = obj.content_object
+        if content_object is None:
+            return None
+
+        label = get_content_object_label(content_object)[:20]
+        content_type = obj.content_type
         try:
-            obj_content_type = ContentType.objects.get_for_model(obj.content_object)
-            url = reverse(
-                f"admin:{obj_content_type.app_label}_{obj_content_type.model}_change",
-                args=[obj.object_id],
-            )
-            return format_html(
-                f'<a href="{url}">{obj.content_object.__str__()[:20]} ...</a>'
-            )
-        except AttributeError:
-            return obj.content_object
+            url = reverse(f"admin:{content_type.app_label}_{content_type.model}_change", args=[obj.object_id])
+        except NoReverseMatch:
+            return label
+        return format_html('<a href="{}">{} ...</a>', url, label)
 
     @admin.display(description="User")
     def get_user(self, obj):
         return obj.user.username if obj.user else "Unknown user"
+
+
+@admin.register(ActivityLogDailySummary)
+class ActivityLogDailySummaryModelAdmin(ScaleModeAdmin):
+    list_display = ["day", "action_type", "status", "count", "users_count"]
+    list_filter = ["action_type", "status"]
+    date_hierarchy = "day"
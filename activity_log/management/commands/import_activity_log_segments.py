@@ -0,0 +1,62 @@
+import glob
+import gzip
+import os
+
+import orjson
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from activity_log.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = "Load JSONL activity log segments written by the file sink into the ActivityLog table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="segment files, or directories to take *.jsonl.gz segments from")
+        parser.add_argument('--delete', action='store_true', help="remove each segment once it is imported")
+
+    def handle(self, *args, **options):
+        for path in self.get_segments(options['paths']):
+            with transaction.atomic():
+                count = self.import_segment(path)
+            if options['delete']:
+                os.remove(path)
+            self.stdout.write(f"imported {count} entries from {path}")
+
+    @staticmethod
+    def get_segments(paths):
+        for path in paths:
+            if os.path.isdir(path):
+                # the segment a process is still appending to is never gzipped
+                yield from sorted(glob.glob(os.path.join(path, '*.jsonl.gz')))
+            else:
+                yield path
+
+    @staticmethod
+    def read_records(path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as segment:
+            for line in segment:
+                if line.strip():
+                    yield orjson.loads(line)
+
+    def import_segment(self, path):
+        columns = [field.attname for field in ActivityLog._meta.concrete_fields if not field.primary_key]
+        if connection.vendor != 'postgresql':
+            logs = [ActivityLog(**record) for record in self.read_records(path)]
+            ActivityLog.objects.bulk_create(logs, batch_size=1000)
+            return len(logs)
+
+        quote_name = connection.ops.quote_name
+        sql = (
+            f"COPY {quote_name(ActivityLog._meta.db_table)} "
+            f"({', '.join(quote_name(column) for column in columns)}) FROM STDIN"
+        )
+        count = 0
+        with connection.cursor() as cursor, cursor.copy(sql) as copy:
+            for record in self.read_records(path):
+                record['data'] = orjson.dumps(record.get('data') or {}).decode()
+                copy.write_row([record.get(column) for column in columns])
+                count += 1
+        return count
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from activity_log.partitions import is_partitioned, ensure_partitions, expire_partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming ActivityLog month partitions and roll up, detach or drop expired ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=None)
+        parser.add_argument('--retention-months', type=int, default=None)
+        parser.add_argument('--detach-only', action='store_true', help="keep expired partitions as detached tables")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stderr.write("activity log table is not partitioned, nothing to do")
+            return
+
+        for month in ensure_partitions(options['months_ahead']):
+            self.stdout.write(f"created partition for {month:%Y-%m}")
+
+        drop = False if options['detach_only'] else None
+        for month in expire_partitions(options['retention_months'], drop=drop):
+            self.stdout.write(f"expired partition for {month:%Y-%m}")
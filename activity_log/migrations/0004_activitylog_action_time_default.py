@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_log', '0003_alter_activitylog_action_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,151 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:34
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def partition_activity_log(apps, schema_editor):
+    """Swap activity_log_activitylog for a copy range-partitioned by month on action_time.
+
+    Postgres needs the partition key in the primary key, so it becomes
+    (id, action_time). Django keeps addressing rows by id alone.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    ActivityLog = apps.get_model("activity_log", "ActivityLog")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    qn = schema_editor.quote_name
+    table = ActivityLog._meta.db_table
+    old = f"{table}_unpartitioned"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        for index in ActivityLog._meta.indexes:
+            cursor.execute(f"DROP INDEX {qn(index.name)}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY) "
+            f"PARTITION BY RANGE (action_time)"
+        )
+        # the renamed table still holds the <table>_pkey name
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_partitioned_pkey')} PRIMARY KEY (id, action_time)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_user_id_fk')} "
+            f"FOREIGN KEY (user_id) REFERENCES {qn(User._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_content_type_id_fk')} "
+            f"FOREIGN KEY (content_type_id) REFERENCES {qn(ContentType._meta.db_table)} (id) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE INDEX {qn(table + '_content_type_id_idx')} ON {qn(table)} (content_type_id)")
+        for index in ActivityLog._meta.indexes:
+            cursor.execute(str(index.create_sql(ActivityLog, schema_editor)))
+
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        # one partition per month that has rows, up to next month
+        cursor.execute(f"SELECT min(action_time) FROM {qn(old)}")
+        oldest = cursor.fetchone()[0]
+        today = datetime.date.today()
+        month = datetime.date(oldest.year, oldest.month, 1) if oldest else datetime.date(today.year, today.month, 1)
+        last = datetime.date(today.year + today.month // 12, today.month % 12 + 1, 1)
+        while month <= last:
+            following = datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            cursor.execute(
+                f"CREATE TABLE {qn(f'{table}_p{month.year}_{month.month:02d}')} PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM (%s::timestamptz) TO (%s::timestamptz)",
+                [month.isoformat(), following.isoformat()],
+            )
+            month = following
+
+        cursor.execute(f"INSERT INTO {qn(table)} OVERRIDING SYSTEM VALUE SELECT * FROM {qn(old)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {qn(table)}",
+            [table],
+        )
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+
+def unpartition_activity_log(apps, schema_editor):
+    """Copy the rows of every attached partition back into a plain table keyed on id."""
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    ActivityLog = apps.get_model("activity_log", "ActivityLog")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    qn = schema_editor.quote_name
+    table = ActivityLog._meta.db_table
+    partitioned = f"{table}_partitioned"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(partitioned)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} "
+            f"(LIKE {qn(partitioned)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY)"
+        )
+        cursor.execute(f"INSERT INTO {qn(table)} OVERRIDING SYSTEM VALUE SELECT * FROM {qn(partitioned)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {qn(table)}",
+            [table],
+        )
+        # drops the partitions and the indexes and constraints named below with it
+        cursor.execute(f"DROP TABLE {qn(partitioned)}")
+
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id)")
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_user_id_fk')} "
+            f"FOREIGN KEY (user_id) REFERENCES {qn(User._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_content_type_id_fk')} "
+            f"FOREIGN KEY (content_type_id) REFERENCES {qn(ContentType._meta.db_table)} (id) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE INDEX {qn(table + '_content_type_id_idx')} ON {qn(table)} (content_type_id)")
+        for index in ActivityLog._meta.indexes:
+            cursor.execute(str(index.create_sql(ActivityLog, schema_editor)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_log', '0004_activitylog_action_time_default'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLogDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action_type', models.CharField(choices=[('CREATE', 'Create'), ('READ', 'Read'), ('UPDATE', 'Update'), ('DELETE', 'Delete'), ('LOGIN', 'Login'), ('LOGOUT', 'Logout'), ('LOGIN_FAIL', 'Login Failed'), ('LIKE', 'Like'), ('UN_LIKE', 'Un Like'), ('FOLLOW', 'Follow'), ('UN_FOLLOW', 'Un Follow'), ('BOOKMARK', 'Bookmark'), ('UN_BOOKMARK', 'Un bookmark'), ('COMMENT', 'Comment')], max_length=20)),
+                ('status', models.CharField(blank=True, choices=[('SUCC', 'Success'), ('FAIL', 'Failed')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('users_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'activity log daily summaries',
+                'ordering': ('-day',),
+            },
+        ),
+        migrations.RunPython(partition_activity_log, unpartition_activity_log),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['-action_time'], name='activity_lo_action__0a124f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='activitylogdailysummary',
+            constraint=models.UniqueConstraint(fields=('day', 'action_type', 'status'), name='activity_log_summary_unique_day'),
+        ),
+    ]
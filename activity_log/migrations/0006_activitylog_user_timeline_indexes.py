@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_log', '0005_partition_activitylog_by_month'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='activitylog',
+            name='activity_lo_user_id_6e217e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', '-action_time'], name='activity_lo_user_id_c6c0fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'action_type', '-action_time'], name='activity_lo_user_id_2fd176_idx'),
+        ),
+    ]
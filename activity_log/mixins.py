@@ -1,15 +1,32 @@
 import logging
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.urls import resolve
 from django.contrib.contenttypes.models import ContentType
-from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import AnonymousUser
 
 from .models import ActivityLog
+from .writer import alog_activity, log_activity
 
 class ActivityLogMixin:
+    """Log every authenticated request once the response is ready.
+
+    Everything the entry needs is picked up while the request runs, so logging
+    adds no queries: ``get_object`` keeps the object it returns in
+    ``log_object`` (views with their own ``get_object`` set it themselves), the
+    content type comes from ``log_model`` or the object's class, and the url
+    name from ``request.resolver_match``.
+    """
+
     log_message = None
+    log_model = None
+    log_object = None
+    # for views that know the id without loading the object
+    log_object_id = None
+
+    def get_object(self):
+        self.log_object = super().get_object()
+        return self.log_object
 
     def _get_action_type(self, request):
         return self.action_type_mapper().get(f"{request.method.upper()}")
@@ -19,7 +36,7 @@ class ActivityLogMixin:
             User: {self._get_user_mixin(request)} \
             -- Action Type: {self._get_action_type(request)} \
             -- Path: {request.path} \
-            -- Path Name: {resolve(request.path_info).url_name}'
+            -- Path Name: {request.resolver_match.url_name}'
     
     def get_log_message(self, request):
         return self.log_message or self._build_log_messsage(request)
@@ -39,44 +56,77 @@ class ActivityLogMixin:
     def _get_user_mixin(request):
         return request.user if request.user.is_authenticated else None
     
+    def get_log_model(self):
+        if self.log_model is not None:
+            return self.log_model
+        if self.log_object is not None:
+            return type(self.log_object)
+        queryset = getattr(self, 'queryset', None)
+        return queryset.model if queryset is not None else None
+
     def _get_content_type(self, data):
-        try:
-            data['content_type'] = ContentType.objects.get_for_model(self.get_queryset().model)
-        except (AttributeError, ValidationError):
-            data['content_type'] = None
-        except :
-            pass
+        model = self.get_log_model()
+        # ContentType.objects caches per model, so this is a query only the first time
+        data['content_type'] = ContentType.objects.get_for_model(model) if model is not None else None
         return data
     
     def _get_object_id(self, data):
-        try:
-            data['object_id'] = self.get_object().pk
-        except:
-            pass
+        data['object_id'] = self.log_object.pk if self.log_object is not None else self.log_object_id
         return data
     
+    def get_log_data(self, request, response):
+        data = {
+            'user': request.user,
+            'action_type': self._get_action_type(request),
+            'status': (
+                ActivityLog.Action_Status.SUCCESS
+                if response.status_code < 400
+                else ActivityLog.Action_Status.FAILED
+                ),
+            'remarks': self.get_log_message(request),
+            }
+        data = self._get_content_type(data)
+        data = self._get_object_id(data)
+        return data
+
     def _write_log(self, request, response):
         user = self._get_user_mixin(request)
 
         if user:
             logging.info('Logging... ')
-            data = {
-                'user': request.user,
-                'action_type': self._get_action_type(request),
-                'status': (
-                    ActivityLog.Action_Status.SUCCESS
-                    if response.status_code < 400
-                    else ActivityLog.Action_Status.FAILED
-                    ),
-                'remarks': self.get_log_message(request),
-                }
-            data = self._get_content_type(data)
-            data = self._get_object_id(data)
-            return ActivityLog.objects.create(**data)
+            return log_activity(view_name=request.resolver_match.url_name, **self.get_log_data(request, response))
     
     def finalize_response(self, request, *args, **kwargs):
         response = super().finalize_response(request, *args, **kwargs)
-        print(response)
         self._write_log(request, response)
         return response
-    
+
+
+class AsyncActivityLogMixin:
+    """READ logging for the plain async views in blog.async_views, same entries as ActivityLogMixin."""
+
+    log_model = None
+
+    async def awrite_log(self, request, response, object_id=None):
+        user = request.user
+        if not user.is_authenticated:
+            return None
+
+        remarks = f'\
+            User: {user} \
+            -- Action Type: {ActivityLog.Activity_Type.READ} \
+            -- Path: {request.path} \
+            -- Path Name: {request.resolver_match.url_name}'
+        return await alog_activity(
+            view_name=request.resolver_match.url_name,
+            user=user,
+            action_type=ActivityLog.Activity_Type.READ,
+            status=(
+                ActivityLog.Action_Status.SUCCESS
+                if response.status_code < 400
+                else ActivityLog.Action_Status.FAILED
+            ),
+            remarks=remarks,
+            content_type=await sync_to_async(ContentType.objects.get_for_model)(self.log_model),
+            object_id=object_id,
+        )
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
@@ -27,7 +28,7 @@ class ActivityLog(models.Model):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='activities', null=True)
     action_type = models.CharField(choices=Activity_Type.choices, max_length=20)
-    action_time = models.DateTimeField(auto_now_add=True)
+    action_time = models.DateTimeField(default=timezone.now)
     remarks = models.TextField(blank=True, null=True)
     status = models.CharField(choices=Action_Status.choices, max_length=10, blank=True, null=True)
     data = models.JSONField(default=dict, blank=True)
@@ -38,12 +39,33 @@ class ActivityLog(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=('user', )),
-            models.Index(fields=('action_type', ))
+            models.Index(fields=('user', '-action_time')),
+            models.Index(fields=('user', 'action_type', '-action_time')),
+            models.Index(fields=('action_type', )),
+            models.Index(fields=('-action_time', )),
         ]
 
         ordering = ('-action_time', )
 
     def __str__(self):
         user = self.user.username if self.user else 'Unknown User'
-        return f'{self.action_type} by {user} on {self.action_time}'
\ No newline at end of file
+        return f'{self.action_type} by {user} on {self.action_time}'
+
+class ActivityLogDailySummary(models.Model):
+    """Daily per-action counts, written before an ActivityLog month partition is dropped."""
+
+    day = models.DateField()
+    action_type = models.CharField(choices=ActivityLog.Activity_Type.choices, max_length=20)
+    status = models.CharField(choices=ActivityLog.Action_Status.choices, max_length=10, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    users_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('day', 'action_type', 'status'), name='activity_log_summary_unique_day'),
+        ]
+        ordering = ('-day', )
+        verbose_name_plural = 'activity log daily summaries'
+
+    def __str__(self):
+        return f'{self.action_type} on {self.day}: {self.count}'
@@ -0,0 +1,9 @@
+from core.pagination import KeysetCursorPagination
+
+
+class ActivityTimelinePagination(KeysetCursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    # matches the (user, action_time DESC) indexes, id breaks ties within the same instant
+    ordering = ('-action_time', '-id')
@@ -0,0 +1,154 @@
+"""Monthly range partitions of the activity log table.
+
+``activity_log_activitylog`` is partitioned by ``action_time`` (migration
+0005). Each month lives in ``activity_log_activitylog_pYYYY_MM``, and rows
+outside every month partition land in ``activity_log_activitylog_default``.
+Old months are rolled up into ``ActivityLogDailySummary`` and then detached,
+and optionally dropped, so retention never runs a ``DELETE`` over the table.
+"""
+import datetime
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import ActivityLog, ActivityLogDailySummary
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME_RE = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{ActivityLog._meta.db_table}_p{month.year}_{month.month:02d}"
+
+
+def default_partition_name():
+    return f"{ActivityLog._meta.db_table}_default"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [ActivityLog._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def get_month_partitions():
+    """Months that have an attached partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [ActivityLog._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(month):
+    """Create and attach the partition for ``month``.
+
+    Rows of that month that already sit in the default partition are moved
+    into the new one first, otherwise Postgres refuses to attach it. The
+    default partition stays locked against writes until the attach commits.
+    """
+    quote_name = connection.ops.quote_name
+    parent = quote_name(ActivityLog._meta.db_table)
+    name = quote_name(partition_name(month))
+    default = quote_name(default_partition_name())
+    bounds = [month.isoformat(), add_months(month, 1).isoformat()]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(
+            f"WITH moved AS ("
+            f"DELETE FROM {default} WHERE action_time >= %s::timestamptz AND action_time < %s::timestamptz "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM (%s::timestamptz) TO (%s::timestamptz)",
+            bounds,
+        )
+
+
+def ensure_partitions(months_ahead=None, today=None):
+    """Make sure the current month and the next ``months_ahead`` months have partitions."""
+    if months_ahead is None:
+        months_ahead = settings.ACTIVITY_LOG_PARTITIONS_AHEAD
+    current = month_start(today or datetime.date.today())
+    existing = set(get_month_partitions())
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            create_partition(month)
+            created.append(month)
+    return created
+
+
+def summarize_partition(month):
+    """Write the daily per-action counts of ``month`` into ActivityLogDailySummary."""
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote_name(ActivityLogDailySummary._meta.db_table)} "
+            f"(day, action_type, status, count, users_count) "
+            f"SELECT (action_time AT TIME ZONE 'UTC')::date, action_type, coalesce(status, ''), "
+            f"count(*), count(DISTINCT user_id) "
+            f"FROM {quote_name(partition_name(month))} GROUP BY 1, 2, 3 "
+            f"ON CONFLICT (day, action_type, status) DO UPDATE "
+            f"SET count = EXCLUDED.count, users_count = EXCLUDED.users_count"
+        )
+
+
+def expire_partitions(retention_months=None, drop=None, today=None):
+    """Roll up, detach and (with ``drop``) drop partitions older than ``retention_months``."""
+    if retention_months is None:
+        retention_months = settings.ACTIVITY_LOG_RETENTION_MONTHS
+    if drop is None:
+        drop = settings.ACTIVITY_LOG_DROP_EXPIRED_PARTITIONS
+    cutoff = add_months(month_start(today or datetime.date.today()), -retention_months)
+    quote_name = connection.ops.quote_name
+
+    expired = [month for month in get_month_partitions() if month < cutoff]
+    for month in expired:
+        name = quote_name(partition_name(month))
+        with transaction.atomic(), connection.cursor() as cursor:
+            summarize_partition(month)
+            cursor.execute(f"ALTER TABLE {quote_name(ActivityLog._meta.db_table)} DETACH PARTITION {name}")
+            if drop:
+                cursor.execute(f"DROP TABLE {name}")
+        logger.info("activity log partition %s %s", name, "dropped" if drop else "detached")
+    return expired
+
+
+def maintain_partitions():
+    if not is_partitioned():
+        return [], []
+    return ensure_partitions(), expire_partitions()
@@ -0,0 +1,41 @@
+"""Which activity log entries get written.
+
+Action types in ACTIVITY_LOG_ALWAYS are always written. For everything else,
+the rate comes from ACTIVITY_LOG_VIEW_SAMPLE_RATES (by url name), then
+ACTIVITY_LOG_SAMPLE_RATES (by action type), and defaults to 1. Sampling is
+decided by a hash of the user id, so a user is either in or out of a given
+rate and the trails of sampled users stay complete.
+"""
+import hashlib
+import random
+from functools import lru_cache
+
+from django.conf import settings
+
+
+def get_sample_rate(action_type, view_name=None):
+    if action_type in settings.ACTIVITY_LOG_ALWAYS:
+        return 1.0
+    view_rates = settings.ACTIVITY_LOG_VIEW_SAMPLE_RATES
+    if view_name in view_rates:
+        return view_rates[view_name]
+    return settings.ACTIVITY_LOG_SAMPLE_RATES.get(action_type, 1.0)
+
+
+@lru_cache(maxsize=65536)
+def user_bucket(user_id, salt):
+    """A stable number in [0, 1) for ``user_id``."""
+    digest = hashlib.sha256(f"{salt}:{user_id}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def should_log(action_type, view_name=None, user_id=None):
+    """Return the sample rate the entry was kept at, or ``None`` when it is skipped."""
+    rate = get_sample_rate(action_type, view_name)
+    if rate >= 1:
+        return 1.0
+    if rate <= 0:
+        return None
+
+    bucket = random.random() if user_id is None else user_bucket(user_id, settings.ACTIVITY_LOG_SAMPLING_SALT)
+    return rate if bucket < rate else None
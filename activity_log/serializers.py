@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from .models import ActivityLog
+from .utils import get_content_object_label
+
+
+class ActivityTimelineSerializer(serializers.ModelSerializer):
+    content_type = serializers.SerializerMethodField()
+    content_object = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityLog
+        fields = ['id', 'action_type', 'status', 'action_time', 'content_type', 'object_id', 'content_object']
+
+    def get_content_type(self, obj):
+        content_type = obj.content_type
+        return f'{content_type.app_label}.{content_type.model}' if content_type else None
+
+    def get_content_object(self, obj):
+        # resolved for the whole page by activity_log.utils.attach_content_objects
+        content_object = obj.content_object
+        if content_object is None:
+            return None
+        return {'id': content_object.pk, 'label': get_content_object_label(content_object)}
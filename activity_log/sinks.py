@@ -0,0 +1,129 @@
+"""Destinations for activity log entries.
+
+``ACTIVITY_LOG_SINKS`` lists the sinks every batch from activity_log.writer
+goes to, by alias ("database", "file") or dotted path to a ``BaseSink``
+subclass.
+"""
+import gzip
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+from functools import lru_cache
+
+import orjson
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+SINK_ALIASES = {
+    "database": "activity_log.sinks.DatabaseSink",
+    "file": "activity_log.sinks.JSONLFileSink",
+}
+
+
+def to_record(log):
+    """The row of an unsaved ActivityLog as plain JSON types, without the id."""
+    record = {field.attname: getattr(log, field.attname) for field in ActivityLog._meta.concrete_fields}
+    record.pop("id")
+    record["action_time"] = record["action_time"].isoformat()
+    return record
+
+
+class BaseSink:
+    def write(self, logs):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class DatabaseSink(BaseSink):
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    def write(self, logs):
+        ActivityLog.objects.bulk_create(logs, batch_size=self.batch_size)
+
+
+class JSONLFileSink(BaseSink):
+    """Appends one JSON object per line to a segment file per process.
+
+    Once the segment passes ``max_bytes`` it is renamed with a timestamp and
+    gzipped by a background thread, so writers only wait for the rename.
+    Closed ``*.jsonl.gz`` segments can be loaded back with the
+    ``import_activity_log_segments`` command.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = str(directory or settings.ACTIVITY_LOG_FILE_DIR)
+        self.max_bytes = max_bytes or settings.ACTIVITY_LOG_FILE_MAX_BYTES
+        self.prefix = f"activity-{socket.gethostname()}-{os.getpid()}"
+        self.path = os.path.join(self.directory, f"{self.prefix}.jsonl")
+        self._lock = threading.Lock()
+        self._file = None
+        self._compressors = []
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, logs):
+        data = b"".join(orjson.dumps(to_record(log)) + b"\n" for log in logs)
+        segment = None
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(data)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                segment = self._rotate()
+        if segment is not None:
+            # not a daemon thread, so the process waits for it before exiting
+            compressor = threading.Thread(target=self._compress, args=(segment,), name="activity-log-gzip")
+            self._compressors = [thread for thread in self._compressors if thread.is_alive()] + [compressor]
+            compressor.start()
+
+    def close(self):
+        with self._lock:
+            segment = self._rotate() if self._file is not None else None
+        if segment is not None:
+            self._compress(segment)
+        for thread in self._compressors:
+            thread.join()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        segment = os.path.join(self.directory, f"{self.prefix}-{time.time_ns()}.jsonl")
+        os.rename(self.path, segment)
+        return segment
+
+    @staticmethod
+    def _compress(segment):
+        # written under a temporary name, so the importer never picks up a partial segment
+        with open(segment, "rb") as source, gzip.open(f"{segment}.gz.tmp", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(f"{segment}.gz.tmp", f"{segment}.gz")
+        os.remove(segment)
+
+
+@lru_cache(maxsize=None)
+def get_sinks():
+    return tuple(import_string(SINK_ALIASES.get(name, name))() for name in settings.ACTIVITY_LOG_SINKS)
+
+
+def write_to_sinks(logs):
+    # one failing sink must not keep the entries from the others
+    for sink in get_sinks():
+        try:
+            sink.write(logs)
+        except Exception:
+            logger.exception("could not write %s activity log entries to %s", len(logs), type(sink).__name__)
+
+
+def close_sinks():
+    for sink in get_sinks():
+        sink.close()
@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from .models import ActivityLog
+from .sinks import write_to_sinks
+
+
+@shared_task
+def write_activity_logs(records):
+    """Write entries handed over by ``activity_log.writer.ActivityLogWriter`` to the configured sinks."""
+    write_to_sinks([ActivityLog(**record) for record in records])
+
+
+@shared_task
+def maintain_activity_log_partitions():
+    from .partitions import maintain_partitions
+
+    created, expired = maintain_partitions()
+    return {"created": [str(month) for month in created], "expired": [str(month) for month in expired]}
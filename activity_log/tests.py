@@ -1,3 +1,783 @@
-from django.test import TestCase
+import base64
+import datetime
+import glob
+import gzip
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import orjson
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from accounts import role_cache
+from accounts import views as account_views
+from accounts.models import CustomUser, Follow, Role
+from accounts.services import get_public_profile
+from blog import views as blog_views
+from blog.models import BookMark, Comment, Like, Post, Tag
+
+from . import partitions, policy, sinks
+from .mixins import ActivityLogMixin
+from .models import ActivityLog, ActivityLogDailySummary
+from .writer import ActivityLogWriter, apply_policy
+
+
+class ActivityLogMixinQueryCountTests(TestCase):
+    """Logging a request must not add queries to the view it logs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.user = CustomUser.objects.create_user(
+            email="writer@example.com",
+            username="writer",
+            password="password",
+            role=Role.objects.get(name="Administrator"),
+            verified=True,
+        )
+        cls.other = CustomUser.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            password="password",
+            role=Role.objects.get(name="Administrator"),
+        )
+        cls.writer = CustomUser.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="password",
+            role=Role.objects.get(name="PremiumUser"),
+        )
+        cls.tag = Tag.objects.create(name="Django")
+        cls.post = Post.objects.create(title="Logged post", body="body", author=cls.user, status=Post.Status.PUBLISHED)
+        cls.post.tag.add(cls.tag)
+        cls.comment = Comment.objects.create(user=cls.user, post=cls.post, content="comment")
+        Like.objects.create(user=cls.user, post=cls.post)
+        BookMark.objects.create(user=cls.user, post=cls.post)
+        Follow.objects.create(follower=cls.other, followed=cls.user)
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def warm_caches(self):
+        # content types are cached by ContentType.objects after the first lookup
+        ContentType.objects.get_for_models(Post, Comment, Tag, BookMark, CustomUser)
+        # and roles by accounts.role_cache
+        role_cache.get_role_permissions(self.user.role_id)
+        # and public profiles by accounts.services
+        get_public_profile(self.user.username)
+
+    def call(self, view, method, path, data=None, user=None, anonymous=False, before=None):
+        """Run the view once; writes are rolled back and caches start over, so every run sees the same state."""
+        cache.clear()
+        self.warm_caches()
+        with transaction.atomic():
+            if before is not None:
+                before()
+            request = getattr(self.factory, method)(path, data, format="json")
+            request.resolver_match = resolve(path)
+            if not anonymous:
+                user = CustomUser.objects.select_related("role").get(pk=(user or self.user).pk)
+                force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as queries:
+                response = view(request, **request.resolver_match.kwargs)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, getattr(response, "data", response))
+        return len(queries)
+
+    def assertLogsWithoutQueries(self, view, method, path, object_id=None, user=None, **kwargs):
+        with mock.patch.object(ActivityLogMixin, "_write_log"):
+            expected = self.call(view, method, path, user=user, **kwargs)
+
+        with mock.patch("activity_log.mixins.log_activity") as log_activity:
+            self.assertEqual(self.call(view, method, path, user=user, **kwargs), expected)
+
+        if kwargs.get("anonymous"):
+            log_activity.assert_not_called()
+            return
+        log_activity.assert_called_once()
+        self.assertEqual(log_activity.call_args.kwargs["object_id"], object_id)
+        self.assertEqual(log_activity.call_args.kwargs["user"].pk, (user or self.user).pk)
+
+    def test_post_views(self):
+        slug = self.post.slug
+        self.assertLogsWithoutQueries(blog_views.PostApiView.as_view({"get": "list"}), "get", "/post/")
+        self.assertLogsWithoutQueries(
+            blog_views.PostApiView.as_view({"get": "retrieve"}), "get", f"/post/{slug}/", self.post.pk
+        )
+        self.assertLogsWithoutQueries(blog_views.TagListApiView.as_view({"get": "list"}), "get", "/tags/")
+        self.assertLogsWithoutQueries(
+            blog_views.PostsByTagApiView.as_view({"get": "list"}), "get", f"/post/tags/{self.tag.slug}/"
+        )
+
+    def test_retrieve_counts_one_visit(self):
+        visits = self.post.visit_counter
+        request = self.factory.get(f"/post/{self.post.slug}/")
+        request.resolver_match = resolve(request.path)
+        force_authenticate(request, user=self.user)
+        blog_views.PostApiView.as_view({"get": "retrieve"})(request, slug=self.post.slug)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.visit_counter, visits + 1)
+
+    def test_like_and_bookmark_views(self):
+        self.assertLogsWithoutQueries(blog_views.LikeApiView.as_view({"get": "list"}), "get", "/likes/")
+        self.assertLogsWithoutQueries(
+            blog_views.LikeApiView.as_view({"get": "retrieve"}), "get", f"/post/{self.post.slug}/likes", self.post.pk
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.BookMarkApiView.as_view({"get": "list_bookmarks"}), "get", "/bookmarks/"
+        )
+
+    def test_comment_views(self):
+        self.assertLogsWithoutQueries(
+            blog_views.ListAndCreateCommentApiView.as_view({"get": "list"}), "get", f"/post/{self.post.slug}/comments/"
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.UpdateAndDeleteCommentApiView.as_view({"get": "retrieve"}),
+            "get",
+            f"/comment/{self.comment.uuid}/",
+            self.comment.pk,
+        )
+
+    def test_account_views(self):
+        self.assertLogsWithoutQueries(
+            account_views.FollowApiView.as_view({"get": "followers_list"}), "get", "/auth/follow/followers/"
+        )
+        self.assertLogsWithoutQueries(
+            account_views.UserProfileApiView.as_view({"get": "retrieve"}),
+            "get",
+            f"/auth/user/{self.user.username}/",
+            self.user.pk,
+        )
+
+    def test_post_write_views(self):
+        slug = self.post.slug
+        self.assertLogsWithoutQueries(
+            blog_views.PostApiView.as_view({"post": "create"}),
+            "post",
+            "/post/",
+            user=self.writer,
+            data={"title": "New post", "body": "body", "tag": [self.tag.slug], "status": Post.Status.PUBLISHED},
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.PostApiView.as_view({"put": "update"}),
+            "put",
+            f"/post/{slug}/",
+            self.post.pk,
+            data={"title": "Edited post"},
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.PostApiView.as_view({"delete": "destroy"}), "delete", f"/post/{slug}/", self.post.pk
+        )
+
+    def test_toggle_views(self):
+        slug = self.post.slug
+        self.assertLogsWithoutQueries(
+            blog_views.LikeApiView.as_view({"post": "create"}), "post", f"/post/{slug}/like/", self.post.pk
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.BookMarkApiView.as_view({"post": "bookmark"}), "post", f"/post/{slug}/bookmark/", self.post.pk
+        )
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "FollowManager.toggle is a Postgres statement")
+    def test_follow_toggle_view(self):
+        self.assertLogsWithoutQueries(
+            account_views.FollowApiView.as_view({"post": "toggle_follow"}),
+            "post",
+            f"/auth/follow/{self.other.username}/toggle_follow/",
+        )
+
+    def test_comment_write_views(self):
+        self.assertLogsWithoutQueries(
+            blog_views.ListAndCreateCommentApiView.as_view({"post": "create"}),
+            "post",
+            f"/post/{self.post.slug}/comments/",
+            data={"content": "new comment"},
+        )
+        path = f"/comment/{self.comment.uuid}/"
+        self.assertLogsWithoutQueries(
+            blog_views.UpdateAndDeleteCommentApiView.as_view({"put": "update"}),
+            "put",
+            path,
+            self.comment.pk,
+            data={"content": "edited"},
+        )
+        self.assertLogsWithoutQueries(
+            blog_views.UpdateAndDeleteCommentApiView.as_view({"delete": "destroy"}), "delete", path, self.comment.pk
+        )
+
+    def test_registration_view(self):
+        data = {"email": "new@example.com", "username": "new", "password": "password", "confirm_password": "password"}
+        self.assertLogsWithoutQueries(
+            account_views.RegistrationApiView.as_view(), "post", "/auth/register/", data=data, anonymous=True
+        )
+
+    @mock.patch("accounts.views.send_async_email_to_user")
+    @mock.patch("accounts.models.randint", return_value=123456)
+    def test_account_verification_view(self, randint, send_email):
+        view = account_views.AccountVerificationApiView.as_view()
+        self.assertLogsWithoutQueries(view, "get", "/auth/account-verify/", user=self.other)
+        self.assertLogsWithoutQueries(
+            view,
+            "post",
+            "/auth/account-verify/",
+            user=self.other,
+            data={"otpcode": 123456},
+            before=self.other.generate_otp_code,
+        )
+
+    def test_change_password_view(self):
+        self.assertLogsWithoutQueries(
+            account_views.ChangePasswordApiView.as_view(),
+            "put",
+            "/auth/user/change-password/",
+            data={"old_password": "password", "new_password": "newpassword1"},
+        )
+
+
+class ActivityTimelineApiViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.user = CustomUser.objects.create_user(email="user@example.com", username="user", password="password")
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            username="admin",
+            password="password",
+            role=Role.objects.get(name="Administrator"),
+        )
+        cls.post = Post.objects.create(title="Timeline post", body="body", author=cls.admin)
+        cls.deleted_post = Post.objects.create(title="Deleted post", body="body", author=cls.admin)
+        cls.comment = Comment.objects.create(user=cls.user, post=cls.post, content="comment")
+        cls.tag = Tag.objects.create(name="Django")
+
+        cls.action_time = timezone.now()
+        Activity = ActivityLog.Activity_Type
+        targets = [
+            (Activity.READ, cls.post),
+            (Activity.LIKE, cls.post),
+            (Activity.COMMENT, cls.comment),
+            (Activity.FOLLOW, cls.admin),
+            (Activity.READ, cls.tag),
+            (Activity.LIKE, cls.deleted_post),
+            (Activity.LOGIN, None),
+        ]
+        cls.logs = [
+            ActivityLog.objects.create(
+                user=cls.user,
+                action_type=action_type,
+                # every entry shares one instant, the cursor must still page through them
+                action_time=cls.action_time,
+                content_type=ContentType.objects.get_for_model(target) if target else None,
+                object_id=target.pk if target else None,
+            )
+            for action_type, target in targets
+        ]
+        ActivityLog.objects.create(user=cls.admin, action_type=Activity.LOGIN)
+        cls.deleted_post.delete()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, query="", user=None, status=200):
+        if user is not None:
+            self.client.force_authenticate(user)
+        response = self.client.get(f"/activity/timeline/{query}")
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def test_lists_own_activity_newest_first(self):
+        data = self.get()
+        self.assertEqual([entry["id"] for entry in data["results"]], [log.pk for log in reversed(self.logs)])
+
+        entries = {entry["id"]: entry for entry in data["results"]}
+        self.assertEqual(entries[self.logs[0].pk]["content_type"], "blog.post")
+        self.assertEqual(entries[self.logs[0].pk]["content_object"], {"id": self.post.pk, "label": self.post.slug})
+        self.assertEqual(entries[self.logs[3].pk]["content_object"], {"id": self.admin.pk, "label": "admin"})
+        self.assertIsNone(entries[self.logs[6].pk]["content_object"])
+
+    def test_deleted_targets_are_null(self):
+        entry = next(entry for entry in self.get()["results"] if entry["id"] == self.logs[5].pk)
+        self.assertEqual(entry["content_type"], "blog.post")
+        self.assertEqual(entry["object_id"], self.logs[5].object_id)
+        self.assertIsNone(entry["content_object"])
+
+    def test_other_users_timeline_needs_admin(self):
+        self.get("?user=admin", status=403)
+        # the own username is always fine
+        self.assertEqual(len(self.get("?user=user")["results"]), len(self.logs))
+
+        data = self.get("?user=user", user=self.admin)
+        self.assertEqual([entry["id"] for entry in data["results"]], [log.pk for log in reversed(self.logs)])
+        self.assertEqual(len(self.get(user=self.admin)["results"]), 1)
+        self.get("?user=nobody", user=self.admin, status=404)
+
+    def test_action_type_filter(self):
+        data = self.get("?action_type=LIKE,FOLLOW")
+        expected = [log.pk for log in reversed(self.logs) if log.action_type in ("LIKE", "FOLLOW")]
+        self.assertEqual([entry["id"] for entry in data["results"]], expected)
+        self.assertEqual(self.get("?action_type=UN_LIKE")["results"], [])
+
+    def test_cursor_pages_are_stable_when_action_times_tie(self):
+        pages, url = [], "/activity/timeline/?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            pages.append([entry["id"] for entry in data["results"]])
+            previous, url = data["previous"], data["next"]
+            # a newer entry does not shift the next pages
+            ActivityLog.objects.create(user=self.user, action_type=ActivityLog.Activity_Type.READ)
+        self.assertEqual(sum(pages, []), [log.pk for log in reversed(self.logs)])
+
+        for page in reversed(pages[:-1]):
+            data = self.client.get(previous).json()
+            self.assertEqual([entry["id"] for entry in data["results"]], page)
+            previous = data["previous"]
+
+        for position in (b"p=yesterday|1", b"p=1"):
+            self.get(f"?cursor={base64.b64encode(position).decode()}", status=404)
+
+    def test_query_count(self):
+        # warms the role cache
+        self.get("?user=user", user=self.admin)
+        # the page, then one in_bulk per content type: post, comment, user and tag
+        with self.assertNumQueries(5):
+            self.get(user=self.user)
+        # plus the user looked up by username
+        with self.assertNumQueries(6):
+            self.get("?user=user", user=self.admin)
+
+        ActivityLog.objects.bulk_create(
+            ActivityLog(
+                user=self.user,
+                action_type=ActivityLog.Activity_Type.READ,
+                content_type=log.content_type,
+                object_id=log.object_id,
+            )
+            for log in self.logs * 5
+        )
+        with self.assertNumQueries(5):
+            self.get(user=self.user)
+
+
+class ActivityLogAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="password"
+        )
+        post = Post.objects.create(title="Admin post", body="body", author=cls.admin)
+        deleted_post = Post.objects.create(title="Deleted post", body="body", author=cls.admin)
+        cls.targets = [
+            post,
+            deleted_post,
+            Comment.objects.create(user=cls.admin, post=post, content="comment"),
+            Tag.objects.create(name="Django"),
+            cls.admin,
+            None,
+        ]
+        cls.add_logs()
+        cls.deleted_post_id = deleted_post.pk
+        deleted_post.delete()
+
+    @classmethod
+    def add_logs(cls, times=1):
+        ActivityLog.objects.bulk_create(
+            ActivityLog(
+                user=cls.admin if index % 2 else None,
+                action_type=ActivityLog.Activity_Type.READ,
+                content_type=ContentType.objects.get_for_model(target) if target else None,
+                object_id=target.pk if target else None,
+            )
+            for index, target in enumerate(cls.targets * times)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_changelist(self):
+        response = self.client.get("/admin/activity_log/activitylog/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_content_object_links(self):
+        response = self.get_changelist()
+        changelist = response.context["cl"]
+        objects = {(log.content_type_id, log.object_id): log.content_object for log in changelist.result_list}
+
+        post, _, comment, tag, user, _ = self.targets
+        for target in (post, comment, tag, user):
+            self.assertEqual(objects[ContentType.objects.get_for_model(target).pk, target.pk], target)
+        self.assertIsNone(objects[ContentType.objects.get_for_model(Post).pk, self.deleted_post_id])
+        self.assertIsNone(objects[None, None])
+        self.assertContains(response, f"{post.slug[:20]} ...")
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.get_changelist()
+        # session, user, count, page, then one in_bulk per content type: post, comment, tag and user
+        with self.assertNumQueries(8):
+            self.get_changelist()
+
+        self.add_logs(times=5)
+        with self.assertNumQueries(8):
+            self.get_changelist()
+
+
+class JSONLFileSinkTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.sink = sinks.JSONLFileSink(self.directory, max_bytes=1024)
+
+    def logs(self, count, remarks):
+        return [ActivityLog(action_type=ActivityLog.Activity_Type.READ, remarks=remarks) for _ in range(count)]
+
+    def read_segments(self):
+        records = []
+        for path in sorted(glob.glob(f"{self.directory}/*.jsonl.gz")):
+            with gzip.open(path, "rb") as segment:
+                records.append([orjson.loads(line)["remarks"] for line in segment])
+        return records
+
+    def test_rotates_and_compresses_segments(self):
+        self.sink.write(self.logs(20, "first"))
+        self.sink.write(self.logs(2, "second"))
+        self.sink.close()
+        self.assertEqual(self.read_segments(), [["first"] * 20, ["second"] * 2])
+        self.assertEqual(glob.glob(f"{self.directory}/*.jsonl"), [])
+
+    def test_writes_while_a_segment_is_compressed(self):
+        started, release = threading.Event(), threading.Event()
+        copy = sinks.shutil.copyfileobj
+
+        def slow_copy(source, target):
+            started.set()
+            release.wait(5)
+            copy(source, target)
+
+        with mock.patch.object(sinks.shutil, "copyfileobj", side_effect=slow_copy):
+            self.sink.write(self.logs(20, "first"))
+            self.assertTrue(started.wait(5))
+            writer = threading.Thread(target=self.sink.write, args=(self.logs(2, "second"),))
+            writer.start()
+            writer.join(5)
+            # the second write did not wait for gzip
+            self.assertFalse(writer.is_alive())
+            self.assertEqual(self.read_segments(), [])
+            release.set()
+            self.sink.close()
+        self.assertEqual(self.read_segments(), [["first"] * 20, ["second"] * 2])
+
+
+class WriteToSinksTests(SimpleTestCase):
+    def test_failing_sink_does_not_stop_the_others(self):
+        failing, working = mock.Mock(), mock.Mock()
+        failing.write.side_effect = OSError("disk full")
+        logs = [ActivityLog(action_type=ActivityLog.Activity_Type.READ)]
+        with mock.patch.object(sinks, "get_sinks", return_value=(failing, working)):
+            with self.assertLogs("activity_log.sinks", "ERROR"):
+                sinks.write_to_sinks(logs)
+        working.write.assert_called_once_with(logs)
+
+
+class ActivityLogWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.write_event = threading.Event()
+
+        def write_to_sinks(batch):
+            self.written.append([log.remarks for log in batch])
+            self.write_event.set()
+
+        patchers = {
+            "write_to_sinks": mock.patch("activity_log.writer.write_to_sinks", side_effect=write_to_sinks),
+            "close_sinks": mock.patch("activity_log.writer.close_sinks"),
+            "close_old_connections": mock.patch("activity_log.writer.close_old_connections"),
+            "delay": mock.patch("activity_log.tasks.write_activity_logs.delay"),
+            "atexit_register": mock.patch("activity_log.writer.atexit.register"),
+        }
+        for name, patcher in patchers.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def writer(self, flusher=False, **kwargs):
+        writer = ActivityLogWriter(**{"max_size": 3, "batch_size": 2, "flush_interval": 60, **kwargs})
+        if flusher:
+            # the daemon thread outlives the test, keep it asleep afterwards
+            self.addCleanup(setattr, writer, "flush_interval", 3600)
+        else:
+            patcher = mock.patch.object(writer, "_ensure_flusher")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return writer
+
+    def enqueue(self, writer, count, start=0):
+        return [
+            writer.enqueue(action_type=ActivityLog.Activity_Type.READ, remarks=str(index))
+            for index in range(start, start + count)
+        ]
+
+    def spilled_remarks(self):
+        return [[record["remarks"] for record in call.args[0]] for call in self.delay.call_args_list]
+
+    def test_drop_discards_new_entries_when_full(self):
+        writer = self.writer(overflow="drop")
+        logs = self.enqueue(writer, 5)
+
+        self.assertEqual([log is None for log in logs], [False, False, False, True, True])
+        self.assertEqual(writer.dropped, 2)
+        writer.flush()
+        self.assertEqual(self.written, [["0", "1"], ["2"]])
+        self.delay.assert_not_called()
+
+    def test_spill_leaves_the_celery_call_to_the_flusher(self):
+        writer = self.writer(overflow="spill")
+        self.enqueue(writer, 5)
+
+        # enqueue only set the oldest batch aside
+        self.delay.assert_not_called()
+        self.assertEqual(writer.dropped, 0)
+        writer.flush()
+        self.assertEqual(self.spilled_remarks(), [["0", "1"]])
+        self.assertEqual(self.written, [["2", "3"], ["4"]])
+
+    def test_spill_is_bounded(self):
+        writer = self.writer(overflow="spill", max_size=2, batch_size=1)
+        logs = self.enqueue(writer, 5)
+
+        self.assertEqual([log is None for log in logs], [False, False, False, False, True])
+        self.assertEqual(writer.dropped, 1)
+        writer.flush()
+        self.assertEqual(self.spilled_remarks(), [["0"], ["1"]])
+        self.assertEqual(self.written, [["2"], ["3"]])
+
+    def test_failed_celery_batches_are_counted_as_dropped(self):
+        self.delay.side_effect = ConnectionError("broker down")
+        writer = self.writer(use_celery=True)
+        self.enqueue(writer, 3)
+
+        with self.assertLogs("activity_log.writer", "ERROR"):
+            writer.flush()
+        self.assertEqual(writer.dropped, 3)
+
+    def test_flushes_when_a_batch_is_full(self):
+        writer = self.writer(flusher=True, batch_size=3)
+        self.enqueue(writer, 2)
+        self.assertFalse(self.write_event.wait(0.1))
+
+        self.enqueue(writer, 1, start=2)
+        self.assertTrue(self.write_event.wait(5))
+        self.assertEqual(self.written, [["0", "1", "2"]])
+
+    def test_flushes_every_interval(self):
+        writer = self.writer(flusher=True, batch_size=100, flush_interval=0.05)
+        self.enqueue(writer, 1)
+
+        self.assertTrue(self.write_event.wait(5))
+        self.assertEqual(self.written, [["0"]])
+
+    def test_flushes_at_exit(self):
+        writer = self.writer(batch_size=100)
+        self.atexit_register.assert_called_once_with(writer.close)
+        self.enqueue(writer, 3)
+
+        writer.close()
+        self.assertEqual(self.written, [["0", "1", "2"]])
+        self.close_sinks.assert_called_once_with()
+
+
+
+@override_settings(
+    ACTIVITY_LOG_ALWAYS=["LOGIN_FAIL", "LIKE"],
+    ACTIVITY_LOG_SAMPLE_RATES={"READ": 0.5, "LIKE": 0.0},
+    ACTIVITY_LOG_VIEW_SAMPLE_RATES={"post-list": 0.25, "post-like": 0.0},
+    ACTIVITY_LOG_SAMPLING_SALT="salt",
+)
+class ActivityLogPolicyTests(SimpleTestCase):
+    def setUp(self):
+        policy.user_bucket.cache_clear()
+        self.addCleanup(policy.user_bucket.cache_clear)
+
+    def kept_users(self, rate=0.5, view_name=None):
+        return {user_id for user_id in range(1, 401) if policy.should_log("READ", view_name, user_id) == rate}
+
+    def test_always_logged_types_bypass_sampling(self):
+        for user_id in (None, 1, 2, 3):
+            self.assertEqual(policy.should_log("LIKE", "post-like", user_id), 1.0)
+
+    def test_view_rate_overrides_type_rate(self):
+        self.assertEqual(policy.get_sample_rate("READ", "post-list"), 0.25)
+        self.assertEqual(policy.get_sample_rate("READ", "post-detail"), 0.5)
+        with override_settings(ACTIVITY_LOG_VIEW_SAMPLE_RATES={"post-list": 1.0}):
+            self.assertEqual(self.kept_users(rate=1.0, view_name="post-list"), set(range(1, 401)))
+        with override_settings(ACTIVITY_LOG_VIEW_SAMPLE_RATES={"post-list": 0.0}):
+            self.assertIsNone(policy.should_log("READ", "post-list", 1))
+
+    def test_bucket_is_deterministic_per_user_and_salt(self):
+        kept = self.kept_users()
+        self.assertLess(abs(len(kept) - 200), 60)
+
+        policy.user_bucket.cache_clear()
+        self.assertEqual(self.kept_users(), kept)
+        # a lower rate keeps a subset of the same users
+        self.assertLess(self.kept_users(rate=0.25, view_name="post-list"), kept)
+        with override_settings(ACTIVITY_LOG_SAMPLING_SALT="other salt"):
+            self.assertNotEqual(self.kept_users(), kept)
+
+    def test_sample_rate_is_recorded_below_one(self):
+        user_id = min(self.kept_users())
+        fields = apply_policy({"action_type": "READ", "user_id": user_id, "data": {"page": 2}})
+        self.assertEqual(fields["data"], {"page": 2, "sample_rate": 0.5})
+
+        user = mock.Mock(pk=user_id)
+        self.assertEqual(apply_policy({"action_type": "READ", "user": user})["data"], {"sample_rate": 0.5})
+        self.assertNotIn("data", apply_policy({"action_type": "LIKE", "user": user}))
+
+        skipped = min(set(range(1, 401)) - self.kept_users())
+        self.assertIsNone(apply_policy({"action_type": "READ", "user_id": skipped}))
+
+    def test_entries_without_a_user_are_kept(self):
+        fields = {"action_type": "LOGIN_FAIL", "user": None, "remarks": "bad password"}
+        with mock.patch.object(policy.random, "random", return_value=0.99):
+            self.assertEqual(apply_policy(dict(fields)), fields)
+            self.assertIsNone(apply_policy({"action_type": "READ", "user": None}))
+        with mock.patch.object(policy.random, "random", return_value=0.1):
+            self.assertEqual(apply_policy({"action_type": "READ", "user": None})["data"], {"sample_rate": 0.5})
+
+
+def partition_of(log):
+    """The name of the partition that holds ``log``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT tableoid::regclass::text FROM {connection.ops.quote_name(ActivityLog._meta.db_table)} "
+            f"WHERE id = %s",
+            [log.pk],
+        )
+        return cursor.fetchone()[0]
+
+
+def table_exists(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        return cursor.fetchone()[0]
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "activity log partitions need Postgres")
+class PartitionTests(TestCase):
+    def log(self, action_time, action_type=ActivityLog.Activity_Type.READ, **fields):
+        return ActivityLog.objects.create(action_type=action_type, action_time=action_time, **fields)
+
+    def test_ensure_partitions_creates_future_months(self):
+        today = datetime.date(2040, 11, 20)
+        created = partitions.ensure_partitions(months_ahead=2, today=today)
+
+        months = [datetime.date(2040, 11, 1), datetime.date(2040, 12, 1), datetime.date(2041, 1, 1)]
+        self.assertEqual(created, months)
+        self.assertLessEqual(set(months), set(partitions.get_month_partitions()))
+        self.assertEqual(partitions.ensure_partitions(months_ahead=2, today=today), [])
+
+    def test_create_partition_moves_rows_out_of_the_default_partition(self):
+        log = self.log(datetime.datetime(2040, 5, 10, tzinfo=datetime.timezone.utc))
+        later = self.log(datetime.datetime(2040, 6, 2, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partition_of(log), partitions.default_partition_name())
+
+        partitions.create_partition(datetime.date(2040, 5, 1))
+
+        self.assertEqual(partition_of(log), partitions.partition_name(datetime.date(2040, 5, 1)))
+        self.assertEqual(partition_of(later), partitions.default_partition_name())
+        self.assertIn(datetime.date(2040, 5, 1), partitions.get_month_partitions())
+
+    def create_expired_month(self):
+        month = datetime.date(2001, 1, 1)
+        partitions.create_partition(month)
+        first, second = (
+            CustomUser.objects.create_user(email=f"{name}@example.com", username=name, password="password")
+            for name in ("first", "second")
+        )
+        success = ActivityLog.Action_Status.SUCCESS
+        for day, hour, user in ((3, 10, first), (3, 11, first), (3, 12, second), (4, 10, second)):
+            self.log(datetime.datetime(2001, 1, day, hour, tzinfo=datetime.timezone.utc), user=user, status=success)
+        failed_at = datetime.datetime(2001, 1, 3, 13, tzinfo=datetime.timezone.utc)
+        self.log(failed_at, ActivityLog.Activity_Type.LOGIN_FAILED)
+        return month
+
+    def assertExpired(self, month, drop):
+        expired = partitions.expire_partitions(retention_months=1, drop=drop, today=datetime.date(2001, 3, 15))
+        self.assertEqual(expired, [month])
+
+        success = ActivityLog.Action_Status.SUCCESS
+        self.assertCountEqual(
+            ActivityLogDailySummary.objects.values_list("day", "action_type", "status", "count", "users_count"),
+            [
+                (datetime.date(2001, 1, 3), ActivityLog.Activity_Type.READ, success, 3, 2),
+                (datetime.date(2001, 1, 3), ActivityLog.Activity_Type.LOGIN_FAILED, "", 1, 0),
+                (datetime.date(2001, 1, 4), ActivityLog.Activity_Type.READ, success, 1, 1),
+            ],
+        )
+        self.assertNotIn(month, partitions.get_month_partitions())
+        self.assertFalse(ActivityLog.objects.filter(action_time__year=2001).exists())
+
+    def test_expire_partitions_summarizes_then_detaches(self):
+        month = self.create_expired_month()
+        self.assertExpired(month, drop=False)
+
+        self.assertTrue(table_exists(partitions.partition_name(month)))
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(partitions.partition_name(month))}")
+            self.assertEqual(cursor.fetchone()[0], 5)
+
+    def test_expire_partitions_summarizes_then_drops(self):
+        month = self.create_expired_month()
+        self.assertExpired(month, drop=True)
+        self.assertFalse(table_exists(partitions.partition_name(month)))
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "activity log partitions need Postgres")
+class PartitionMigrationTests(TransactionTestCase):
+    migrate_from = [("activity_log", "0004_activitylog_action_time_default")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes("activity_log")
+        self.addCleanup(self.migrate, latest)
+        self.old_apps = self.migrate(self.migrate_from)
+        self.latest = latest
+
+    def test_existing_rows_are_copied_into_month_partitions(self):
+        OldActivityLog = self.old_apps.get_model("activity_log", "ActivityLog")
+        times = [
+            datetime.datetime(2025, 11, 3, 8, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2026, 1, 15, 20, tzinfo=datetime.timezone.utc),
+            timezone.now(),
+        ]
+        old_ids = [OldActivityLog.objects.create(action_type="READ", action_time=time).pk for time in times]
+
+        self.migrate(self.latest)
+
+        self.assertTrue(partitions.is_partitioned())
+        this_month = partitions.month_start(timezone.now())
+        months = partitions.get_month_partitions()
+        self.assertEqual(months[0], datetime.date(2025, 11, 1))
+        self.assertEqual(months[-1], partitions.add_months(this_month, 1))
+        self.assertEqual(months, [partitions.add_months(months[0], index) for index in range(len(months))])
+
+        logs = list(ActivityLog.objects.order_by("pk"))
+        self.assertEqual([(log.pk, log.action_time) for log in logs], list(zip(old_ids, times)))
+        for log in logs:
+            self.assertEqual(partition_of(log), partitions.partition_name(partitions.month_start(log.action_time)))
+        self.assertGreater(ActivityLog.objects.create(action_type="READ").pk, max(old_ids))
 
-# Create your tests here.
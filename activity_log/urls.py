@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'activity_log'
+
+urlpatterns = [
+    path('timeline/', views.ActivityTimelineApiView.as_view(), name='timeline'),
+]
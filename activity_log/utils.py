@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+from .models import ActivityLog
+
+# fields of the logged models that identify an object without further queries
+CONTENT_OBJECT_LABEL_FIELDS = ("slug", "username", "name", "uuid")
+
+
+def get_content_object_label(obj):
+    label = next((getattr(obj, field) for field in CONTENT_OBJECT_LABEL_FIELDS if hasattr(obj, field)), None)
+    return str(label) if label is not None else f"#{obj.pk}"
+
+
+def attach_content_objects(logs):
+    """Resolve ``content_object`` for ``logs`` with one ``in_bulk`` query per content type.
+
+    The logs should come with ``select_related("content_type")``. Objects that
+    no longer exist, or whose model is gone, resolve to ``None``.
+    """
+    logs = list(logs)
+    field = ActivityLog._meta.get_field("content_object")
+
+    ids_by_type = defaultdict(set)
+    content_types = {}
+    for log in logs:
+        if log.content_type_id is not None and log.object_id is not None:
+            ids_by_type[log.content_type_id].add(log.object_id)
+            content_types[log.content_type_id] = log.content_type
+
+    objects = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = content_types[content_type_id].model_class()
+        if model is None:
+            continue
+        for pk, obj in model._base_manager.in_bulk(ids).items():
+            objects[content_type_id, pk] = obj
+
+    for log in logs:
+        field.set_cached_value(log, objects.get((log.content_type_id, log.object_id)))
+    return logs
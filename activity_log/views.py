@@ -1,3 +1,44 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from accounts.models import CustomUser, Permission
+
+from .models import ActivityLog
+from .pagination import ActivityTimelinePagination
+from .serializers import ActivityTimelineSerializer
+from .utils import attach_content_objects
+
+
+class ActivityTimelineApiView(ListAPIView):
+    """The requesting user's activity, newest first.
+
+    ``?action_type=LIKE,COMMENT`` narrows it to some action types. Admins can
+    read another user's timeline with ``?user=<username>``.
+    """
+
+    serializer_class = ActivityTimelineSerializer
+    pagination_class = ActivityTimelinePagination
+    permission_classes = (IsAuthenticated, )
+
+    def get_timeline_user(self):
+        username = self.request.query_params.get('user')
+        user = self.request.user
+        if not username or username == user.username:
+            return user
+        if not user.can(Permission.ADMIN):
+            raise PermissionDenied("Only admins can read other users' activity")
+        return get_object_or_404(CustomUser, username=username)
+
+    def get_queryset(self):
+        queryset = ActivityLog.objects.filter(user=self.get_timeline_user()).select_related('content_type')
+
+        action_types = [value for value in self.request.query_params.get('action_type', '').split(',') if value]
+        if action_types:
+            queryset = queryset.filter(action_type__in=action_types)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        return attach_content_objects(page) if page is not None else None
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import ActivityLog
+from .policy import should_log
+from .sinks import close_sinks, to_record, write_to_sinks
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    """Buffers ``ActivityLog`` rows in process and writes them in batches.
+
+    ``enqueue`` only appends to a bounded deque. A daemon thread flushes it when
+    ``batch_size`` rows are waiting or every ``flush_interval`` seconds, either
+    to the configured activity_log.sinks or, with ``use_celery``, by handing the
+    batch to the ``write_activity_logs`` task. When the buffer is full, ``overflow`` decides
+    what happens: "spill" sets the oldest ``batch_size`` rows aside for the flusher
+    to send to Celery, "drop" discards the new row. New rows are dropped too once
+    ``max_size`` rows are waiting to be spilled. Whatever is left is flushed when
+    the process exits.
+    """
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=2.0, overflow="spill", use_celery=False):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.use_celery = use_celery
+        self.dropped = 0
+
+        self._buffer = deque()
+        self._spilled = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        atexit.register(self.close)
+
+    def enqueue(self, **fields):
+        log = ActivityLog(**fields)
+
+        with self._lock:
+            if len(self._buffer) >= self.max_size:
+                if self.overflow != "spill" or len(self._spilled) * self.batch_size >= self.max_size:
+                    self.dropped += 1
+                    if self.dropped % self.batch_size == 1:
+                        logger.warning("activity log buffer is full, %s entries dropped so far", self.dropped)
+                    return None
+                self._spilled.append(self._drain(self.batch_size))
+            self._buffer.append(log)
+            wake_up = len(self._buffer) >= self.batch_size or self._spilled
+
+        self._ensure_flusher()
+        if wake_up:
+            self._wakeup.set()
+        return log
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    spilled = self._spilled.popleft() if self._spilled else None
+                if not spilled:
+                    break
+                self._send_to_celery(spilled)
+            while True:
+                with self._lock:
+                    batch = self._drain(self.batch_size)
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self):
+        self.flush()
+        close_sinks()
+
+    def _drain(self, limit=None):
+        count = len(self._buffer) if limit is None else min(limit, len(self._buffer))
+        return [self._buffer.popleft() for _ in range(count)]
+
+    def _write(self, batch):
+        if self.use_celery:
+            self._send_to_celery(batch)
+            return
+        try:
+            write_to_sinks(batch)
+        except Exception:
+            logger.exception("could not write %s activity log entries", len(batch))
+
+    def _send_to_celery(self, batch):
+        from .tasks import write_activity_logs
+
+        try:
+            write_activity_logs.delay([to_record(log) for log in batch])
+        except Exception:
+            with self._lock:
+                self.dropped += len(batch)
+            logger.exception("could not queue %s activity log entries", len(batch))
+
+    def _ensure_flusher(self):
+        # started lazily and once per process, so forked workers get their own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="activity-log-writer", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+
+@lru_cache(maxsize=None)
+def get_activity_log_writer():
+    return ActivityLogWriter(
+        max_size=settings.ACTIVITY_LOG_BUFFER_SIZE,
+        batch_size=settings.ACTIVITY_LOG_BATCH_SIZE,
+        flush_interval=settings.ACTIVITY_LOG_FLUSH_INTERVAL,
+        overflow=settings.ACTIVITY_LOG_OVERFLOW,
+        use_celery=settings.ACTIVITY_LOG_WRITER == "celery",
+    )
+
+
+def apply_policy(fields, view_name=None):
+    """Return ``fields`` if activity_log.policy keeps the entry, noting the sample rate when it is below 1."""
+    user = fields.get("user")
+    rate = should_log(fields.get("action_type"), view_name, fields.get("user_id", getattr(user, "pk", None)))
+    if rate is None:
+        return None
+    if rate < 1:
+        fields["data"] = {**fields.get("data", {}), "sample_rate": rate}
+    return fields
+
+
+def log_activity(view_name=None, **fields):
+    """Record an ``ActivityLog`` entry through the configured writer."""
+    fields = apply_policy(fields, view_name)
+    if fields is None:
+        return None
+    if settings.ACTIVITY_LOG_WRITER == "sync":
+        log = ActivityLog(**fields)
+        write_to_sinks([log])
+        return log
+    return get_activity_log_writer().enqueue(**fields)
+
+
+async def alog_activity(view_name=None, **fields):
+    fields = apply_policy(fields, view_name)
+    if fields is None:
+        return None
+    if settings.ACTIVITY_LOG_WRITER == "sync":
+        log = ActivityLog(**fields)
+        await sync_to_async(write_to_sinks)([log])
+        return log
+    return get_activity_log_writer().enqueue(**fields)
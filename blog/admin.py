@@ -1,26 +1,30 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.urls import reverse
 from django.utils.html import format_html, urlencode
 
+from core.admin_tools import ScaleModeAdmin
+
 from .models import Post, PostImage, Tag, Like, Comment, BookMark
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(ScaleModeAdmin):
     list_display = ["name", "link_to_posts_page"]
     search_fields = ["name", 'slug']
     list_per_page = 50
     show_facets = admin.ShowFacets.ALLOW
+    list_annotations = {"posts_count": Count("posts")}
     prepopulated_fields = {
         "slug": [
             "name",
         ]
     }
 
-    @admin.display(description="Number of posts")
+    @admin.display(description="Number of posts", ordering="posts_count")
     def link_to_posts_page(self, obj):
-        link = reverse("admin:blog_post_changelist") + "?" + urlencode({"category__id": obj.id})
-        return format_html(f'<a href="{link}">{obj.number_of_posts} posts</a>')
+        link = reverse("admin:blog_post_changelist") + "?" + urlencode({"tag__id__exact": obj.id})
+        return format_html('<a href="{}">{} posts</a>', link, obj.posts_count)
 
 
 class PostImageInline(admin.TabularInline):
@@ -28,7 +32,7 @@ class PostImageInline(admin.TabularInline):
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScaleModeAdmin):
     list_display = [
         "show_title",
         "link_to_author",
@@ -42,11 +46,13 @@ class PostAdmin(admin.ModelAdmin):
     show_facets = admin.ShowFacets.ALLOW
     list_per_page = 50
     list_select_related = ["author"]
+    autocomplete_fields = ["author", "tag"]
     inlines = [PostImageInline]
 
+    @admin.display(description="Author", ordering="author__username")
     def link_to_author(self, obj):
-        link = reverse("admin:accounts_customuser_change", args=[obj.author.pk])
-        return format_html(f'<a href="{link}">{str(obj.author).split('-')[0].split(':')[-1]}</a>')
+        link = reverse("admin:accounts_customuser_change", args=[obj.author_id])
+        return format_html('<a href="{}">{}</a>', link, obj.author.username)
 
     def show_title(self, obj):
         return obj.title[:10]
@@ -58,12 +64,13 @@ class PostAdmin(admin.ModelAdmin):
         return ""
 
 @admin.register(Like)
-class Likeadmin(admin.ModelAdmin):
+class Likeadmin(ScaleModeAdmin):
     list_display = ['get_user', 'get_post', 'created_at']
-    search_fields = ['user', 'post']
+    search_fields = ['user__username', 'post__title']
     list_filter = ['created_at']
     list_per_page = 100
     list_select_related = ['user', 'post']
+    autocomplete_fields = ['user', 'post']
 
 
     @admin.display(description='User')
@@ -77,7 +84,7 @@ class Likeadmin(admin.ModelAdmin):
         return format_html(f'<a href="{link}">{obj.post.title[:20]}</a>')
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScaleModeAdmin):
     list_display = [
         "_content",
         "user_detail_page",
@@ -85,29 +92,31 @@ class CommentAdmin(admin.ModelAdmin):
         "_parent_comment",
         "is_active",
     ]
-    search_filter = ["user", "post"]
+    search_fields = ["user__username", "post__title"]
     list_filter = ["is_active", "created_at"]
     show_facets = admin.ShowFacets.ALLOW
-    list_select_related = ["user", "post"]
+    list_select_related = ["user", "post__author"]
     list_per_page = 100
+    autocomplete_fields = ["user", "post"]
+    raw_id_fields = ["parent_comment"]
 
     @admin.display(description="Post")
     def post_detail_page(self, obj):
-        url = reverse("admin:blog_post_change", args=[obj.post.pk])
-        return format_html(f'<a href="{url}">{obj.post.title[:10]} ...</a>')
+        url = reverse("admin:blog_post_change", args=[obj.post_id])
+        return format_html('<a href="{}">{} ...</a>', url, obj.post.title[:10])
 
     @admin.display(description="Author")
     def user_detail_page(self, obj):
-        url = reverse("admin:accounts_customuser_change", args=[obj.user.pk])
-        return format_html(f'<a href="{url}">{str(obj.user).split('-')[0].split(':')[-1]}</a>')
+        url = reverse("admin:accounts_customuser_change", args=[obj.user_id])
+        return format_html('<a href="{}">{}</a>', url, obj.user.username)
 
     def _content(self, obj):
         return f"{obj.content[:10]}..."
 
     @admin.display(description="parent comment")
     def _parent_comment(self, obj):
-        if obj.parent_comment:
-            url = reverse("admin:blog_comment_change", args=[obj.parent_comment.pk])
+        if obj.parent_comment_id:
+            url = reverse("admin:blog_comment_change", args=[obj.parent_comment_id])
             return format_html(f'<a href="{url}">parent comments</a>')
 
         url = (
@@ -118,12 +127,13 @@ class CommentAdmin(admin.ModelAdmin):
         return format_html(f'<a href="{url}">all sub comments</a>')
     
 @admin.register(BookMark)
-class Bookmarkadmin(admin.ModelAdmin):
+class Bookmarkadmin(ScaleModeAdmin):
     list_display = ['get_user', 'get_post', 'created_at']
-    search_fields = ['user', 'post']
+    search_fields = ['user__username', 'post__title']
     list_filter = ['created_at']
     list_per_page = 100
     list_select_related = ['user', 'post']
+    autocomplete_fields = ['user', 'post']
 
 
     @admin.display(description='User')
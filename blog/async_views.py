@@ -0,0 +1,163 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F, Prefetch
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.request import Request
+from rest_framework.views import exception_handler, status
+
+from accounts.models import Permission
+from accounts.token import CustomJWTAuthenticationClass
+from activity_log.mixins import AsyncActivityLogMixin
+from core.renderers import ORJSONRenderer
+
+from . import serializers
+from .fast_serializers import PostsListJSONQuery, TagListRowSerializer
+from .mixins import (
+    SQL_JSON_PLACEHOLDER,
+    aserialize_post_list,
+    get_post_list_queryset,
+    sql_json_enabled,
+    sql_json_response,
+)
+from .models import Comment, Post, Tag
+from .ordering import CustomOrderingFilter
+from .pagination import CommentListPagination, PostListPagination
+from .utils import aget_cached_tags
+
+
+class AsyncReadApiView(View):
+    """Serve GET natively async and hand every other method to the DRF view in ``sync_view``.
+
+    Responses have the same shape as the DRF views they shadow, rendered with
+    the project's default JSON renderer.
+    """
+
+    sync_view = None
+    authentication_class = CustomJWTAuthenticationClass
+    renderer_class = ORJSONRenderer
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # the DRF views handle their own CSRF checks, like APIView.as_view
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") and self.sync_view is not None:
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+        try:
+            request = await self.initialize_request(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Exception as exc:
+            response = exception_handler(exc, {})
+            if response is None:
+                raise
+            response = self.render(response.data, response.status_code)
+            # failed requests are logged too, like ActivityLogMixin does for the DRF views
+            if isinstance(request, Request):
+                await self.awrite_log(request, response)
+            return response
+
+    async def initialize_request(self, request):
+        drf_request = Request(request, authenticators=())
+        user_auth_tuple = await self.authentication_class().aauthenticate(request)
+        drf_request.user, drf_request.auth = user_auth_tuple or (AnonymousUser(), None)
+        return drf_request
+
+    async def awrite_log(self, request, response, object_id=None):
+        return None
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer_class().render(data), status=status_code, content_type="application/json")
+
+    @staticmethod
+    def get_post_queryset(request):
+        user = request.user
+        if user.is_authenticated:
+            return Post.active_objects.get_premium_posts(user.is_premium)
+        return Post.active_objects.all()
+
+
+class AsyncPostListView(AsyncActivityLogMixin, AsyncReadApiView):
+    log_model = Post
+
+    async def get(self, request):
+        queryset = CustomOrderingFilter().filter_queryset(request, self.get_post_queryset(request), self)
+        paginator = PostListPagination()
+        if sql_json_enabled(queryset):
+            post_ids = await paginator.apaginate_queryset(queryset.values_list("id", flat=True), request, view=self)
+            result = await sync_to_async(PostsListJSONQuery(request, queryset.db).fetch)(post_ids)
+            response = sql_json_response(result, paginator.get_paginated_response(SQL_JSON_PLACEHOLDER).data)
+        else:
+            page = await paginator.apaginate_queryset(get_post_list_queryset(queryset), request, view=self)
+            data = await aserialize_post_list(request, page)
+            response = self.render(paginator.get_paginated_response(data).data)
+
+        await self.awrite_log(request, response)
+        return response
+
+
+class AsyncPostDetailView(AsyncActivityLogMixin, AsyncReadApiView):
+    log_model = Post
+
+    async def get(self, request, slug):
+        queryset = CustomOrderingFilter().filter_queryset(request, self.get_post_queryset(request), self)
+        try:
+            post = await queryset.prefetch_related("tag", "images").aget(slug=slug)
+        except Post.DoesNotExist:
+            raise Http404("No Post matches the given query.")
+
+        await Post.objects.filter(pk=post.pk).aupdate(visit_counter=F("visit_counter") + 1)
+        post.visit_counter += 1
+
+        serializer = serializers.PostDetailSerializer(post, context={"request": request})
+        response = self.render(serializer.data)
+        await self.awrite_log(request, response, post.pk)
+        return response
+
+
+class AsyncTagListView(AsyncActivityLogMixin, AsyncReadApiView):
+    log_model = Tag
+
+    async def get(self, request):
+        data = TagListRowSerializer(request).serialize(await aget_cached_tags())
+
+        response = self.render(data)
+        await self.awrite_log(request, response)
+        return response
+
+
+class AsyncCommentListView(AsyncActivityLogMixin, AsyncReadApiView):
+    log_model = Comment
+
+    async def get(self, request, post_slug):
+        try:
+            post = await Post.objects.aget(slug=post_slug)
+        except Post.DoesNotExist:
+            raise Http404("No Post matches the given query.")
+
+        # Replies can only be made to top level comments, so two levels of
+        # prefetching cover everything CommentSerializer walks through.
+        replies = Prefetch(
+            "reply",
+            queryset=Comment.objects.select_related("post").prefetch_related(
+                Prefetch("reply", queryset=Comment.objects.select_related("post"))
+            ),
+        )
+        queryset = (
+            Comment.objects.filter(is_active=True, post=post, level=0)
+            .select_related("post")
+            .prefetch_related(replies)
+        )
+        paginator = CommentListPagination()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+
+        user = request.user
+        is_owner = post.author_id == user.pk or (user.is_authenticated and user.can(Permission.ADMIN))
+        serializer = serializers.CommentSerializer(page, many=True, context={"request": request, "is_owner": is_owner})
+
+        response = self.render(paginator.get_paginated_response(serializer.data).data)
+        await self.awrite_log(request, response)
+        return response
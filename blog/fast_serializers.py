@@ -0,0 +1,188 @@
+"""Read-only, compiled twins of the list serializers in blog.serializers.
+
+They work on ``.values()`` rows instead of model instances. URLs are built from
+a template made with one ``reverse()`` call per response rather than one per
+row. The output is identical to the ModelSerializer versions; both list a
+post's tags in tag id order (see ``PostListMixin.get_post_list_queryset``).
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import BookMark, Like, Post, Tag
+
+SLUG_PLACEHOLDER = "__slug__"
+
+
+def _url_template(request, view_name):
+    url = request.build_absolute_uri(reverse(view_name, kwargs={"slug": SLUG_PLACEHOLDER}))
+    return url.split(SLUG_PLACEHOLDER)
+
+
+class PostsListRowSerializer:
+    """Compiled version of ``PostsListSerializer``."""
+
+    value_fields = ("id", "slug", "author_id", "title", "excerpt", "thumbnail", "visit_counter", "published_at")
+
+    def __init__(self, request, liked_post_ids=(), bookmarked_post_ids=()):
+        self.url_prefix, self.url_suffix = _url_template(request, "blog:post-detail")
+        self.liked_post_ids = liked_post_ids
+        self.bookmarked_post_ids = bookmarked_post_ids
+        self.thumbnail_storage = Post._meta.get_field("thumbnail").storage
+        self.datetime_field = serializers.DateTimeField()
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.value_fields)
+
+    @staticmethod
+    def tag_names_queryset(post_ids):
+        return (
+            Post.tag.through.objects.filter(post_id__in=post_ids)
+            .order_by("tag_id")
+            .values_list("post_id", "tag__name")
+        )
+
+    @classmethod
+    def get_tag_names(cls, post_ids):
+        tag_names = {}
+        for post_id, name in cls.tag_names_queryset(post_ids):
+            tag_names.setdefault(post_id, []).append(name)
+        return tag_names
+
+    @classmethod
+    async def aget_tag_names(cls, post_ids):
+        tag_names = {}
+        async for post_id, name in cls.tag_names_queryset(post_ids):
+            tag_names.setdefault(post_id, []).append(name)
+        return tag_names
+
+    def serialize(self, rows, tag_names=None):
+        rows = list(rows)
+        if tag_names is None:
+            tag_names = self.get_tag_names([row["id"] for row in rows])
+        return [self.to_representation(row, tag_names.get(row["id"], ())) for row in rows]
+
+    def to_representation(self, row, tag_names):
+        thumbnail = row["thumbnail"]
+        return {
+            "url": f"{self.url_prefix}{row['slug']}{self.url_suffix}",
+            "author": row["author_id"],
+            "slug": row["slug"],
+            "title": row["title"],
+            "content_overview": row["excerpt"],
+            "thumbnail_url": self.thumbnail_storage.url(thumbnail) if thumbnail else settings.DEFAULT_THUMBNAIL_URL,
+            "visit_counter": row["visit_counter"],
+            "published_at": self.datetime_field.to_representation(row["published_at"]),
+            "tag": [{"name": name} for name in tag_names],
+            "does_user_likes": row["id"] in self.liked_post_ids,
+            "does_user_bookmarks": row["id"] in self.bookmarked_post_ids,
+        }
+
+
+class TagListRowSerializer:
+    """Compiled version of ``TagListSerializer``."""
+
+    value_fields = ("slug", "name")
+
+    def __init__(self, request):
+        self.url_prefix, self.url_suffix = _url_template(request, "blog:post-by-tag")
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.value_fields)
+
+    def serialize(self, rows):
+        return [{"url": f"{self.url_prefix}{row['slug']}{self.url_suffix}", "name": row["name"]} for row in rows]
+
+
+class PostsListJSONQuery:
+    """Builds the ``PostsListSerializer`` JSON for a page of posts inside Postgres.
+
+    One statement returns the whole array as text, tags and viewer flags
+    included, so no rows are hydrated in Python. Thumbnail URLs are put
+    together in SQL, which is only possible for ``FileSystemStorage``.
+    """
+
+    sql = """
+        SELECT coalesce(json_agg(json_build_object(
+            'url', %(url_prefix)s || p.slug || %(url_suffix)s,
+            'author', p.author_id,
+            'slug', p.slug,
+            'title', p.title,
+            'content_overview', p.excerpt,
+            'thumbnail_url', CASE
+                WHEN p.thumbnail = '' THEN %(default_thumbnail_url)s
+                ELSE %(media_url)s || (
+                    -- django.utils.encoding.filepath_to_uri
+                    SELECT string_agg(CASE
+                        WHEN c.ch ~ '^[A-Za-z0-9_.~!*''()/-]$' THEN c.ch
+                        ELSE regexp_replace(upper(encode(convert_to(c.ch, 'UTF8'), 'hex')), '(..)', '%%\\1', 'g')
+                    END, '' ORDER BY c.i)
+                    FROM regexp_split_to_table(ltrim(replace(p.thumbnail, '\\', '/'), '/'), '') WITH ORDINALITY AS c(ch, i)
+                )
+            END,
+            'visit_counter', p.visit_counter,
+            'published_at', {published_at},
+            'tag', (
+                SELECT coalesce(json_agg(json_build_object('name', t.name) ORDER BY t.id), '[]'::json)
+                FROM {post_tag} pt JOIN {tag} t ON t.id = pt.tag_id
+                WHERE pt.post_id = p.id
+            ),
+            'does_user_likes', EXISTS (SELECT 1 FROM {like} l WHERE l.post_id = p.id AND l.user_id = %(user)s),
+            'does_user_bookmarks', EXISTS (SELECT 1 FROM {bookmark} b WHERE b.post_id = p.id AND b.user_id = %(user)s)
+        ) ORDER BY array_position(%(post_ids)s::bigint[], p.id)), '[]'::json)::text
+        FROM {post} p
+        WHERE p.id = ANY(%(post_ids)s::bigint[])
+    """
+
+    # datetime.isoformat() in the current time zone, "+00:00" written as "Z" like DRF's DateTimeField
+    published_at_sql = """
+        to_char(p.published_at AT TIME ZONE %(time_zone)s, 'YYYY-MM-DD"T"HH24:MI:SS')
+        || CASE WHEN date_trunc('second', p.published_at) = p.published_at THEN ''
+                ELSE to_char(p.published_at AT TIME ZONE %(time_zone)s, '.US') END
+        || CASE WHEN (p.published_at AT TIME ZONE %(time_zone)s) = (p.published_at AT TIME ZONE 'UTC') THEN 'Z'
+                WHEN (p.published_at AT TIME ZONE %(time_zone)s) > (p.published_at AT TIME ZONE 'UTC')
+                THEN '+' || to_char((p.published_at AT TIME ZONE %(time_zone)s) - (p.published_at AT TIME ZONE 'UTC'), 'HH24:MI')
+                ELSE '-' || to_char((p.published_at AT TIME ZONE 'UTC') - (p.published_at AT TIME ZONE %(time_zone)s), 'HH24:MI') END
+    """
+
+    def __init__(self, request, using):
+        self.request = request
+        self.connection = connections[using]
+
+    @staticmethod
+    def is_supported(using):
+        storage = Post._meta.get_field("thumbnail").storage
+        return connections[using].vendor == "postgresql" and isinstance(storage, FileSystemStorage)
+
+    def get_sql(self):
+        quote_name = self.connection.ops.quote_name
+        return self.sql.format(
+            published_at=self.published_at_sql,
+            post=quote_name(Post._meta.db_table),
+            post_tag=quote_name(Post.tag.through._meta.db_table),
+            tag=quote_name(Tag._meta.db_table),
+            like=quote_name(Like._meta.db_table),
+            bookmark=quote_name(BookMark._meta.db_table),
+        )
+
+    def fetch(self, post_ids):
+        """Return the JSON array for ``post_ids``, in the same order, as text."""
+        url_prefix, url_suffix = _url_template(self.request, "blog:post-detail")
+        user = self.request.user
+        params = {
+            "url_prefix": url_prefix,
+            "url_suffix": url_suffix,
+            "default_thumbnail_url": settings.DEFAULT_THUMBNAIL_URL,
+            "media_url": Post._meta.get_field("thumbnail").storage.base_url or "",
+            "time_zone": timezone.get_current_timezone_name(),
+            "user": user.pk if user.is_authenticated else None,
+            "post_ids": list(post_ids),
+        }
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.get_sql(), params)
+            return cursor.fetchone()[0]
@@ -0,0 +1,111 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser
+from blog import async_views, views
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the same concurrent GETs to the async views in blog.async_views and to the DRF views they shadow, "
+        "and compare throughput and latency (post detail requests count visits)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--user', help="email of the user to send requests as, anonymous by default")
+
+    def handle(self, *args, **options):
+        post = Post.active_objects.order_by('-like_count').first()
+        if post is None:
+            raise CommandError("no post to request")
+
+        self.headers = {}
+        if options['user']:
+            user = CustomUser.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"no user with email {options['user']}")
+            self.headers['HTTP_AUTHORIZATION'] = f"Bearer {AccessToken.for_user(user)}"
+
+        endpoints = [
+            ("/post/", views.PostApiView.as_view({'get': 'list'}), async_views.AsyncPostListView.as_view(), {}),
+            (
+                f"/post/{post.slug}/",
+                views.PostApiView.as_view({'get': 'retrieve'}),
+                async_views.AsyncPostDetailView.as_view(),
+                {'slug': post.slug},
+            ),
+            ("/tags/", views.TagListApiView.as_view({'get': 'list'}), async_views.AsyncTagListView.as_view(), {}),
+            (
+                f"/post/{post.slug}/comments/",
+                views.ListAndCreateCommentApiView.as_view({'get': 'list'}),
+                async_views.AsyncCommentListView.as_view(),
+                {'post_slug': post.slug},
+            ),
+        ]
+
+        count, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f"{'path':<40} {'view':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for path, sync_view, async_view, kwargs in endpoints:
+            for name, run in (("sync", self.run_sync), ("async", self.run_async)):
+                elapsed, latencies = run(path, sync_view if name == "sync" else async_view, kwargs, count, concurrency)
+                self.stdout.write(
+                    f"{path[:40]:<40} {name:<6} {count / elapsed:>8.0f} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} {self.percentile(latencies, 0.99) * 1000:>8.1f}"
+                )
+
+    def make_request(self, path):
+        request = APIRequestFactory().get(path, **self.headers)
+        request.resolver_match = resolve(path)
+        return request
+
+    @staticmethod
+    def percentile(values, fraction):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    def run_sync(self, path, view, kwargs, count, concurrency):
+        """The DRF view on ``concurrency`` worker threads, as Daphne runs sync views."""
+
+        def call(_):
+            request = self.make_request(path)
+            started = time.perf_counter()
+            view(request, **kwargs).render()
+            latency = time.perf_counter() - started
+            # what the end of a request does with the thread's connection
+            close_old_connections()
+            return latency
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(call, range(count)))
+        return time.perf_counter() - started, latencies
+
+    def run_async(self, path, view, kwargs, count, concurrency):
+        """The async view, ``concurrency`` requests in flight on one event loop."""
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call():
+                async with semaphore:
+                    request = self.make_request(path)
+                    started = time.perf_counter()
+                    await view(request, **kwargs)
+                    return time.perf_counter() - started
+
+            return await asyncio.gather(*(call() for _ in range(count)))
+
+        started = time.perf_counter()
+        latencies = asyncio.run(main())
+        return time.perf_counter() - started, latencies
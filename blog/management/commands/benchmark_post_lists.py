@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import CustomUser
+from blog.fast_serializers import PostsListJSONQuery, PostsListRowSerializer, TagListRowSerializer
+from blog.models import Post, Tag
+from blog.serializers import PostsListSerializer, TagListSerializer
+from blog.utils import get_viewer_post_state
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one page of the post list and the tag list through the ModelSerializers in blog.serializers, "
+        "the row serializers in blog.fast_serializers and, on Postgres, PostsListJSONQuery"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--user', help="email of the viewer, anonymous by default")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get("/post/"))
+        if options['user']:
+            request.user = CustomUser.objects.filter(email=options['user']).first()
+            if request.user is None:
+                raise CommandError(f"no user with email {options['user']}")
+
+        queryset = Post.active_objects.all()[:options['page_size']]
+        post_ids = list(queryset.values_list('id', flat=True))
+        if not post_ids:
+            raise CommandError("no post to list")
+
+        def model_serializer():
+            tags = Prefetch('tag', queryset=Tag.objects.order_by('pk'))
+            posts = list(queryset.defer('body', 'body_html').prefetch_related(tags))
+            liked, bookmarked = get_viewer_post_state(request.user, post_ids)
+            context = {'request': request, 'liked_post_ids': liked, 'bookmarked_post_ids': bookmarked}
+            return PostsListSerializer(posts, many=True, context=context).data
+
+        def row_serializer():
+            liked, bookmarked = get_viewer_post_state(request.user, post_ids)
+            return PostsListRowSerializer(request, liked, bookmarked).serialize(PostsListRowSerializer.values(queryset))
+
+        def tag_model_serializer():
+            return TagListSerializer(Tag.objects.all(), many=True, context={'request': request}).data
+
+        def tag_row_serializer():
+            return TagListRowSerializer(request).serialize(TagListRowSerializer.values(Tag.objects.all()))
+
+        cases = [
+            ("posts", "ModelSerializer", model_serializer),
+            ("posts", "row serializer", row_serializer),
+        ]
+        if PostsListJSONQuery.is_supported(queryset.db):
+            cases.append(("posts", "SQL JSON", lambda: PostsListJSONQuery(request, queryset.db).fetch(post_ids)))
+        cases += [
+            ("tags", "ModelSerializer", tag_model_serializer),
+            ("tags", "row serializer", tag_row_serializer),
+        ]
+
+        self.stdout.write(f"{'list':<6} {'serializer':<16} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, serializer, run in cases:
+            run()
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            p50, p99 = statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(f"{name:<6} {serializer:<16} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f}")
@@ -1,6 +1,7 @@
 from django.contrib.postgres.search import (SearchQuery, SearchRank,
                                             SearchVector)
-from django.db.models import Manager, Q, QuerySet
+from django.db import connections, router, transaction
+from django.db.models import F, Manager, Q, QuerySet
 
 class PostQuerySet(QuerySet):
     def search_filter(self, query_search):
@@ -52,4 +53,142 @@ class PostCustomManager(Manager):
         return self.get_premium_posts().order_post(filter, asc)
 
     def most_related_posts(self, post):
-        return self.get_queryset().filter(tag__in=post.tag.all()).exclude(id=post.id).distinct()
\ No newline at end of file
+        return self.get_queryset().filter(tag__in=post.tag.all()).exclude(id=post.id).distinct()
+
+class UserPostToggleManager(Manager):
+    """Manager for the (user, post) relation tables, likes and bookmarks.
+
+    Every operation runs as a single statement, so concurrent requests from the
+    same user can't race on the ``unique_together`` constraint, and the post
+    counter column is kept in step with the rows inside that same statement.
+    Databases without data-modifying CTEs (SQLite, in tests) run the same
+    operations through the ORM inside one transaction instead.
+    """
+
+    def __init__(self, counter_field=None):
+        # related managers (post.likes) are built from this class without arguments
+        super().__init__()
+        self.counter_field = counter_field
+
+    def _get_counter_field(self):
+        return self.counter_field or self.model._default_manager.counter_field
+
+    def _get_connection(self):
+        return connections[router.db_for_write(self.model)]
+
+    def _run(self, sql, user, post):
+        post_model = self.model._meta.get_field("post").related_model
+        connection = self._get_connection()
+        sql = sql.format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            post_table=connection.ops.quote_name(post_model._meta.db_table),
+            counter=connection.ops.quote_name(self._get_counter_field()),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {"user": user.pk, "post": post.pk})
+            return cursor.fetchone()
+
+    def _run_with_orm(self, user, post, insert, delete):
+        # rows are written with bulk_create/_raw_delete so the ORM receivers don't count them twice
+        post_model = self.model._meta.get_field("post").related_model
+        counter = self._get_counter_field()
+        db = self._get_connection().alias
+        rows = self.model._default_manager.using(db).filter(user_id=user.pk, post_id=post.pk)
+        with transaction.atomic(using=db):
+            deleted = delete and rows._raw_delete(db) > 0
+            created = insert and not deleted and not rows.exists()
+            if created:
+                self.model._default_manager.using(db).bulk_create([self.model(user_id=user.pk, post_id=post.pk)])
+            if created or deleted:
+                post_model.objects.using(db).filter(pk=post.pk).update(
+                    **{counter: F(counter) + (1 if created else -1)}
+                )
+        return created, deleted
+
+    def _supports_cte_writes(self):
+        return self._get_connection().vendor == "postgresql"
+
+    def post_ids_for_user(self, user, post_ids):
+        """Return the subset of ``post_ids`` that has a row for this user."""
+        return set(self.filter(user_id=user.pk, post_id__in=post_ids).values_list("post_id", flat=True))
+
+    async def apost_ids_for_user(self, user, post_ids):
+        queryset = self.filter(user_id=user.pk, post_id__in=post_ids).values_list("post_id", flat=True)
+        return {post_id async for post_id in queryset}
+
+    def add(self, user, post):
+        """Insert the row if it is missing. Returns True when a row was created."""
+        if not self._supports_cte_writes():
+            return self._run_with_orm(user, post, insert=True, delete=False)[0]
+        created, = self._run(
+            """
+            WITH inserted AS (
+                INSERT INTO {table} (user_id, post_id, created_at)
+                VALUES (%(user)s, %(post)s, now())
+                ON CONFLICT (user_id, post_id) DO NOTHING
+                RETURNING post_id
+            ), counted AS (
+                UPDATE {post_table} SET {counter} = {counter} + 1
+                WHERE id IN (SELECT post_id FROM inserted)
+            )
+            SELECT EXISTS (SELECT 1 FROM inserted)
+            """,
+            user,
+            post,
+        )
+        return created
+
+    def remove(self, user, post):
+        """Delete the row if it exists. Returns True when a row was deleted."""
+        if not self._supports_cte_writes():
+            return self._run_with_orm(user, post, insert=False, delete=True)[1]
+        deleted, = self._run(
+            """
+            WITH deleted AS (
+                DELETE FROM {table}
+                WHERE user_id = %(user)s AND post_id = %(post)s
+                RETURNING post_id
+            ), counted AS (
+                UPDATE {post_table} SET {counter} = {counter} - 1
+                WHERE id IN (SELECT post_id FROM deleted)
+            )
+            SELECT EXISTS (SELECT 1 FROM deleted)
+            """,
+            user,
+            post,
+        )
+        return deleted
+
+    def toggle(self, user, post):
+        """Delete the row if it exists, insert it otherwise.
+
+        Returns a ``(created, deleted)`` pair. Both are False when a concurrent
+        request inserted the same row first, the row exists either way.
+        """
+        if not self._supports_cte_writes():
+            return self._run_with_orm(user, post, insert=True, delete=True)
+        return self._run(
+            """
+            WITH deleted AS (
+                DELETE FROM {table}
+                WHERE user_id = %(user)s AND post_id = %(post)s
+                RETURNING post_id
+            ), inserted AS (
+                INSERT INTO {table} (user_id, post_id, created_at)
+                SELECT %(user)s, %(post)s, now()
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                ON CONFLICT (user_id, post_id) DO NOTHING
+                RETURNING post_id
+            ), counted AS (
+                UPDATE {post_table}
+                SET {counter} = {counter}
+                    + (SELECT count(*) FROM inserted)
+                    - (SELECT count(*) FROM deleted)
+                WHERE id = %(post)s
+                    AND EXISTS (SELECT 1 FROM inserted UNION ALL SELECT 1 FROM deleted)
+            )
+            SELECT EXISTS (SELECT 1 FROM inserted), EXISTS (SELECT 1 FROM deleted)
+            """,
+            user,
+            post,
+        )
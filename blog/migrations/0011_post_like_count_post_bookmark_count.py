@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    Like = apps.get_model("blog", "Like")
+    BookMark = apps.get_model("blog", "BookMark")
+
+    def count_for(model):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(post=OuterRef("pk"))
+                .order_by()
+                .values("post")
+                .annotate(c=Count("pk"))
+                .values("c")
+            ),
+            0,
+        )
+
+    Post.objects.update(like_count=count_for(Like), bookmark_count=count_for(BookMark))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0010_alter_bookmark_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="bookmark_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:52
+
+from django.db import migrations, models
+from django.db.models.functions import Left
+
+BATCH_SIZE = 1000
+
+
+def backfill_excerpt(apps, schema_editor):
+    # id ranges in separate transactions, so a large table isn't rewritten under one long lock
+    Post = apps.get_model("blog", "Post")
+    last_id = 0
+    while True:
+        ids = list(Post.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Post.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(excerpt=Left("body", 50))
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("blog", "0011_post_like_count_post_bookmark_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse
+
+from core.renderers import ORJSONRenderer
+
+from .fast_serializers import PostsListJSONQuery, PostsListRowSerializer
+from .models import Tag
+from .serializers import PostsListSerializer
+from .utils import aget_viewer_post_state, get_viewer_post_state
+
+# list pages show Post.excerpt, never the full text
+LIST_DEFERRED_FIELDS = ("body", "body_html")
+SQL_JSON_PLACEHOLDER = "\x00result\x00"
+
+
+def get_post_list_queryset(queryset):
+    """``.values()`` rows for ``PostsListRowSerializer`` when FAST_LIST_SERIALIZERS is on, posts otherwise."""
+    if settings.FAST_LIST_SERIALIZERS:
+        return PostsListRowSerializer.values(queryset)
+    # tags in id order, like PostsListRowSerializer
+    return queryset.defer(*LIST_DEFERRED_FIELDS).prefetch_related(Prefetch("tag", queryset=Tag.objects.order_by("pk")))
+
+
+def get_post_ids(posts):
+    if settings.FAST_LIST_SERIALIZERS:
+        return [row["id"] for row in posts]
+    return [post.pk for post in posts]
+
+
+def _serialize_post_list(request, posts, liked, bookmarked, tag_names=None):
+    if settings.FAST_LIST_SERIALIZERS:
+        return PostsListRowSerializer(request, liked, bookmarked).serialize(posts, tag_names)
+    context = {"request": request, "liked_post_ids": liked, "bookmarked_post_ids": bookmarked}
+    return PostsListSerializer(posts, many=True, context=context).data
+
+
+def serialize_post_list(request, posts):
+    """The ``PostsListSerializer`` data of a page taken from ``get_post_list_queryset``."""
+    posts = list(posts)
+    liked, bookmarked = get_viewer_post_state(request.user, get_post_ids(posts))
+    return _serialize_post_list(request, posts, liked, bookmarked)
+
+
+async def aserialize_post_list(request, posts):
+    post_ids = get_post_ids(posts)
+    liked, bookmarked = await aget_viewer_post_state(request.user, post_ids)
+    tag_names = await PostsListRowSerializer.aget_tag_names(post_ids) if settings.FAST_LIST_SERIALIZERS else None
+    return _serialize_post_list(request, posts, liked, bookmarked, tag_names)
+
+
+def sql_json_enabled(queryset):
+    return settings.SQL_JSON_POST_LISTS and PostsListJSONQuery.is_supported(queryset.db)
+
+
+def sql_json_response(result, paginated_data=None):
+    """Answer with the ``PostsListJSONQuery`` text ``result``, inside the pagination envelope if given.
+
+    ``paginated_data`` is the paginator's response data built around ``SQL_JSON_PLACEHOLDER``.
+    """
+    result = result.encode()
+    if paginated_data is not None:
+        renderer = ORJSONRenderer()
+        envelope = renderer.render(paginated_data)
+        result = envelope.replace(renderer.render(SQL_JSON_PLACEHOLDER), result, 1)
+    return HttpResponse(result, content_type="application/json")
+
+
+class ViewerStateMixin:
+    """Add the viewer's liked and bookmarked post ids to list serializer context.
+
+    The ids are fetched once for the whole page, so serializers can render
+    ``does_user_likes``/``does_user_bookmarks`` per row without extra queries.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            posts = list(args[0])
+            args = (posts, *args[1:])
+            context = kwargs.setdefault("context", self.get_serializer_context())
+            liked, bookmarked = get_viewer_post_state(self.request.user, [post.pk for post in posts])
+            context.update({"liked_post_ids": liked, "bookmarked_post_ids": bookmarked})
+        return super().get_serializer(*args, **kwargs)
+
+
+class PostListMixin(ViewerStateMixin):
+    """Serialize post lists with ``PostsListRowSerializer`` when FAST_LIST_SERIALIZERS is on.
+
+    List views pass their queryset through ``get_post_list_queryset`` before
+    paginating, then render the page with ``get_post_list_data``; the async
+    post list in blog.async_views uses the same module functions. With
+    SQL_JSON_POST_LISTS on, they can instead paginate post ids and answer with
+    ``get_sql_json_response``, which sends the JSON Postgres built as is.
+    """
+
+    def get_post_list_queryset(self, queryset):
+        return get_post_list_queryset(queryset)
+
+    def get_post_list_data(self, posts):
+        return serialize_post_list(self.request, posts)
+
+    def sql_json_enabled(self, queryset):
+        return sql_json_enabled(queryset)
+
+    def get_sql_json_response(self, post_ids, using, paginated=True):
+        result = PostsListJSONQuery(self.request, using).fetch(post_ids)
+        paginated_data = self.get_paginated_response(SQL_JSON_PLACEHOLDER).data if paginated else None
+        return sql_json_response(result, paginated_data)
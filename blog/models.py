@@ -9,7 +9,9 @@ from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
 
-from .managers import PostCustomManager
+from core.models import CounterFieldsMixin
+
+from .managers import PostCustomManager, UserPostToggleManager
 
 class Tag(models.Model):
     slug = models.SlugField(max_length=30, unique=True, db_index=True)
@@ -30,7 +32,7 @@ class Tag(models.Model):
 def thumbnail_path(instance, filename):
     return f"posts/{instance.title}/post_thumbnail/{filename}"
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     class Status(models.TextChoices):
         DRAFT = "DR", "Draft"
         PUBLISHED = "PUB", "Published"
@@ -40,9 +42,12 @@ class Post(models.Model):
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     body = models.TextField()
     body_html = models.TextField(blank=True)
+    excerpt = models.CharField(max_length=50, blank=True, editable=False)
     thumbnail = models.ImageField(upload_to=thumbnail_path, blank=True)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.DRAFT)
     visit_counter = models.IntegerField(editable=False, default=0)
+    like_count = models.PositiveIntegerField(editable=False, default=0)
+    bookmark_count = models.PositiveIntegerField(editable=False, default=0)
     premium = models.BooleanField(default=False, help_text='thise post only available for premium users')
     author = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='posts')
     tag = models.ManyToManyField(Tag, related_name='posts')
@@ -52,6 +57,9 @@ class Post(models.Model):
     objects = models.Manager()
     active_objects = PostCustomManager()
 
+    # only ever moved with F() updates, see CounterFieldsMixin
+    COUNTER_FIELDS = ('visit_counter', 'like_count', 'bookmark_count')
+
     class Meta:
         ordering = ('-published_at', )
         indexes = [
@@ -68,7 +76,7 @@ class Post(models.Model):
 
     @property
     def content_overview(self):
-        return self.body[: 50]
+        return self.excerpt
 
     @classmethod
     def create_custom_slug(cls, title):
@@ -81,18 +89,18 @@ class Post(models.Model):
     
     @property
     def post_like_count(self):
-        return self.likes.all().count()
+        return self.like_count
     
     @property
     def post_bookmark_count(self):
-        return self.bookmarks.all().count()
+        return self.bookmark_count
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = Post.create_custom_slug(self.title)
         if not self.body_html:
             self.body_html = self.on_changed_body()
-
+        self.excerpt = self.body[: 50]
         super(Post, self).save(*args, **kwargs)
         
     def __str__(self):
@@ -119,6 +127,8 @@ class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UserPostToggleManager(counter_field='like_count')
+
     class Meta:
         unique_together = ('user', 'post')
         ordering = ('-created_at', )
@@ -156,6 +166,8 @@ class BookMark(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='bookmarks')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UserPostToggleManager(counter_field='bookmark_count')
+
     class Meta:
         verbose_name_plural = 'Bookmarks'
         unique_together = ('user', 'post')
@@ -1,7 +1,43 @@
+from django.core.paginator import InvalidPage, Page
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 DEFAULT_PAGE = 25
-class PostListPagination(PageNumberPagination):
+
+
+class AsyncPageNumberPaginationMixin:
+    """``paginate_queryset`` for async views, counting and slicing through the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count is a cached_property, filling it up front keeps the paginator off the sync ORM
+        paginator.count = await queryset.acount()
+
+        page_number = self.get_page_number(request, paginator)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        object_list = [obj async for obj in queryset[bottom : bottom + page_size]]
+        self.page = Page(object_list, number, paginator)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return object_list
+
+
+class PostListPagination(AsyncPageNumberPaginationMixin, PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
     page_size = 25
@@ -16,7 +52,7 @@ class PostListPagination(PageNumberPagination):
             'result': data
         })
     
-class CommentListPagination(PageNumberPagination):
+class CommentListPagination(AsyncPageNumberPaginationMixin, PageNumberPagination):
     page_size_query_param = 'cmnt_size'
     max_page_size = 20
     page_size = 10
@@ -29,4 +65,4 @@ class CommentListPagination(PageNumberPagination):
             },
             'total': self.page.paginator.count,
             'comments': data
-        })
\ No newline at end of file
+        })
@@ -10,7 +10,7 @@ class CanUserWritePost(permissions.BasePermission):
 class OwnerAndAdminOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         user = request.user
-        return obj.author == user or user.can(Permission.ADMIN)
+        return obj.author_id == user.pk or user.can(Permission.ADMIN)
     
 class CanUserWriteComment(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -18,7 +18,7 @@ class CanUserWriteComment(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         user = request.user
-        return (user.can(Permission.COMMENT) and obj.user == user) or user.can(Permission.ADMIN)
+        return (user.can(Permission.COMMENT) and obj.user_id == user.pk) or user.can(Permission.ADMIN)
     
 class CanUserBookMarkPosts(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -17,6 +17,8 @@ class PostsListSerializer(serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name="blog:post-detail", lookup_field="slug")
     content_overview = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    does_user_likes = serializers.SerializerMethodField()
+    does_user_bookmarks = serializers.SerializerMethodField()
     tag = TagSerializer(many=True)
 
     class Meta:
@@ -31,11 +33,20 @@ class PostsListSerializer(serializers.ModelSerializer):
             "visit_counter",
             "published_at",
             "tag",
+            "does_user_likes",
+            "does_user_bookmarks",
         )
 
     def get_content_overview(self, obj):
         return obj.content_overview
 
+    def get_does_user_likes(self, obj):
+        # filled per page by blog.mixins.ViewerStateMixin
+        return obj.pk in self.context.get("liked_post_ids", ())
+
+    def get_does_user_bookmarks(self, obj):
+        return obj.pk in self.context.get("bookmarked_post_ids", ())
+
     def get_thumbnail_url(self, obj):
         if obj.thumbnail:
             return obj.thumbnail.url
@@ -198,3 +209,26 @@ class AdminUpdateCommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ["content", "is_active"]
+
+
+class PostViewerStateQuerySerializer(serializers.Serializer):
+    slugs = serializers.CharField(required=False, help_text="comma separated post slugs")
+    ids = serializers.CharField(required=False, help_text="comma separated post ids")
+
+    def validate_slugs(self, value):
+        return [slug for slug in value.split(",") if slug]
+
+    def validate_ids(self, value):
+        try:
+            return [int(pk) for pk in value.split(",") if pk]
+        except ValueError:
+            raise serializers.ValidationError("ids must be integers")
+
+    def validate(self, attrs):
+        max_posts = self.context.get("max_posts")
+        requested = len(attrs.get("slugs", [])) + len(attrs.get("ids", []))
+        if not requested:
+            raise serializers.ValidationError("slugs or ids should provided")
+        if max_posts and requested > max_posts:
+            raise serializers.ValidationError(f"at most {max_posts} posts can be requested at once")
+        return attrs
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BookMark, Like, Post, Tag
+from .utils import TAG_LIST_CACHE_KEY, update_posts_count
+
+# Likes and bookmarks toggled through the API keep the post counters in step
+# inside the toggle statement itself. These receivers cover rows created or
+# deleted through the ORM instead (admin, cascades from a deleted user).
+
+
+def _update_counter(post_id, counter_field, delta):
+    Post.objects.filter(pk=post_id).update(**{counter_field: F(counter_field) + delta})
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created and instance.is_active:
+        update_posts_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    if instance.is_active:
+        update_posts_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Like)
+def increment_like_count(sender, instance, created, **kwargs):
+    if created:
+        _update_counter(instance.post_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=Like)
+def decrement_like_count(sender, instance, **kwargs):
+    _update_counter(instance.post_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=BookMark)
+def increment_bookmark_count(sender, instance, created, **kwargs):
+    if created:
+        _update_counter(instance.post_id, 'bookmark_count', 1)
+
+
+@receiver(post_delete, sender=BookMark)
+def decrement_bookmark_count(sender, instance, **kwargs):
+    _update_counter(instance.post_id, 'bookmark_count', -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_list_cache(sender, **kwargs):
+    cache.delete(TAG_LIST_CACHE_KEY)
@@ -1,3 +1,406 @@
-from django.test import TestCase
+import datetime
+import json
+import random
+import threading
+import unittest
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Prefetch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser, Role
+
+from . import async_views
+from . import serializers as blog_serializers
+from . import views as blog_views
+from .fast_serializers import PostsListJSONQuery, PostsListRowSerializer, TagListRowSerializer
+from .models import BookMark, Comment, Like, Post, Tag
+from .utils import get_viewer_post_state
+
+
+def create_users_and_posts(users=4, posts=2):
+    Role.insert_roles()
+    authors = [
+        CustomUser.objects.create_user(email=f"user{index}@example.com", username=f"user{index}", password="password")
+        for index in range(users)
+    ]
+    return authors, [
+        Post.objects.create(title=f"Post {index}", body="body", author=authors[0], status=Post.Status.PUBLISHED)
+        for index in range(posts)
+    ]
+
+
+class ToggleCounterTestMixin:
+    def assertCountersMatchRows(self):
+        for post in Post.objects.all():
+            self.assertEqual(post.like_count, Like.objects.filter(post=post).count())
+            self.assertEqual(post.bookmark_count, BookMark.objects.filter(post=post).count())
+
+
+class ToggleCounterTests(ToggleCounterTestMixin, TestCase):
+    """Post.like_count and Post.bookmark_count must always equal their row counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.posts = create_users_and_posts()
+
+    def test_counters_match_rows_after_many_toggles(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            model = rng.choice([Like, BookMark])
+            user, post = rng.choice(self.users), rng.choice(self.posts)
+            operation = rng.choice(["add", "remove", "toggle", "orm_create", "orm_delete"])
+            if operation == "orm_create":
+                # through the ORM, like the admin does; the receivers keep the counters
+                if not model.objects.filter(user=user, post=post).exists():
+                    model.objects.create(user=user, post=post)
+            elif operation == "orm_delete":
+                model.objects.filter(user=user, post=post).delete()
+            else:
+                getattr(model.objects, operation)(user, post)
+        self.assertCountersMatchRows()
+
+    def test_operation_results(self):
+        user, post = self.users[0], self.posts[0]
+        self.assertEqual(Like.objects.toggle(user, post), (True, False))
+        self.assertFalse(Like.objects.add(user, post))
+        self.assertEqual(Like.objects.toggle(user, post), (False, True))
+        self.assertFalse(Like.objects.remove(user, post))
+        # the related manager is built from UserPostToggleManager without arguments
+        self.assertEqual(post.likes.count(), 0)
+        self.assertCountersMatchRows()
+
+    def test_full_save_of_stale_post_keeps_counters(self):
+        stale = Post.objects.get(pk=self.posts[0].pk)
+        Like.objects.toggle(self.users[1], self.posts[0])
+        BookMark.objects.toggle(self.users[1], self.posts[0])
+
+        stale.title = "Edited"
+        stale.save()
+        self.assertCountersMatchRows()
+        self.assertEqual(Post.objects.get(pk=stale.pk).title, "Edited")
+
+    def test_deleting_a_user_keeps_counters(self):
+        for post in self.posts:
+            Like.objects.toggle(self.users[2], post)
+            BookMark.objects.toggle(self.users[2], post)
+        self.users[2].delete()
+        self.assertCountersMatchRows()
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "concurrent toggles need the Postgres CTE statements")
+class ConcurrentToggleCounterTests(ToggleCounterTestMixin, TransactionTestCase):
+    def test_concurrent_toggles_keep_counters(self):
+        users, posts = create_users_and_posts(users=8, posts=1)
+        barrier = threading.Barrier(len(users) * 2)
+        errors = []
+
+        def toggle(user):
+            try:
+                barrier.wait()
+                for _ in range(25):
+                    Like.objects.toggle(user, posts[0])
+                    BookMark.objects.toggle(user, posts[0])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        # two threads per user, so the same (user, post) row is toggled concurrently too
+        threads = [threading.Thread(target=toggle, args=(user,)) for user in users * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertCountersMatchRows()
+
+
+class AsyncViewParityTests(TestCase):
+    """The async GET views in blog.async_views answer and log exactly like the DRF views they shadow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.posts = create_users_and_posts(users=2, posts=30)
+        cls.user = cls.users[1]
+        tags = [Tag.objects.create(name=f"Tag {index}") for index in range(3)]
+        for index, post in enumerate(cls.posts):
+            post.tag.add(*tags[: index % 4])
+            Post.objects.filter(pk=post.pk).update(visit_counter=index * 7 % 11)
+        Like.objects.toggle(cls.user, cls.posts[-1])
+        BookMark.objects.toggle(cls.user, cls.posts[-2])
+
+        cls.post = cls.posts[-1]
+        for index in range(13):
+            comment = Comment.objects.create(user=cls.users[index % 2], post=cls.post, content=f"comment {index}")
+            if index % 3 == 0:
+                Comment.objects.create(
+                    user=cls.users[0], post=cls.post, content=f"reply {index}", parent_comment=comment
+                )
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.token = str(AccessToken.for_user(self.user))
+
+    def request(self, path, authenticated):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"} if authenticated else {}
+        request = self.factory.get(path, **headers)
+        request.resolver_match = resolve(path.split("?")[0])
+        return request
+
+    def call_both(self, sync_view, async_view, path, authenticated, **kwargs):
+        """Response bodies and log entries of the DRF view and of the async view."""
+        with mock.patch("activity_log.mixins.log_activity") as log_activity:
+            response = sync_view(self.request(path, authenticated), **kwargs)
+            response.render()
+        with mock.patch("activity_log.mixins.alog_activity", new_callable=mock.AsyncMock) as alog_activity:
+            async_response = async_to_sync(async_view)(self.request(path, authenticated), **kwargs)
+
+        self.assertEqual(async_response.status_code, response.status_code)
+        self.assertEqual(alog_activity.call_args_list, log_activity.call_args_list)
+        self.assertEqual(log_activity.call_count, int(authenticated))
+        return json.loads(response.content), json.loads(async_response.content)
+
+    def assertSameResponses(self, sync_view, async_view, paths, **kwargs):
+        for path in paths:
+            for authenticated in (False, True):
+                with self.subTest(path=path, authenticated=authenticated):
+                    data, async_data = self.call_both(sync_view, async_view, path, authenticated, **kwargs)
+                    self.assertEqual(async_data, data)
+
+    def test_post_list(self):
+        paths = ["/post/", "/post/?page=2", "/post/?page_size=7&page=3", "/post/?ordering=-view", "/post/?tag=tag-1"]
+        for fast in (True, False):
+            with self.subTest(FAST_LIST_SERIALIZERS=fast), override_settings(FAST_LIST_SERIALIZERS=fast):
+                self.assertSameResponses(
+                    blog_views.PostApiView.as_view({"get": "list"}),
+                    async_views.AsyncPostListView.as_view(),
+                    paths,
+                )
+
+    def test_post_list_serializer_follows_setting(self):
+        view = async_views.AsyncPostListView.as_view()
+        serialize = PostsListRowSerializer.serialize
+        for fast in (True, False):
+            with self.subTest(FAST_LIST_SERIALIZERS=fast), override_settings(FAST_LIST_SERIALIZERS=fast), mock.patch(
+                "activity_log.mixins.alog_activity", new_callable=mock.AsyncMock
+            ), mock.patch.object(PostsListRowSerializer, "serialize", autospec=True, side_effect=serialize) as row:
+                response = async_to_sync(view)(self.request("/post/", authenticated=True))
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(row.called, fast)
+
+    def test_post_list_url_sql_json(self):
+        """With SQL_JSON_POST_LISTS on, GET /post/ answers with the JSON PostsListJSONQuery returns."""
+        result = [{"id": post.pk} for post in self.posts[::-1][:5]]
+        with override_settings(SQL_JSON_POST_LISTS=True), mock.patch.object(
+            PostsListJSONQuery, "is_supported", return_value=True
+        ), mock.patch.object(PostsListJSONQuery, "fetch", return_value=json.dumps(result)) as fetch:
+            response = self.client.get("/post/?page_size=5")
+
+        self.assertEqual(response.status_code, 200)
+        fetch.assert_called_once_with([post.pk for post in self.posts[::-1][:5]])
+        data = response.json()
+        self.assertEqual(data["result"], result)
+        self.assertEqual(data["total"], len(self.posts))
+        self.assertEqual(data["links"]["prev"], None)
+
+    def test_post_list_out_of_range_page(self):
+        self.assertSameResponses(
+            blog_views.PostApiView.as_view({"get": "list"}), async_views.AsyncPostListView.as_view(), ["/post/?page=9"]
+        )
+
+    def test_post_detail(self):
+        path = f"/post/{self.post.slug}/"
+        for authenticated in (False, True):
+            data, async_data = self.call_both(
+                blog_views.PostApiView.as_view({"get": "retrieve"}),
+                async_views.AsyncPostDetailView.as_view(),
+                path,
+                authenticated,
+                slug=self.post.slug,
+            )
+            # each call counts a visit
+            self.assertEqual(async_data.pop("visit_counter"), data.pop("visit_counter") + 1)
+            self.assertEqual(async_data, data)
+
+    def test_tag_list(self):
+        self.assertSameResponses(
+            blog_views.TagListApiView.as_view({"get": "list"}), async_views.AsyncTagListView.as_view(), ["/tags/"]
+        )
+
+    def test_comment_list(self):
+        path = f"/post/{self.post.slug}/comments/"
+        self.assertSameResponses(
+            blog_views.ListAndCreateCommentApiView.as_view({"get": "list"}),
+            async_views.AsyncCommentListView.as_view(),
+            [path, f"{path}?page=2", f"{path}?cmnt_size=5&page=3"],
+            post_slug=self.post.slug,
+        )
+
+    def test_missing_post(self):
+        self.assertSameResponses(
+            blog_views.PostApiView.as_view({"get": "retrieve"}),
+            async_views.AsyncPostDetailView.as_view(),
+            ["/post/missing/"],
+            slug="missing",
+        )
+        self.assertSameResponses(
+            blog_views.ListAndCreateCommentApiView.as_view({"get": "list"}),
+            async_views.AsyncCommentListView.as_view(),
+            ["/post/missing/comments/"],
+            post_slug="missing",
+        )
+
+
+class PostListDataMixin:
+    """Posts whose list entries cover every field the list serializers build differently."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.posts = create_users_and_posts(users=2, posts=6)
+        cls.user = cls.users[1]
+        # may bookmark
+        cls.user.role = Role.objects.get(name="PremiumUser")
+        cls.user.save()
+        tags = [Tag.objects.create(name=f"Tag {index}") for index in range(4)]
+        published_at = datetime.datetime(2024, 3, 1, 12, 30, tzinfo=datetime.timezone.utc)
+        for index, post in enumerate(cls.posts):
+            # linked newest tag first, so link order and tag id order differ
+            for tag in reversed(tags[: index % 5]):
+                post.tag.add(tag)
+            Post.objects.filter(pk=post.pk).update(
+                visit_counter=index * 3,
+                # percent-encoded in the URL
+                thumbnail=f"posts/{post.title}/post_thumbnail/caf\u00e9 #{index} (1)%.png" if index % 2 else "",
+                # with and without microseconds
+                published_at=published_at - datetime.timedelta(days=index, microseconds=index % 3 * 1500),
+            )
+            if index % 2:
+                Like.objects.toggle(cls.user, post)
+            if index % 3:
+                BookMark.objects.toggle(cls.user, post)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def request(self, path, user=None):
+        request = self.factory.get(path)
+        request.resolver_match = resolve(path.split("?")[0])
+        if user is not None:
+            force_authenticate(request, user)
+        return request
+
+
+class FastListSerializerParityTests(PostListDataMixin, TestCase):
+    """The row serializers in blog.fast_serializers render what the ModelSerializers render."""
+
+    def test_posts_list_serializers(self):
+        liked, bookmarked = {self.posts[1].pk, self.posts[3].pk}, {self.posts[2].pk}
+        queryset = Post.objects.order_by("pk")
+        request = Request(self.request("/post/"))
+
+        posts = queryset.prefetch_related(Prefetch("tag", queryset=Tag.objects.order_by("pk")))
+        context = {"request": request, "liked_post_ids": liked, "bookmarked_post_ids": bookmarked}
+        data = blog_serializers.PostsListSerializer(posts, many=True, context=context).data
+        rows = PostsListRowSerializer(request, liked, bookmarked).serialize(PostsListRowSerializer.values(queryset))
+        self.assertEqual(json.loads(json.dumps(rows)), json.loads(json.dumps(data)))
+
+    def test_tag_list_serializers(self):
+        request = Request(self.request("/tags/"))
+        data = blog_serializers.TagListSerializer(Tag.objects.all(), many=True, context={"request": request}).data
+        rows = TagListRowSerializer(request).serialize(TagListRowSerializer.values(Tag.objects.all()))
+        self.assertEqual(rows, data)
+
+    def assertSameResponses(self, view, path, user=None, **kwargs):
+        responses = []
+        for fast in (False, True):
+            with override_settings(FAST_LIST_SERIALIZERS=fast):
+                response = view(self.request(path, user), **kwargs)
+                response.render()
+            self.assertEqual(response.status_code, 200)
+            responses.append(json.loads(response.content))
+        self.assertEqual(responses[1], responses[0])
+
+    def test_list_views(self):
+        post_list = blog_views.PostApiView.as_view({"get": "list"})
+        for user in (None, self.user):
+            with self.subTest(user=user):
+                self.assertSameResponses(post_list, "/post/", user)
+                self.assertSameResponses(post_list, "/post/?page_size=4&page=2", user)
+                self.assertSameResponses(
+                    blog_views.PostsByTagApiView.as_view({"get": "list"}), "/post/tags/tag-1/", user, slug="tag-1"
+                )
+                self.assertSameResponses(blog_views.TagListApiView.as_view({"get": "list"}), "/tags/", user)
+        self.assertSameResponses(blog_views.LikeApiView.as_view({"get": "list"}), "/likes/", self.user)
+        self.assertSameResponses(
+            blog_views.BookMarkApiView.as_view({"get": "list_bookmarks"}), "/bookmarks/", self.user
+        )
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "PostsListJSONQuery needs Postgres")
+class PostsListJSONQueryParityTests(PostListDataMixin, TestCase):
+    """The JSON Postgres builds parses to what PostsListRowSerializer returns."""
+
+    def assertSameAsRowSerializer(self, user=None):
+        request = Request(self.request("/post/", user))
+        post_ids = [post.pk for post in reversed(self.posts)]
+        rows = PostsListRowSerializer.values(Post.objects.filter(pk__in=post_ids).order_by("-pk"))
+        liked, bookmarked = get_viewer_post_state(request.user, post_ids)
+        expected = PostsListRowSerializer(request, liked, bookmarked).serialize(rows)
+        self.assertEqual(json.loads(PostsListJSONQuery(request, "default").fetch(post_ids)), expected)
+
+    def test_matches_row_serializer(self):
+        # UTC written as "Z", a half hour offset and a negative one
+        for time_zone in ("UTC", "Asia/Tehran", "America/New_York"):
+            for user in (None, self.user):
+                with self.subTest(time_zone=time_zone, user=user), timezone.override(time_zone):
+                    self.assertSameAsRowSerializer(user)
+
+    def test_empty_page(self):
+        request = Request(self.request("/post/"))
+        self.assertEqual(PostsListJSONQuery(request, "default").fetch([]), "[]")
+
+    def test_list_views(self):
+        for user in (None, self.user):
+            for view, path, kwargs in (
+                (blog_views.PostApiView.as_view({"get": "list"}), "/post/?page_size=4&page=2", {}),
+                (blog_views.PostsByTagApiView.as_view({"get": "list"}), "/post/tags/tag-1/", {"slug": "tag-1"}),
+            ):
+                responses = []
+                for sql_json in (False, True):
+                    with override_settings(SQL_JSON_POST_LISTS=sql_json):
+                        response = view(self.request(path, user), **kwargs)
+                        response.render()
+                    responses.append(json.loads(response.content))
+                with self.subTest(path=path, user=user):
+                    self.assertEqual(responses[1], responses[0])
+
+    def test_post_list_url(self):
+        """GET /post/ goes through the async view when ASYNC_READ_VIEWS is on, which must use the SQL JSON too."""
+        path = "/post/?page_size=4&page=2"
+        for user in (None, self.user):
+            if user is not None:
+                self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+            responses = []
+            for sql_json in (False, True):
+                with override_settings(SQL_JSON_POST_LISTS=sql_json), mock.patch.object(
+                    PostsListJSONQuery, "fetch", autospec=True, side_effect=PostsListJSONQuery.fetch
+                ) as fetch:
+                    response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(fetch.called, sql_json)
+                responses.append(response.json())
+            with self.subTest(user=user):
+                self.assertEqual(responses[1], responses[0])
 
-# Create your tests here.
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter, DefaultRouter
 from rest_framework_nested import routers
 
-from . import views
+from . import async_views, views
 
 app_name = 'blog'
 
@@ -29,10 +30,26 @@ urlpatterns = [
     path('likes/', views.LikeApiView.as_view({'get': 'list'}), name='user-likes'),
     path('post/<slug:post_slug>/likes', views.LikeApiView.as_view({'get': 'retrieve'}), name='likes'),
     path('post/<slug:post_slug>/like/', views.LikeApiView.as_view({'post': 'create'}), name='toggle-like'),
+    path('posts/state/', views.PostViewerStateApiView.as_view({'get': 'list'}), name='post-viewer-state'),
     path('comment/<uuid:uuid>/',
          views.UpdateAndDeleteCommentApiView.as_view(
              {'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='comment'),
     path('tags/', views.TagListApiView.as_view({'get': 'list'}), name='tag-list'),
     path('post/tags/<slug:slug>/', views.PostsByTagApiView.as_view({'get': 'list'}), name='post-by-tag'),
 
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Async versions of the hottest GET endpoints, other methods still go to the DRF views.
+    urlpatterns = [
+        path('post/', async_views.AsyncPostListView.as_view(
+            sync_view=views.PostApiView.as_view({'get': 'list', 'post': 'create'})), name='post-list'),
+        path('post/<slug:slug>/', async_views.AsyncPostDetailView.as_view(
+            sync_view=views.PostApiView.as_view(
+                {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'})),
+             name='post-detail'),
+        path('post/<slug:post_slug>/comments/', async_views.AsyncCommentListView.as_view(
+            sync_view=views.ListAndCreateCommentApiView.as_view({'get': 'list', 'post': 'create'})),
+             name='post-commnts-list'),
+        path('tags/', async_views.AsyncTagListView.as_view(), name='tag-list'),
+    ] + urlpatterns
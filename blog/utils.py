@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from accounts.services import invalidate_profile
+
+from .fast_serializers import TagListRowSerializer
+from .models import BookMark, Like, Tag
+
+TAG_LIST_CACHE_KEY = "tag_list"
+
+
+def update_posts_count(author_id, delta):
+    get_user_model().objects.filter(pk=author_id).update(posts_count=F("posts_count") + delta)
+    transaction.on_commit(lambda: invalidate_profile(author_id))
+
+
+def get_viewer_post_state(user, post_ids):
+    """Return the ids in ``post_ids`` the user has liked and bookmarked, one query each."""
+    if not user.is_authenticated or not post_ids:
+        return set(), set()
+    return (
+        Like.objects.post_ids_for_user(user, post_ids),
+        BookMark.objects.post_ids_for_user(user, post_ids),
+    )
+
+
+async def aget_viewer_post_state(user, post_ids):
+    if not user.is_authenticated or not post_ids:
+        return set(), set()
+    return (
+        await Like.objects.apost_ids_for_user(user, post_ids),
+        await BookMark.objects.apost_ids_for_user(user, post_ids),
+    )
+
+
+async def aget_cached_tags():
+    """``.values()`` rows of all tags, served from the cache. The entry is dropped whenever a tag changes."""
+    rows = await cache.aget(TAG_LIST_CACHE_KEY)
+    if rows is None:
+        rows = [row async for row in TagListRowSerializer.values(Tag.objects.all())]
+        await cache.aset(TAG_LIST_CACHE_KEY, rows, timeout=60 * 60)
+    return rows
@@ -1,30 +1,37 @@
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404, render
-from django.urls import resolve, reverse
+from django.urls import reverse
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.throttling import UserRateThrottle
 from rest_framework.views import Response, status
 
 from accounts.models import Permission
 from activity_log.mixins import ActivityLogMixin
 from activity_log.models import ActivityLog
+from core.throttling import RedisUserRateThrottle
 from notifications.utils import send_notification
 
 from . import serializers
+from .fast_serializers import TagListRowSerializer
+from .mixins import PostListMixin
 from .models import BookMark, Comment, Like, Post, PostImage, Tag
 from .ordering import CustomOrderingFilter
 from .pagination import CommentListPagination, PostListPagination
 from .permissions import CanUserBookMarkPosts, CanUserWriteComment, CanUserWritePost, OwnerAndAdminOnly
+from .utils import get_viewer_post_state, update_posts_count
 
 
-class CreatePostRequestThrottle(UserRateThrottle):
+class CreatePostRequestThrottle(RedisUserRateThrottle):
+    scope = "create_post"
     rate = "300/hour"
 
 
-class PostApiView(ActivityLogMixin, viewsets.ModelViewSet):
+class PostApiView(ActivityLogMixin, PostListMixin, viewsets.ModelViewSet):
+    log_model = Post
     pagination_class = PostListPagination
     filter_backends = (CustomOrderingFilter,)
     search_fields = ["=author__username"]
@@ -64,17 +71,20 @@ class PostApiView(ActivityLogMixin, viewsets.ModelViewSet):
 
     def get_object(self):
         obj = super().get_object()
+        Post.objects.filter(pk=obj.pk).update(visit_counter=F("visit_counter") + 1)
         obj.visit_counter += 1
-        obj.save()
-        obj.refresh_from_db()
         return obj
 
     def list(self, request):
         qs = self.filter_queryset(self.get_queryset())
+        if self.sql_json_enabled(qs):
+            post_ids = self.paginate_queryset(qs.values_list("id", flat=True))
+            return self.get_sql_json_response(post_ids, qs.db)
+
+        qs = self.get_post_list_queryset(qs)
         post_paginate_qs = self.paginate_queryset(qs)
-        serializer = self.get_serializer(post_paginate_qs, many=True)
 
-        result = self.get_paginated_response(serializer.data)
+        result = self.get_paginated_response(self.get_post_list_data(post_paginate_qs))
 
         return Response(result.data, status=status.HTTP_200_OK)
 
@@ -94,10 +104,12 @@ class PostApiView(ActivityLogMixin, viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         obj = self.get_object()
-        obj.is_active = False
-        obj.save()
+        # conditional update, so two concurrent deletes only count once
+        if Post.objects.filter(pk=obj.pk, is_active=True).update(is_active=False):
+            update_posts_count(obj.author_id, -1)
 
         return Response({"success": "Your post has been deleted"}, status=status.HTTP_200_OK)
 
@@ -162,8 +174,16 @@ class TagListApiView(ActivityLogMixin, mixins.ListModelMixin, viewsets.GenericVi
     queryset = Tag.objects.all()
     serializer_class = serializers.TagListSerializer
 
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        rows = TagListRowSerializer.values(self.filter_queryset(self.get_queryset()))
+        return Response(TagListRowSerializer(request).serialize(rows), status=status.HTTP_200_OK)
 
-class PostsByTagApiView(ActivityLogMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+
+class PostsByTagApiView(ActivityLogMixin, PostListMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    log_model = Post
     pagination_class = PostListPagination
     serializer_class = serializers.PostsListSerializer
 
@@ -185,19 +205,25 @@ class PostsByTagApiView(ActivityLogMixin, mixins.ListModelMixin, viewsets.Generi
             )
 
         queryset = self.get_queryset().filter(tag__slug=slug)
-
+        if self.sql_json_enabled(queryset):
+            post_ids = queryset.values_list("id", flat=True)
+            page = self.paginate_queryset(post_ids)
+            if page:
+                return self.get_sql_json_response(page, queryset.db)
+            return self.get_sql_json_response(post_ids, queryset.db, paginated=False)
+
+        queryset = self.get_post_list_queryset(queryset)
         page = self.paginate_queryset(queryset)
 
         if page:
-            serializer = self.get_serializer(page, many=True)
-            result = self.get_paginated_response(serializer.data)
+            result = self.get_paginated_response(self.get_post_list_data(page))
             return Response(result.data, status=status.HTTP_200_OK)
 
-        serailizer = self.get_serializer(queryset, many=True)
-        return Response(serailizer.data, status=status.HTTP_200_OK)
+        return Response(self.get_post_list_data(queryset), status=status.HTTP_200_OK)
 
 
-class LikeApiView(ActivityLogMixin, viewsets.GenericViewSet):
+class LikeApiView(ActivityLogMixin, PostListMixin, viewsets.GenericViewSet):
+    log_model = Post
     serializer_class = serializers.PostsListSerializer
     IS_LIKE = False
 
@@ -205,7 +231,8 @@ class LikeApiView(ActivityLogMixin, viewsets.GenericViewSet):
         return Post.active_objects.filter(premium=self.request.user.is_authenticated and self.request.user.is_premium)
 
     def get_object(self):
-        return get_object_or_404(self.get_queryset(), slug=self.kwargs["post_slug"])
+        self.log_object = get_object_or_404(self.get_queryset(), slug=self.kwargs["post_slug"])
+        return self.log_object
 
     def get_permissions(self):
         if self.action in ["create", "list"]:
@@ -214,16 +241,14 @@ class LikeApiView(ActivityLogMixin, viewsets.GenericViewSet):
 
     def list(self, request, *args, **kwargs):
         user = request.user
-        queryset = self.get_queryset().filter(likes__user=user)
+        queryset = self.get_post_list_queryset(self.get_queryset().filter(likes__user=user))
         page = self.paginate_queryset(queryset)
 
         if page:
-            serializer = self.get_serializer(page, many=True)
-            result = self.get_paginated_response(serializer.data)
+            result = self.get_paginated_response(self.get_post_list_data(page))
             return Response(result.data, status=status.HTTP_200_OK)
 
-        serailizer = self.get_serializer(queryset, many=True)
-        return Response(serailizer.data, status=status.HTTP_200_OK)
+        return Response(self.get_post_list_data(queryset), status=status.HTTP_200_OK)
 
     def retrieve(self, request, post_slug=None):
         post = self.get_object()
@@ -242,19 +267,16 @@ class LikeApiView(ActivityLogMixin, viewsets.GenericViewSet):
     def create(self, request, post_slug=None):
         post = self.get_object()
 
-        like_obj = Like.objects.filter(post=post, user=request.user).first()
-        if not like_obj:
-            like_obj = Like.objects.create(post=post, user=request.user)
-            self.IS_LIKE = True
+        created, deleted = Like.objects.toggle(request.user, post)
+        if deleted:
+            self.IS_LIKE = False
+            return Response({"success": "You unliked this post"}, status=status.HTTP_200_OK)
 
+        self.IS_LIKE = True
+        if created:
             self._send_message_to_notifiaction(request, post)
 
-            return Response({"success": "You liked this post"}, status=status.HTTP_201_CREATED)
-
-        like_obj.delete()
-        self.IS_LIKE = False
-
-        return Response({"success": "You unliked this post"}, status=status.HTTP_200_OK)
+        return Response({"success": "You liked this post"}, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def _send_message_to_notifiaction(request, liked_post):
@@ -271,7 +293,51 @@ class LikeApiView(ActivityLogMixin, viewsets.GenericViewSet):
         return super()._get_action_type(request)
 
 
+class PostViewerStateApiView(viewsets.GenericViewSet):
+    """Like/bookmark counts and the current user's flags for a batch of posts.
+
+    Replaces one ``post/<slug>/likes`` call per post when rendering a feed page.
+    """
+
+    MAX_POSTS = 100
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_authenticated:
+            return Post.active_objects.get_premium_posts(user.is_premium)
+        return Post.active_objects.all()
+
+    def list(self, request):
+        query_serializer = serializers.PostViewerStateQuerySerializer(
+            data=request.query_params, context={"max_posts": self.MAX_POSTS}
+        )
+        query_serializer.is_valid(raise_exception=True)
+        slugs = query_serializer.validated_data.get("slugs", [])
+        ids = query_serializer.validated_data.get("ids", [])
+
+        posts = list(
+            self.get_queryset()
+            .filter(Q(slug__in=slugs) | Q(pk__in=ids))
+            .values("id", "slug", "like_count", "bookmark_count")
+        )
+        liked, bookmarked = get_viewer_post_state(request.user, [post["id"] for post in posts])
+
+        result = [
+            {
+                "id": post["id"],
+                "slug": post["slug"],
+                "post_likes_count": post["like_count"],
+                "post_bookmarks_count": post["bookmark_count"],
+                "does_user_likes": post["id"] in liked,
+                "does_user_bookmarks": post["id"] in bookmarked,
+            }
+            for post in posts
+        ]
+        return Response({"result": result}, status=status.HTTP_200_OK)
+
+
 class ListAndCreateCommentApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.GenericViewSet):
+    log_model = Comment
     pagination_class = CommentListPagination
     lookup_field = "uuid"
     lookup_url_kwarg = "uuid"
@@ -300,6 +366,7 @@ class ListAndCreateCommentApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.G
     def get_object(self, uuid=None, post_slug=None):
         self.comment_obj = get_object_or_404(self.get_queryset(post_slug), uuid=self.kwargs.get(self.lookup_url_kwarg))
         self.check_object_permissions(self.request, self.comment_obj)
+        self.log_object = self.comment_obj
         return self.comment_obj
 
     def list(self, request, post_slug=None):
@@ -308,7 +375,7 @@ class ListAndCreateCommentApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.G
         comment_paginate_qs = self.paginate_queryset(qs)
 
         post = self._get_post(post_slug)
-        is_owner = post.author == request.user or (user.is_authenticated and user.can(Permission.ADMIN))
+        is_owner = post.author_id == user.pk or (user.is_authenticated and user.can(Permission.ADMIN))
 
         context = {"request": request, "is_owner": is_owner}
 
@@ -367,18 +434,11 @@ class ListAndCreateCommentApiView(ActivityLogMixin, viewsets.ViewSet, viewsets.G
                     ActivityLog.Activity_Type.COMMENT \
                     } \
             -- Path: {request.path} \
-            -- Path Name: {resolve(request.path_info).url_name}'
-
-    def _write_log(self, request, response):
-        activitylog_instance = super()._write_log(request, response)
-        if activitylog_instance:
-            with transaction.atomic():
-                activitylog_instance.content_type = ContentType.objects.get_for_model(Comment)
-                activitylog_instance.object_id = getattr(self, "comment_obj", None)
-                activitylog_instance.save()
+            -- Path Name: {request.resolver_match.url_name}'
 
 
 class UpdateAndDeleteCommentApiView(ActivityLogMixin, viewsets.ModelViewSet):
+    log_model = Comment
     lookup_field = "uuid"
     lookup_url_kwarg = "uuid"
     permission_classes = [IsAuthenticated, CanUserWriteComment]
@@ -400,11 +460,11 @@ class UpdateAndDeleteCommentApiView(ActivityLogMixin, viewsets.ModelViewSet):
         uuid = self.kwargs.get(self.lookup_url_kwarg)
         obj = get_object_or_404(self.get_queryset(), uuid=uuid)
         self.check_object_permissions(self.request, obj)
+        self.log_object = obj
         return obj
 
     def destroy(self, request, *args, **kwargs):
         comment_obj = self.get_object()
-        self.comment_obj = comment_obj.pk
         comment_obj.is_active = False
         comment_obj.save()
         return Response({"success": "Comment deleted"}, status=status.HTTP_200_OK)
@@ -418,14 +478,9 @@ class UpdateAndDeleteCommentApiView(ActivityLogMixin, viewsets.ModelViewSet):
 
         return Response(serializer.data)
 
-    def _write_log(self, request, response):
-        activitylog_instance = super()._write_log(request, response)
-        if activitylog_instance and self.action == "destroy":
-            activitylog_instance.object_id = getattr(self, "comment_obj", None)
-            activitylog_instance.save()
-
 
-class BookMarkApiView(ActivityLogMixin, viewsets.GenericViewSet):
+class BookMarkApiView(ActivityLogMixin, PostListMixin, viewsets.GenericViewSet):
+    log_model = Post
     permission_classes = [IsAuthenticated, CanUserBookMarkPosts]
     pagination_class = PostListPagination
     serializer_class = serializers.PostsListSerializer
@@ -434,38 +489,36 @@ class BookMarkApiView(ActivityLogMixin, viewsets.GenericViewSet):
         return Post.objects.filter(bookmarks__user=self.request.user)
 
     def get_object(self):
-        return get_object_or_404(
+        self.log_object = get_object_or_404(
             Post.active_objects.filter(premium=self.request.user.is_premium),
             slug=self.kwargs.get("post_slug"),
         )
+        return self.log_object
 
     @action(detail=True, methods=["POST"], url_path="bookmark")
     def bookmark(self, request, post_slug=None):
         post_obj = self.get_object()
         self.BOOKMARK = False
 
-        bookmark_obj, created = BookMark.objects.get_or_create(user=request.user, post=post_obj)
+        created, deleted = BookMark.objects.toggle(request.user, post_obj)
 
-        if created:
+        if not deleted:
             self.BOOKMARK = True
             return Response({"success": "Post bookmarked"}, status=status.HTTP_201_CREATED)
 
-        bookmark_obj.delete()
         return Response({"success": "Post unbookmarked"}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["GET"], url_path="bookmarks")
     def list_bookmarks(self, request):
 
-        bookmarks_queryset = Post.objects.filter(bookmarks__user=request.user)
+        bookmarks_queryset = self.get_post_list_queryset(Post.objects.filter(bookmarks__user=request.user))
         page = self.paginate_queryset(bookmarks_queryset)
 
         if page:
-            serializer = self.get_serializer(page, many=True)
-            result = self.get_paginated_response(serializer.data)
+            result = self.get_paginated_response(self.get_post_list_data(page))
             return Response(result.data, status=status.HTTP_200_OK)
 
-        serailizer = self.get_serializer(bookmarks_queryset, many=True)
-        return Response(serailizer.data, status=status.HTTP_200_OK)
+        return Response(self.get_post_list_data(bookmarks_queryset), status=status.HTTP_200_OK)
 
     def _get_action_type(self, request):
         if self.action == "bookmark":
@@ -474,8 +527,8 @@ class BookMarkApiView(ActivityLogMixin, viewsets.GenericViewSet):
             return ActivityLog.Activity_Type.UNBOOKMARK
         return super()._get_action_type(request)
 
-    def _write_log(self, request, response):
-        activitylog_instance = super()._write_log(request, response)
-        if activitylog_instance and self.action == "list_bookmarks":
-            activitylog_instance.content_type = ContentType.objects.get_for_model(BookMark)
-            activitylog_instance.save()
+    def get_log_data(self, request, response):
+        data = super().get_log_data(request, response)
+        if self.action == "list_bookmarks":
+            data["content_type"] = ContentType.objects.get_for_model(BookMark)
+        return data
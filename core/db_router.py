@@ -0,0 +1,31 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Set per request by core.middleware.ReplicaRoutingMiddleware. Everything that
+# runs outside a request (celery tasks, management commands) reads the primary.
+replica_reads_allowed = ContextVar("replica_reads_allowed", default=False)
+
+
+class PrimaryReplicaRouter:
+    """Send reads to a replica when the current request allows it, everything else to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not replica_reads_allowed.get():
+            return "default"
+        # reads inside a transaction must see the writes made by it
+        if connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
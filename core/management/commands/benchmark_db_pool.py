@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the same concurrent requests with a new connection per request, persistent connections "
+        "and the psycopg pool, and report latency and how many server connections each opened"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.ASGI_THREADS,
+            help="worker threads, like the threads Daphne runs sync views on",
+        )
+        parser.add_argument('--query-ms', type=float, default=2, help="time each request spends in its query")
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            raise CommandError("connection pooling needs Postgres")
+
+        default = settings.DATABASES[DEFAULT_DB_ALIAS]
+        options_without_pool = {key: value for key, value in default['OPTIONS'].items() if key != 'pool'}
+        pool = default['OPTIONS'].get('pool') or {'min_size': 2, 'max_size': options['concurrency']}
+        modes = [
+            ("new connection", {'CONN_MAX_AGE': 0, 'OPTIONS': options_without_pool}),
+            ("persistent", {'CONN_MAX_AGE': 60, 'OPTIONS': options_without_pool}),
+            ("pool", {'CONN_MAX_AGE': 0, 'OPTIONS': {**options_without_pool, 'pool': pool}}),
+        ]
+
+        self.stdout.write(f"{'connections':<16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'opened':>8}")
+        for index, (name, overrides) in enumerate(modes):
+            alias = f'benchmark_db_pool_{index}'
+            connections.settings[alias] = connections.configure_settings(
+                {DEFAULT_DB_ALIAS: {**default, **overrides, 'TEST': {}}}
+            )[DEFAULT_DB_ALIAS]
+            try:
+                elapsed, latencies, opened = self.run(alias, options)
+            finally:
+                if 'pool' in overrides['OPTIONS']:
+                    connections[alias].close_pool()
+                del connections.settings[alias]
+            self.stdout.write(
+                f"{name:<16} {options['requests'] / elapsed:>8.0f} {statistics.median(latencies) * 1000:>8.1f} "
+                f"{self.percentile(latencies, 0.99) * 1000:>8.1f} {opened:>8}"
+            )
+
+    @staticmethod
+    def percentile(values, fraction):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    def run(self, alias, options):
+        query_seconds = options['query_ms'] / 1000
+        concurrency = options['concurrency']
+
+        def request(_):
+            started = time.perf_counter()
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT pg_backend_pid(), pg_sleep(%s)", [query_seconds])
+                pid = cursor.fetchone()[0]
+            latency = time.perf_counter() - started
+            # what the request_finished handler does with the thread's connection
+            connections[alias].close_if_unusable_or_obsolete()
+            return latency, pid
+
+        closed = threading.Barrier(concurrency)
+
+        def close(_):
+            # one per worker thread, since each waits for all the others
+            closed.wait()
+            connections[alias].close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(request, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            list(executor.map(close, range(concurrency)))
+
+        latencies = [latency for latency, _ in results]
+        # every server connection is a backend process with its own pid
+        opened = len({pid for _, pid in results})
+        return elapsed, latencies, opened
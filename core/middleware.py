@@ -0,0 +1,81 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .db_router import replica_reads_allowed
+
+
+class ReplicaRoutingMiddleware:
+    """Allow replica reads for safe requests, unless the user wrote recently.
+
+    After a user makes an unsafe request their reads stick to the primary for
+    ``REPLICA_STICKY_SECONDS``, so they always read their own writes.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.jwt_authentication = JWTAuthentication()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        user_id = self._get_token_user_id(request)
+        if user_id is None and self._has_session(request):
+            user_id = request.session.get(SESSION_KEY)
+        is_safe = request.method in self.SAFE_METHODS
+        pinned = is_safe and user_id is not None and cache.get(self._pin_key(user_id))
+        token = replica_reads_allowed.set(is_safe and not pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+
+        if not is_safe and user_id is not None:
+            cache.set(self._pin_key(user_id), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        user_id = self._get_token_user_id(request)
+        if user_id is None and self._has_session(request):
+            user_id = await request.session.aget(SESSION_KEY)
+        is_safe = request.method in self.SAFE_METHODS
+        pinned = is_safe and user_id is not None and await cache.aget(self._pin_key(user_id))
+        token = replica_reads_allowed.set(is_safe and not pinned)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+
+        if not is_safe and user_id is not None:
+            await cache.aset(self._pin_key(user_id), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def _pin_key(user_id):
+        return f"db_primary_pin_{user_id}"
+
+    @staticmethod
+    def _has_session(request):
+        return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+    def _get_token_user_id(self, request):
+        header = self.jwt_authentication.get_header(request)
+        raw_token = header and self.jwt_authentication.get_raw_token(header)
+        if not raw_token:
+            return None
+        # the id names a cache key that pins the user, so it must come from a signed token
+        try:
+            return self.jwt_authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+        except InvalidToken:
+            return None
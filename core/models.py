@@ -0,0 +1,18 @@
+class CounterFieldsMixin:
+    """Keep ``save()`` from writing ``COUNTER_FIELDS`` back.
+
+    Counter columns are only moved with ``F()`` updates, so an instance
+    loaded before one of them holds a stale value. A plain ``save()`` of an
+    existing row updates every loaded field except the counters.
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
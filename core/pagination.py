@@ -0,0 +1,101 @@
+"""Cursor pagination keyed on every ordering field.
+
+DRF's CursorPagination keeps the first ordering field of the last entry and
+an offset into the entries that share it. A run of equal values is paged by
+offset, so it shifts when entries are added, and a first page that is all
+ties gets a cursor with no position at all.
+
+KeysetCursorPagination puts every ordering field in the position instead.
+``ordering`` ends with a unique field, so every entry has its own position,
+the offset stays 0, and a page starts strictly after the previous one's last
+entry: ``(a, b) < (a0, b0)`` is ``a < a0 OR (a = a0 AND b < b0)``.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    # all fields go the same direction and the last one is unique
+    ordering = ('-created', '-id')
+    position_separator = '|'
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return self.position_separator.join(values)
+
+    def get_position_filter(self, position, lookup):
+        names = [field.lstrip('-') for field in self.ordering]
+        values = position.split(self.position_separator, len(names) - 1)
+        if len(values) != len(names):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition, equal = Q(), {}
+        for name, value in zip(names, values):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset, filtering on the whole position
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*[field[1:] if field[0] == '-' else f'-{field}' for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            lookup = 'lt' if self.cursor.reverse != self.ordering[0].startswith('-') else 'gt'
+            try:
+                queryset = queryset.filter(self.get_position_filter(current_position, lookup))
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
+from celery.schedules import crontab
 
 load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 
     # LOCAL
+    'core',
     'accounts.apps.AccountsConfig',
     'blog.apps.BlogConfig',
     'notifications.apps.NotificationsConfig',
@@ -38,6 +40,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -69,18 +72,51 @@ CHANNEL_LAYERS = {
     }
 }
 ASGI_APPLICATION = "core.asgi.application"
+# serve post list/detail, tag list and comment list GETs from the async views in blog.async_views
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'True') == 'True'
+
+# Under Daphne every sync view runs on a worker thread (ASGI_THREADS, read by Daphne)
+# and each busy thread holds one connection, so the pool is sized after the thread count.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', min(32, (os.cpu_count() or 1) + 4)))
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'True') == 'True'
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv('DB_NAME'),
         "USER": os.getenv('DB_USER'),
         "PASSWORD": os.getenv('DB_PASSWORD'),
         "HOST": os.getenv('DB_HOST', 'localhost'),
-        "PORT": os.getenv('DB_PORT')
+        "PORT": os.getenv('DB_PORT'),
+        # with pooling enabled this makes the pool ping connections before handing them out
+        "CONN_HEALTH_CHECKS": True,
+        # pooled connections are returned to the pool after each request instead
+        "CONN_MAX_AGE": 0 if DB_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        "OPTIONS": {},
     }
 }
 
+if DB_POOL_ENABLED:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', ASGI_THREADS)),
+        # seconds a request waits for a free connection before failing
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+    }
+
+# Read replicas share the primary's credentials, DB_REPLICA_HOSTS is a comma separated host list.
+# Safe-method requests read from a random replica, see core.db_router and core.middleware.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# how long a user's reads stay on the primary after they write
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -136,9 +172,34 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.token.CustomJWTAuthenticationClass',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
+# render post and tag lists from .values() rows (blog.fast_serializers) instead of ModelSerializers
+FAST_LIST_SERIALIZERS = os.getenv('FAST_LIST_SERIALIZERS', 'True') == 'True'
+# build post list pages as JSON inside Postgres (blog.fast_serializers.PostsListJSONQuery)
+SQL_JSON_POST_LISTS = os.getenv('SQL_JSON_POST_LISTS', 'False') == 'True'
+# seconds a rendered public profile stays cached (accounts.services), it is also invalidated on change
+PROFILE_CACHE_TIMEOUT = int(os.getenv('PROFILE_CACHE_TIMEOUT', 60 * 10))
+# accounts.suggestions: suggestions kept per user, and (user, candidate) pairs held in memory at once
+# (about 40 bytes each) while computing them
+FOLLOW_SUGGESTIONS_PER_USER = int(os.getenv('FOLLOW_SUGGESTIONS_PER_USER', 20))
+FOLLOW_SUGGESTIONS_MAX_PAIRS = int(os.getenv('FOLLOW_SUGGESTIONS_MAX_PAIRS', 5000000))
+# most usernames one /auth/follow/is_following/ request may ask about
+IS_FOLLOWING_MAX_USERNAMES = int(os.getenv('IS_FOLLOWING_MAX_USERNAMES', 100))
+# seconds a process trusts its in-memory copy of the roles before checking the shared version (accounts.role_cache)
+ROLE_CACHE_CHECK_INTERVAL = float(os.getenv('ROLE_CACHE_CHECK_INTERVAL', 5))
+# authenticate tokens issued by accounts.token.ClaimsRefreshToken from their claims, without a user query
+JWT_TOKEN_USER_MODE = os.getenv('JWT_TOKEN_USER_MODE', 'False') == 'True'
+# accounts.revocation: in-process Bloom filter of revoked jtis, synced from the cache every interval seconds
+JWT_REVOCATION_FILTER = os.getenv('JWT_REVOCATION_FILTER', 'True') == 'True'
+JWT_REVOCATION_SYNC_INTERVAL = float(os.getenv('JWT_REVOCATION_SYNC_INTERVAL', 1))
+JWT_REVOCATION_CAPACITY = int(os.getenv('JWT_REVOCATION_CAPACITY', 100000))
+JWT_REVOCATION_ERROR_RATE = float(os.getenv('JWT_REVOCATION_ERROR_RATE', 0.001))
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -149,3 +210,45 @@ FROM_EMAIL = 'example@gmail.com'
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 
+# activity_log.writer: 'buffer' bulk_creates from a background thread, 'celery' hands batches
+# to a task, 'sync' inserts each entry in the request
+ACTIVITY_LOG_WRITER = os.getenv('ACTIVITY_LOG_WRITER', 'buffer')
+ACTIVITY_LOG_BUFFER_SIZE = int(os.getenv('ACTIVITY_LOG_BUFFER_SIZE', 10000))
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv('ACTIVITY_LOG_BATCH_SIZE', 500))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_LOG_FLUSH_INTERVAL', 2))
+# what to do when the buffer is full: 'spill' to celery or 'drop'
+ACTIVITY_LOG_OVERFLOW = os.getenv('ACTIVITY_LOG_OVERFLOW', 'spill')
+# activity_log.sinks: 'database', 'file' (append-only JSONL segments) or dotted paths to BaseSink subclasses
+ACTIVITY_LOG_SINKS = os.getenv('ACTIVITY_LOG_SINKS', 'database').split(',')
+ACTIVITY_LOG_FILE_DIR = os.getenv('ACTIVITY_LOG_FILE_DIR', BASE_DIR / 'logs' / 'activity')
+ACTIVITY_LOG_FILE_MAX_BYTES = int(os.getenv('ACTIVITY_LOG_FILE_MAX_BYTES', 64 * 1024 * 1024))
+# activity_log.policy: writes and security events are always logged, other entries are
+# sampled per user at the rate for their url name, else for their action type, else 1
+ACTIVITY_LOG_ALWAYS = [
+    'CREATE', 'UPDATE', 'DELETE', 'LOGIN', 'LOGOUT', 'LOGIN_FAIL', 'LIKE', 'UN_LIKE',
+    'FOLLOW', 'UN_FOLLOW', 'BOOKMARK', 'UN_BOOKMARK', 'COMMENT',
+]
+ACTIVITY_LOG_SAMPLE_RATES = {
+    'READ': float(os.getenv('ACTIVITY_LOG_READ_SAMPLE_RATE', 0.1)),
+}
+ACTIVITY_LOG_VIEW_SAMPLE_RATES = {
+    'tag-list': 0.01,
+    'post-list': 0.05,
+}
+ACTIVITY_LOG_SAMPLING_SALT = os.getenv('ACTIVITY_LOG_SAMPLING_SALT', '')
+# activity_log.partitions: monthly partitions kept ahead, and months of raw rows kept
+ACTIVITY_LOG_PARTITIONS_AHEAD = int(os.getenv('ACTIVITY_LOG_PARTITIONS_AHEAD', 2))
+ACTIVITY_LOG_RETENTION_MONTHS = int(os.getenv('ACTIVITY_LOG_RETENTION_MONTHS', 6))
+ACTIVITY_LOG_DROP_EXPIRED_PARTITIONS = os.getenv('ACTIVITY_LOG_DROP_EXPIRED_PARTITIONS', 'True') == 'True'
+
+CELERY_BEAT_SCHEDULE = {
+    'maintain-activity-log-partitions': {
+        'task': 'activity_log.tasks.maintain_activity_log_partitions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'compute-follow-suggestions': {
+        'task': 'accounts.tasks.compute_follow_suggestions',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
+
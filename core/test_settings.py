@@ -0,0 +1,11 @@
+"""Settings for the test suite: python manage.py test --settings=core.test_settings"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# a replica mirroring the test database, for the routing tests in core/tests.py,
+# which send reads to it through DATABASE_REPLICAS themselves
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+# write activity logs in the request, inside the TestCase transaction, instead of from the
+# daemon thread of the buffered writer; activity_log/tests.py covers that writer directly
+ACTIVITY_LOG_WRITER = 'sync'
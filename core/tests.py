@@ -0,0 +1,215 @@
+import datetime
+import threading
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser, Role
+from activity_log.models import ActivityLog
+from blog.models import Tag
+
+from . import admin_tools
+from .middleware import ReplicaRoutingMiddleware
+
+
+@unittest.skipUnless("replica" in settings.DATABASES, "needs the replica alias of core.test_settings")
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """ReplicaRoutingMiddleware with PrimaryReplicaRouter, on the ``replica`` alias that mirrors the test database."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def token_for(self, user_id):
+        return str(AccessToken.for_user(CustomUser(id=user_id)))
+
+    def call(self, method, token=None, write=False):
+        """Run a view that reads (and writes, if asked) a Tag; returns the aliases that ran queries."""
+
+        def view(request):
+            if write:
+                Tag.objects.create(name=f"tag {Tag.objects.count()}")
+            Tag.objects.exists()
+            return HttpResponse()
+
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        request = getattr(self.factory, method)("/", **headers)
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                ReplicaRoutingMiddleware(view)(request)
+        return {alias for alias, queries in (("default", primary), ("replica", replica)) if len(queries)}
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.call("get"), {"replica"})
+        self.assertEqual(self.call("get", self.token_for(1)), {"replica"})
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.call("post", self.token_for(1), write=True), {"default"})
+        self.assertTrue(Tag.objects.using("replica").exists())
+
+    def test_user_reads_from_primary_after_write(self):
+        self.call("post", self.token_for(1), write=True)
+        self.assertEqual(self.call("get", self.token_for(1)), {"default"})
+        # other users are not pinned
+        self.assertEqual(self.call("get", self.token_for(2)), {"replica"})
+
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            cache.clear()
+            self.call("post", self.token_for(1), write=True)
+            self.assertEqual(self.call("get", self.token_for(1)), {"replica"})
+
+    def test_unverified_token_does_not_pin(self):
+        forged = self.token_for(1)[:-4] + "AAAA"
+        self.call("post", forged, write=True)
+        self.assertIsNone(cache.get(ReplicaRoutingMiddleware._pin_key(1)))
+        self.assertEqual(self.call("get", self.token_for(1)), {"replica"})
+
+
+class DatabasePoolStatsApiViewTests(TestCase):
+    url = "/metrics/db-pool/"
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.user = CustomUser.objects.create_user(email="user@example.com", username="user", password="password")
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com", username="admin", password="password", is_staff=True
+        )
+
+    def get(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client.get(self.url)
+
+    def test_admin_only(self):
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(self.user).status_code, 403)
+        self.assertEqual(self.get(self.admin).status_code, 200)
+
+    def test_without_pool(self):
+        with mock.patch.object(type(connections["default"]), "pool", None, create=True):
+            response = self.get(self.admin)
+        self.assertEqual(response.json(), {})
+
+    def test_with_pool(self):
+        pool = mock.Mock(get_stats=mock.Mock(return_value={"pool_min": 2, "pool_max": 4, "pool_size": 2}))
+        with mock.patch.object(type(connections["default"]), "pool", pool, create=True):
+            response = self.get(self.admin)
+        self.assertEqual(response.json()["default"], {"pool_min": 2, "pool_max": 4, "pool_size": 2})
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql" and settings.DB_POOL_ENABLED, "needs the psycopg connection pool"
+)
+class DatabasePoolLoadTests(TransactionTestCase):
+    """More threads than pooled connections: every query waits its turn instead of failing."""
+
+    def test_threads_share_the_pool(self):
+        pool = connections["default"].pool
+        threads_count = pool.max_size * 3
+        barrier = threading.Barrier(threads_count)
+        errors = []
+
+        def query():
+            try:
+                barrier.wait()
+                with connections["default"].cursor() as cursor:
+                    cursor.execute("SELECT pg_sleep(0.05)")
+            except Exception as error:
+                errors.append(error)
+            finally:
+                # returns the connection to the pool, as the end of a request does
+                connections["default"].close()
+
+        threads = [threading.Thread(target=query) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stats = pool.get_stats()
+        self.assertLessEqual(stats["pool_size"], pool.max_size)
+        # some requests found every connection busy and waited for one
+        self.assertGreater(stats.get("requests_queued", 0), 0)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "estimates come from the Postgres planner")
+class EstimatedAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Role.insert_roles()
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="password"
+        )
+        Tag.objects.bulk_create(Tag(name=f"Tag {index}", slug=f"tag-{index}") for index in range(50))
+        # 30 older reads, then the 10 newest entries are likes
+        start = timezone.now() - datetime.timedelta(days=1)
+        ActivityLog.objects.bulk_create(
+            ActivityLog(
+                action_type=ActivityLog.Activity_Type.READ if index < 30 else ActivityLog.Activity_Type.LIKE,
+                action_time=start + datetime.timedelta(minutes=index),
+            )
+            for index in range(40)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # the login is logged too, keep it out of the facets
+        ActivityLog.objects.filter(action_type=ActivityLog.Activity_Type.LOGIN).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Tag._meta.db_table}")
+            cursor.execute(f"ANALYZE {ActivityLog._meta.db_table}")
+
+    def test_paginator_uses_the_estimate_above_the_threshold(self):
+        queryset = Tag.objects.order_by("pk")
+        estimate = admin_tools.estimate_count(queryset)
+        self.assertGreater(estimate, 10)
+
+        with mock.patch.object(admin_tools, "EXACT_COUNT_THRESHOLD", 10), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(admin_tools.EstimatedCountPaginator(queryset, 20).count, estimate)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(admin_tools.EstimatedCountPaginator(queryset, 20).count, 50)
+        self.assertTrue(any("COUNT(" in query["sql"] for query in queries))
+
+    def get_facets(self, query=""):
+        with mock.patch.object(admin_tools, "FACET_SAMPLE_SIZE", 10):
+            response = self.client.get(f"/admin/activity_log/activitylog/?_facets=1{query}")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_facets_are_scaled_from_a_sample_in_changelist_order(self):
+        estimate = admin_tools.estimate_count(ActivityLog.objects.all())
+        self.assertGreater(estimate, 10)
+
+        # newest first by default, the sample holds only likes
+        response = self.get_facets()
+        self.assertContains(response, f">Like (~{estimate})</a>")
+        self.assertContains(response, ">Read (~0)</a>")
+
+        # sorted by action_time ascending, it holds only reads
+        response = self.get_facets("&o=6")
+        self.assertContains(response, f">Read (~{estimate})</a>")
+        self.assertContains(response, ">Like (~0)</a>")
+
+    def test_facets_are_exact_below_the_sample_size(self):
+        with mock.patch.object(admin_tools, "FACET_SAMPLE_SIZE", 1000):
+            response = self.client.get("/admin/activity_log/activitylog/?_facets=1")
+        self.assertContains(response, ">Like (10)</a>")
+        self.assertContains(response, ">Read (30)</a>")
+
@@ -0,0 +1,75 @@
+"""Rate throttles checked with one atomic script call on Redis.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per key in the
+cache, reads and rewrites the whole list on every request, and two workers
+handling requests of the same user at once can both read the old list and
+both let their request through.
+
+RedisUserRateThrottle applies the same ``rate`` with GCRA (the generic cell
+rate algorithm) instead: the key holds a single number, the time at which the
+user's budget is fully restored, and a Lua script checks and moves it in one
+round trip. Redis runs scripts one at a time, so concurrent requests are
+counted exactly, and the script reads the time from Redis so the clocks of
+the workers don't matter. Up to ``num_requests`` requests may be made at once,
+after which one more is allowed every ``duration / num_requests`` seconds.
+
+When the default cache is not django-redis (tests, local settings) the
+throttle falls back to DRF's cache-based implementation.
+"""
+from functools import lru_cache
+
+from django_redis import get_redis_connection
+from rest_framework.throttling import UserRateThrottle
+
+# TIME before a write needs effects replication, the default since Redis 5
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = emission * tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+if new_tat - now > tolerance then
+    return {0, tat + emission - tolerance - now}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, 0}
+"""
+
+
+@lru_cache(maxsize=None)
+def get_gcra_script():
+    try:
+        connection = get_redis_connection('default')
+    except NotImplementedError:
+        return None
+    return connection.register_script(GCRA_SCRIPT)
+
+
+class RedisUserRateThrottle(UserRateThrottle):
+    """Drop-in replacement for UserRateThrottle; give each subclass its own ``scope``."""
+
+    def allow_request(self, request, view):
+        script = get_gcra_script()
+        if script is None:
+            return super().allow_request(request, view)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # microseconds between two requests once the burst is used up
+        emission = self.duration * 1000000 // self.num_requests
+        allowed, self.wait_time = script(keys=[self.key], args=[emission, self.num_requests])
+        return bool(allowed)
+
+    def wait(self):
+        if get_gcra_script() is None:
+            return super().wait()
+        return self.wait_time / 1000000
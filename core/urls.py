@@ -1,9 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import DatabasePoolStatsApiView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('auth/', include('accounts.urls', namespace='auth')),
     path('', include('blog.urls', namespace='blog')),
-    path('notification/', include('notifications.urls', namespace='notifications'))
+    path('notification/', include('notifications.urls', namespace='notifications')),
+    path('activity/', include('activity_log.urls', namespace='activity_log')),
+    path('metrics/db-pool/', DatabasePoolStatsApiView.as_view(), name='db-pool-stats'),
 ]
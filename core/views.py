@@ -0,0 +1,18 @@
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView, status
+
+
+class DatabasePoolStatsApiView(APIView):
+    """Connection pool counters of this worker process, one entry per database alias."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        stats = {}
+        for alias in connections:
+            pool = getattr(connections[alias], "pool", None)
+            if pool is not None:
+                stats[alias] = pool.get_stats()
+        return Response(stats, status=status.HTTP_200_OK)
@@ -1,8 +1,14 @@
 from django.contrib import admin
 
+from core.admin_tools import ScaleModeAdmin
+
 from .models import Notification
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['user', 'message', 'is_read']
\ No newline at end of file
+class NotificationAdmin(ScaleModeAdmin):
+    list_display = ['user', 'message', 'is_read']
+    list_filter = ['is_read', 'creation_time']
+    search_fields = ['user__username']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']